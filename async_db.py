@@ -0,0 +1,136 @@
+import itertools
+import logging
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from database import DatabaseManager, get_engine
+
+logger = logging.getLogger(__name__)
+
+class _WorkerSignals(QObject):
+    # Emitted from pool threads; connected slots run on the GUI thread
+    succeeded = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+
+class _QueryRequest:
+    def __init__(self, request_id, key, func, on_result, on_error):
+        self.request_id = request_id
+        self.key = key
+        self.func = func
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = threading.Event()
+        self.connection = None  # sqlite3 connection while the query runs
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled.set()
+            if self.connection is not None:
+                # Aborts the statement currently running on the worker thread
+                self.connection.interrupt()
+
+class _QueryRunnable(QRunnable):
+    def __init__(self, db_path, request, signals):
+        super().__init__()
+        self.db_path = db_path
+        self.request = request
+        self.signals = signals
+
+    def run(self):
+        request = self.request
+        if request.cancelled.is_set():
+            return
+
+        # Each pool thread gets its own session from the shared registry
+        db = DatabaseManager(self.db_path)
+        try:
+            with request.lock:
+                request.connection = db.session.connection().connection.driver_connection
+            result = request.func(db)
+        except Exception as e:
+            if not request.cancelled.is_set():
+                self.signals.failed.emit(request.request_id, e)
+        else:
+            if not request.cancelled.is_set():
+                self.signals.succeeded.emit(request.request_id, result)
+        finally:
+            with request.lock:
+                request.connection = None
+            db.close()
+
+class AsyncDataAccess(QObject):
+    """Runs database work on a thread pool and delivers results on the GUI thread.
+
+    Work is submitted under a key, e.g. 'chart' or 'report'. Submitting again
+    under the same key cancels the previous request, and a result that is no
+    longer the latest for its key is dropped instead of delivered.
+
+    The callable receives a DatabaseManager bound to a worker session. Return
+    plain data (tuples, dicts, numbers), not ORM objects: the worker session is
+    closed once the callable returns.
+
+    A failure goes to the request's on_error callback. Requests without one
+    report it through error(key, exception) and the log instead.
+    """
+    loading_changed = pyqtSignal(str, bool)
+    error = pyqtSignal(str, object)
+
+    _ids = itertools.count(1)
+
+    def __init__(self, db_path='inventory.db', pool=None, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.pool = pool or QThreadPool.globalInstance()
+        self._requests = {}
+        self._latest = {}
+        self._signals = _WorkerSignals()
+        self._signals.succeeded.connect(self._on_succeeded)
+        self._signals.failed.connect(self._on_failed)
+        # Create the engine and schema on the GUI thread, before any worker
+        get_engine(db_path)
+
+    def submit(self, key, func, on_result, on_error=None):
+        """Queue func(db) for a worker thread and return the request id."""
+        self.cancel(key)
+        request = _QueryRequest(next(self._ids), key, func, on_result, on_error)
+        self._requests[request.request_id] = request
+        self._latest[key] = request.request_id
+        self.loading_changed.emit(key, True)
+        self.pool.start(_QueryRunnable(self.db_path, request, self._signals))
+        return request.request_id
+
+    def cancel(self, key):
+        """Cancel the latest request under a key, if it is still running."""
+        request_id = self._latest.pop(key, None)
+        request = self._requests.pop(request_id, None)
+        if request:
+            request.cancel()
+            self.loading_changed.emit(key, False)
+
+    def cancel_all(self):
+        for key in list(self._latest):
+            self.cancel(key)
+
+    def is_loading(self, key):
+        return key in self._latest
+
+    def _finish(self, request_id):
+        request = self._requests.pop(request_id, None)
+        if request is None or self._latest.get(request.key) != request_id:
+            return None  # cancelled or superseded: drop the stale result
+        del self._latest[request.key]
+        self.loading_changed.emit(request.key, False)
+        return request
+
+    def _on_succeeded(self, request_id, result):
+        request = self._finish(request_id)
+        if request:
+            request.on_result(result)
+
+    def _on_failed(self, request_id, error):
+        request = self._finish(request_id)
+        if request and request.on_error:
+            request.on_error(error)
+        elif request:
+            logger.error("Background query '%s' failed", request.key, exc_info=error)
+            self.error.emit(request.key, error)
@@ -0,0 +1,814 @@
+"""Database benchmarks.
+
+Every benchmark works on throwaway database files in a temporary directory,
+never on inventory.db. Run e.g.:
+
+    python benchmarks.py profiles --checkouts 500 --sales 20000
+    python benchmarks.py read-models --products 50000
+    python benchmarks.py search --rows 100000
+    python benchmarks.py serials --units 1000000
+    python benchmarks.py product-cache --lookups 20000
+    python benchmarks.py checkout-stress --processes 4
+    python benchmarks.py restock --skus 40 --units 25
+    python benchmarks.py task-sweep --skus 10000
+    python benchmarks.py ledger --days 90 --movements 2000
+    python benchmarks.py inventory-table --products 50000
+    python benchmarks.py action-buttons --rows 10000
+    python benchmarks.py dashboard-stats --products 50000
+    python benchmarks.py change-feed --products 50000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from sqlalchemy import func
+from database import (CONNECTION_PROFILES, Customer, DatabaseManager,
+                      InsufficientStockError, Product, ProductItem, Sale,
+                      SaleItem, SalesDailyRollup, StockMovement,
+                      StockReservation, StockSnapshot, TodoTask,
+                      dispose_engines)
+from read_models import ReadModels
+from todo_manager import TodoManager
+
+def timed(func, *args, **kwargs):
+    """Return (seconds, result) for a single call."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def seed_products(db, count, store_quantity=1000000):
+    db.session.execute(insert(Product), [{
+        'name': f'Product {i}',
+        'category': random.choice(['Tricycle', 'Accessories', 'Spare Parts']),
+        'purchase_price': 10.0,
+        'selling_price': 15.0,
+        'store_quantity': store_quantity,
+        'warehouse_quantity': 0,
+        'reorder_threshold': 5
+    } for i in range(count)])
+    db.session.commit()
+
+def seed_sales(db, count, product_count, days=365):
+    """Insert historical sales spread over the last ``days`` days in one commit."""
+    now = datetime.now()
+    sales = [{
+        'id': i + 1,
+        'customer_id': None,
+        'total_amount': 15.0,
+        'tax_amount': 2.7,
+        'sale_date': now - timedelta(seconds=random.randint(0, days * 86400))
+    } for i in range(count)]
+    db.session.execute(insert(Sale), sales)
+    db.session.execute(insert(SaleItem), [{
+        'sale_id': sale['id'],
+        'product_id': random.randint(1, product_count),
+        'quantity': 1,
+        'unit_price': 15.0,
+        'subtotal': 15.0
+    } for sale in sales])
+    db.session.commit()
+
+def checkout(db, product_count):
+    product_id = random.randint(1, product_count)
+    db.add_sale({
+        'customer_id': None,
+        'total_amount': 15.0,
+        'tax_amount': 2.7,
+        'sale_date': datetime.now()
+    }, [{'product_id': product_id, 'quantity': 1, 'unit_price': 15.0, 'subtotal': 15.0}])
+
+def bench_profiles(args):
+    """Compare checkout commit throughput and report latency per profile."""
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    print(f"{'profile':<12} {'checkouts/s':>12} {'report ms':>10}")
+    try:
+        for profile in args.profile or list(CONNECTION_PROFILES):
+            random.seed(args.seed)
+            db = DatabaseManager(os.path.join(workdir, f'{profile}.db'), profile=profile)
+            seed_products(db, args.products)
+            seed_sales(db, args.sales, args.products)
+
+            elapsed, _ = timed(lambda: [checkout(db, args.products) for _ in range(args.checkouts)])
+            throughput = args.checkouts / elapsed
+
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=30)
+            report_times = []
+            for _ in range(args.repeat):
+                db.session.expunge_all()
+                report_time, _ = timed(db.get_sales_report, start_date, end_date)
+                report_times.append(report_time)
+
+            print(f"{profile:<12} {throughput:>12.1f} {min(report_times) * 1000:>10.2f}")
+            dispose_engines()
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def measured(func):
+    """Return (seconds, peak traced bytes, result) for a single call."""
+    tracemalloc.start()
+    try:
+        elapsed, result = timed(func)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak, result
+
+def bench_read_models(args):
+    """Compare loading the product catalog as ORM objects and as projected rows."""
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        random.seed(args.seed)
+        db = DatabaseManager(os.path.join(workdir, 'catalog.db'))
+        seed_products(db, args.products)
+        read_models = ReadModels(db)
+
+        print(f"{'path':<12} {'rows':>8} {'ms':>10} {'peak MB':>10}")
+        for label, load in [('orm', db.get_all_products), ('projection', read_models.product_rows)]:
+            db.session.expunge_all()
+            elapsed, peak, rows = measured(load)
+            print(f"{label:<12} {len(rows):>8} {elapsed * 1000:>10.1f} {peak / 1e6:>10.1f}")
+            del rows
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def random_word(length=6):
+    return ''.join(random.choice('abcdefghiklmnoprstuvy') for _ in range(length))
+
+def seed_search_data(db, count):
+    """Products and customers with text drawn from a catalogue-sized vocabulary."""
+    vocabulary = ['tricycle', 'bell', 'seat', 'chain', 'pedal', 'wheel', 'basket'] + \
+        [random_word() for _ in range(5000)]
+    words = lambda n: ' '.join(random.choice(vocabulary) for _ in range(n))
+    db.session.execute(insert(Product), [{
+        'name': f'{words(3)} {i}',
+        'description': words(8),
+        'category': random.choice(['Tricycle', 'Accessories', 'Spare Parts']),
+        'supplier_info': f'Supplier {i % 500}',
+        'purchase_price': 10.0,
+        'selling_price': 15.0
+    } for i in range(count)])
+    db.session.execute(insert(Customer), [{
+        'name': f'{random_word(5).title()} {random_word(7).title()}',
+        'phone': f'98{i:08d}',
+        'email': f'customer{i}@example.com'
+    } for i in range(count)])
+    db.session.commit()
+
+def bench_search(args):
+    """Time ranked FTS5 prefix search against a LIKE scan.
+    
+    Ranking scores every match, so latency grows with the match count shown
+    in the 'matches' column; a prefix that matches most of the catalogue
+    (e.g. a category name) is the slow case.
+    """
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        random.seed(args.seed)
+        db = DatabaseManager(os.path.join(workdir, 'search.db'))
+        seed_search_data(db, args.rows)
+        read_models = ReadModels(db)
+        product, customer = db.get_product(args.rows // 2), db.get_customer(args.rows // 2)
+        name_words = product.name.split()
+        product_queries = [name_words[0][:3], f'{name_words[0]} {name_words[1][:2]}', 'tric']
+        customer_queries = [customer.name.split()[0][:4], customer.phone[:7], customer.email[:12]]
+
+        like = lambda text: db.session.query(Product).filter(
+            Product.name.like(f'%{text}%') | Product.description.like(f'%{text}%')
+        ).limit(50).all()
+        cases = [
+            ('products fts', Product, lambda text: read_models.product_page(search=text, limit=50)[0], product_queries),
+            ('products like', Product, like, product_queries),
+            ('customers fts', Customer, lambda text: read_models.customer_page(search=text, limit=50)[0], customer_queries),
+        ]
+        print(f"{'search':<16} {'query':<16} {'matches':>8} {'ms':>8}")
+        for label, model, search, queries in cases:
+            for text in queries:
+                times = []
+                for _ in range(args.repeat):
+                    db.session.expunge_all()
+                    elapsed, rows = timed(search, text)
+                    times.append(elapsed)
+                matches = len(db.search(model, text, limit=args.rows))
+                print(f"{label:<16} {text:<16} {matches:>8} {min(times) * 1000:>8.2f}")
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def seed_product_items(db, units, product_count, batch_size=50000):
+    """Insert ``units`` tracked items with P{product}I{n} serials."""
+    for start in range(0, units, batch_size):
+        db.session.execute(insert(ProductItem), [{
+            'product_id': n % product_count + 1,
+            'item_number': n // product_count + 1,
+            'serial_number': f'P{n % product_count + 1}I{n // product_count + 1}',
+            'location': 'store' if n % 3 else 'warehouse',
+            'status': 'in_stock'
+        } for n in range(start, min(start + batch_size, units))])
+    db.session.commit()
+
+def bench_serials(args):
+    """Time serial number resolution from the index and from the database."""
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        random.seed(args.seed)
+        db = DatabaseManager(os.path.join(workdir, 'serials.db'))
+        seed_products(db, args.products)
+        seed_product_items(db, args.units, args.products)
+        db.session.expunge_all()
+
+        elapsed, peak, count = measured(db.warm_serial_index)
+        print(f"warm: {count} serials in {elapsed:.2f}s, peak {peak / 1e6:.0f} MB traced")
+
+        serials = [f'P{random.randint(1, args.products)}I{random.randint(1, args.units // args.products)}'
+                   for _ in range(args.lookups)]
+        elapsed, _ = timed(lambda: [db.resolve_serial(serial) for serial in serials])
+        print(f"index lookup:    {elapsed / len(serials) * 1e6:>8.2f} us")
+
+        query = lambda serial: db.session.query(ProductItem).filter_by(serial_number=serial).first()
+        sample = serials[:1000]
+        elapsed, _ = timed(lambda: [query(serial) for serial in sample])
+        print(f"database lookup: {elapsed / len(sample) * 1e6:>8.2f} us")
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def bench_product_cache(args):
+    """Time get_product lookups with and without the product cache.
+
+    Commits every few lookups, like the scan and checkout paths, so the
+    session's own identity map keeps expiring.
+    """
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        random.seed(args.seed)
+        db = DatabaseManager(os.path.join(workdir, 'cache.db'))
+        seed_products(db, args.products)
+        ids = [random.randint(1, args.products) for _ in range(args.lookups)]
+        cache_size = db.product_cache.max_size
+
+        def lookups():
+            for n, product_id in enumerate(ids):
+                db.get_product(product_id).selling_price
+                if n % args.commit_every == 0:
+                    db.session.commit()
+
+        print(f"{'cache':<10} {'us/lookup':>10} {'hit rate':>9}")
+        for label, size in [('off', 0), ('on', cache_size)]:
+            db.product_cache.max_size = size
+            db.product_cache.invalidate()
+            db.product_cache.hits = db.product_cache.misses = 0
+            db.session.expunge_all()
+            elapsed, _ = timed(lookups)
+            stats = db.product_cache.stats()
+            print(f"{label:<10} {elapsed / len(ids) * 1e6:>10.1f} {stats['hit_rate']:>9.1%}")
+
+        batch = ids[:args.batch]
+        db.session.expunge_all()
+        db.product_cache.invalidate()
+        single, _ = timed(lambda: [db.get_product(product_id) for product_id in batch])
+        db.session.expunge_all()
+        db.product_cache.invalidate()
+        batched, _ = timed(db.get_products, batch)
+        print(f"cold fetch of {len(batch)} ids: get_product {single * 1000:.1f} ms, "
+              f"get_products {batched * 1000:.1f} ms")
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def stress_worker(db_path, checkouts, product_count, seed):
+    """Run random multi-line checkouts; return (completed, refused).
+
+    Every other checkout first reserves its lines for a cart, the way the
+    sales page does, then checks the cart out.
+    """
+    random.seed(seed)
+    db = DatabaseManager(db_path)
+    completed = refused = 0
+    try:
+        for n in range(checkouts):
+            lines = [{
+                'product_id': random.randint(1, product_count),
+                'quantity': random.randint(1, 3),
+                'unit_price': 15.0,
+                'subtotal': 15.0
+            } for _ in range(random.randint(1, 3))]
+            cart_id = f'{seed}-{n}' if n % 2 else None
+            try:
+                for line in lines if cart_id else ():
+                    db.reserve_stock(cart_id, line['product_id'], line['quantity'])
+                db.add_sale({
+                    'customer_id': None,
+                    'total_amount': 15.0 * len(lines),
+                    'tax_amount': 2.7 * len(lines),
+                    'sale_date': datetime.now()
+                }, lines, cart_id=cart_id)
+                completed += 1
+            except InsufficientStockError:
+                if cart_id:
+                    db.release_cart(cart_id)
+                refused += 1
+    finally:
+        dispose_engines()
+    return completed, refused
+
+def bench_checkout_stress(args):
+    """Check out concurrently from several processes against one database
+    file, then verify no product was oversold and the books balance.
+
+    Stock defaults to half the expected demand, so many checkouts race for
+    the last units. A run where no checkout was refused fails too: the
+    oversell guard was never exercised.
+    """
+    if args.stock is None:
+        # A checkout averages 2 lines of 2 units
+        demand = args.processes * args.checkouts * 4
+        args.stock = max(demand // (2 * args.products), 1)
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    db_path = os.path.join(workdir, 'stress.db')
+    try:
+        db = DatabaseManager(db_path)
+        seed_products(db, args.products, store_quantity=args.stock)
+        dispose_engines()
+
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(args.processes) as pool:
+            elapsed, results = timed(pool.starmap, stress_worker, [
+                (db_path, args.checkouts, args.products, args.seed + n)
+                for n in range(args.processes)
+            ])
+        completed = sum(done for done, _ in results)
+        refused = sum(short for _, short in results)
+        print(f"{args.processes} processes: {completed} sales, {refused} refused, "
+              f"{(completed + refused) / elapsed:.0f} checkouts/s")
+
+        db = DatabaseManager(db_path)
+        sold = dict(db.session.query(SaleItem.product_id, func.sum(SaleItem.quantity))
+                    .group_by(SaleItem.product_id).all())
+        failures = []
+        if not refused:
+            failures.append(f"no checkout was refused; lower --stock (now {args.stock}) "
+                            f"so checkouts run out of stock")
+        remaining = 0
+        for product in db.get_all_products():
+            remaining += product.store_quantity
+            expected = args.stock - sold.get(product.id, 0)
+            if product.store_quantity < 0:
+                failures.append(f"product {product.id}: oversold, store {product.store_quantity}")
+            elif product.store_quantity != expected:
+                failures.append(f"product {product.id}: store {product.store_quantity}, expected {expected}")
+        sale_count = db.session.query(func.count(Sale.id)).scalar()
+        units = db.session.query(func.sum(SaleItem.quantity)).scalar() or 0
+        rollup_sales, rollup_units = db.session.query(
+            func.sum(SalesDailyRollup.sale_count), func.sum(SalesDailyRollup.units)).one()
+        if units + remaining != args.products * args.stock:
+            failures.append(f"{units} sold + {remaining} left != {args.products * args.stock} stocked")
+        if sale_count != completed:
+            failures.append(f"{sale_count} sales stored, {completed} reported")
+        held = db.session.query(func.count(StockReservation.id)).scalar()
+        if held:
+            failures.append(f"{held} reservations left after every cart closed")
+        if (rollup_sales or 0, rollup_units or 0) != (sale_count, units):
+            failures.append(f"rollup has {rollup_sales} sales/{rollup_units} units, "
+                            f"tables have {sale_count}/{units}")
+
+        for failure in failures:
+            print(f"FAIL {failure}")
+        print(f"{units} of {args.products * args.stock} units sold; "
+              f"{'ok' if not failures else f'{len(failures)} failure(s)'}")
+        return 1 if failures else 0
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def orm_restock(db, transfers):
+    """The per-product ORM move: load items, flip them, commit per product."""
+    moved = 0
+    for product_id, quantity in transfers.items():
+        items = db.session.query(ProductItem).filter_by(
+            product_id=product_id, location='warehouse', status='in_stock'
+        ).order_by(ProductItem.item_number).limit(quantity).all()
+        for item in items:
+            item.location = 'store'
+        product = db.session.get(Product, product_id)
+        product.warehouse_quantity -= len(items)
+        product.store_quantity += len(items)
+        db.session.commit()
+        moved += len(items)
+    return moved
+
+def bench_restock(args):
+    """Compare a morning restock done per product through the ORM with one
+    set-based transfer_warehouse_to_store call.
+    """
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        random.seed(args.seed)
+        print(f"{'path':<12} {'items':>8} {'ms':>10}")
+        for label in ['orm', 'set-based']:
+            db = DatabaseManager(os.path.join(workdir, f'{label}.db'))
+            seed_products(db, args.products, store_quantity=0)
+            db.session.execute(Product.__table__.update().values(
+                warehouse_quantity=args.units * 2))
+            db.session.commit()
+            # Every item starts in the warehouse
+            seed_product_items(db, args.products * args.units * 2, args.products)
+            db.session.execute(ProductItem.__table__.update().values(location='warehouse'))
+            db.session.commit()
+            db.session.expunge_all()
+
+            skus = random.sample(range(1, args.products + 1), args.skus)
+            transfers = {product_id: args.units for product_id in skus}
+            if label == 'orm':
+                elapsed, moved = timed(orm_restock, db, transfers)
+            else:
+                elapsed, rows = timed(db.transfer_warehouse_to_store, transfers)
+                moved = len(rows)
+            print(f"{label:<12} {moved:>8} {elapsed * 1000:>10.1f}")
+            dispose_engines()
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def per_product_sweep(todo):
+    """The old sweep: a lookup and a commit per low-stock product."""
+    db = todo.db
+    created = 0
+    for task_type, products in [('restock', db.get_products_needing_restock()),
+                                ('assembly', db.get_products_needing_assembly())]:
+        for product in products:
+            existing = db.session.query(TodoTask).filter(
+                TodoTask.product_id == product.id,
+                TodoTask.task_type == task_type,
+                TodoTask.status == 'pending'
+            ).first()
+            if existing:
+                continue
+            if task_type == 'restock':
+                quantity = min(max(product.reorder_threshold - product.store_quantity, 0),
+                               product.warehouse_quantity)
+                task = quantity > 0 and todo.create_restock_task(product.id, quantity)
+            else:
+                total = product.store_quantity + product.warehouse_quantity
+                task = todo.create_assembly_task(product.id, max(product.reorder_threshold - total + 5, 0))
+            created += bool(task)
+    return created
+
+def bench_task_sweep(args):
+    """Time check_low_stock_and_create_tasks against the per-product sweep
+    with every SKU low on stock, then a second sweep with the tasks in place.
+
+    The per-product sweep slows down with every product the session holds
+    (each commit expires all of them), so it runs on --baseline-skus only.
+    """
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        print(f"{'path':<12} {'skus':>8} {'created':>8} {'first ms':>10} {'repeat ms':>10} {'us/sku':>8}")
+        for label, skus in [('per-product', args.baseline_skus), ('set-based', args.skus)]:
+            random.seed(args.seed)
+            db = DatabaseManager(os.path.join(workdir, f'{label}.db'))
+            db.session.execute(insert(Product), [{
+                'name': f'Product {i}',
+                'purchase_price': 10.0,
+                'selling_price': 15.0,
+                'store_quantity': random.randint(0, 3),
+                'warehouse_quantity': random.randint(0, 3),
+                'reorder_threshold': 5
+            } for i in range(skus)])
+            db.session.commit()
+            db.session.expunge_all()
+
+            todo = TodoManager(db)
+            if label == 'per-product':
+                sweep = lambda: per_product_sweep(todo)
+            else:
+                sweep = lambda: len(todo.check_low_stock_and_create_tasks())
+            first, created = timed(sweep)
+            repeat, _ = timed(sweep)
+            print(f"{label:<12} {skus:>8} {created:>8} {first * 1000:>10.1f} "
+                  f"{repeat * 1000:>10.1f} {first / skus * 1e6:>8.0f}")
+            dispose_engines()
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def seed_ledger(db, products, days, per_day):
+    """Write ``days`` of random stock movements with a snapshot each midnight."""
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    counters = {product_id: [0, 0] for product_id in range(1, products + 1)}
+    movement_id = 0
+    for day in range(days):
+        midnight = start + timedelta(days=day)
+        db.session.execute(insert(StockSnapshot), [{
+            'taken_at': midnight, 'product_id': product_id,
+            'store_quantity': store, 'warehouse_quantity': warehouse,
+            'last_movement_id': movement_id
+        } for product_id, (store, warehouse) in counters.items()])
+        movements = []
+        for n in range(per_day):
+            movement_id += 1
+            product_id = random.randint(1, products)
+            location = random.randint(0, 1)
+            change = random.randint(-3, 5)
+            counters[product_id][location] += change
+            movements.append({
+                'id': movement_id, 'product_id': product_id,
+                'location': ('store', 'warehouse')[location], 'change': change,
+                'reason': 'adjustment',
+                'created_at': midnight + timedelta(seconds=n * 86400 // per_day)
+            })
+        db.session.execute(insert(StockMovement), movements)
+    db.session.commit()
+    return start
+
+def bench_ledger(args):
+    """Time stock-as-of queries from snapshot plus delta against replaying
+    the whole ledger.
+    """
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        random.seed(args.seed)
+        db = DatabaseManager(os.path.join(workdir, 'ledger.db'))
+        start = seed_ledger(db, args.products, args.days, args.movements)
+        whens = [start + timedelta(days=random.uniform(1, args.days)) for _ in range(args.repeat)]
+
+        def replay(when):
+            return db.session.execute(
+                select(StockMovement.product_id, StockMovement.location, func.sum(StockMovement.change))
+                .where(StockMovement.created_at <= when)
+                .group_by(StockMovement.product_id, StockMovement.location)).all()
+
+        for label, query in [('replay', replay), ('snapshot', db.get_stock_as_of)]:
+            elapsed, _ = timed(lambda: [query(when) for when in whens])
+            print(f"{label:<10} {elapsed / len(whens) * 1000:>8.1f} ms per as-of query")
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def fill_table_widget(table, products):
+    """The old inventory page: one QTableWidgetItem per cell, every row."""
+    from PyQt6.QtWidgets import QTableWidgetItem
+    table.setRowCount(len(products))
+    for row, product in enumerate(products):
+        table.setItem(row, 0, QTableWidgetItem(str(product.id)))
+        table.setItem(row, 1, QTableWidgetItem(product.name))
+        table.setItem(row, 2, QTableWidgetItem(product.category or 'Uncategorized'))
+        table.setItem(row, 3, QTableWidgetItem(
+            f"{product.store_quantity + product.warehouse_quantity} "
+            f"(S:{product.store_quantity}, W:{product.warehouse_quantity})"))
+        table.setItem(row, 4, QTableWidgetItem(f"₹{product.purchase_price:.2f}"))
+        table.setItem(row, 5, QTableWidgetItem(f"₹{product.selling_price:.2f}"))
+        table.setItem(row, 6, QTableWidgetItem('store'))
+        table.setItem(row, 7, QTableWidgetItem(product.supplier_info or ''))
+
+def bench_inventory_table(args):
+    """Inventory page refresh: filled QTableWidget vs paged QueryTableModel."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtWidgets import QApplication, QTableView, QTableWidget
+    from main import INVENTORY_COLUMNS
+    from table_models import QueryTableModel
+
+    app = QApplication.instance() or QApplication([])
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        random.seed(args.seed)
+        db = DatabaseManager(os.path.join(workdir, 'catalog.db'))
+        seed_products(db, args.products)
+        read_models = ReadModels(db)
+
+        model = QueryTableModel(INVENTORY_COLUMNS)
+        view = QTableView()
+        view.setModel(model)
+        view.resize(1000, 700)
+        view.show()
+        print(f"{'step':<32} {'rows held':>10} {'ms':>10}")
+        steps = [
+            ('model: first page', lambda: model.set_loader(read_models.product_page)),
+            ('model: sort by name desc', lambda: model.sort(1, Qt.SortOrder.DescendingOrder)),
+            ('model: sort by quantity', lambda: model.sort(3, Qt.SortOrder.AscendingOrder)),
+            (f'model: scroll {args.pages} pages', lambda: [model.fetchMore() for _ in range(args.pages)]),
+        ]
+        for label, step in steps:
+            elapsed, _ = timed(lambda: (step(), app.processEvents()))
+            print(f"{label:<32} {model.rowCount():>10} {elapsed * 1000:>10.1f}")
+
+        table = QTableWidget()
+        table.setColumnCount(len(INVENTORY_COLUMNS))
+        table.resize(1000, 700)
+        table.show()
+        elapsed, _ = timed(lambda: (fill_table_widget(table, read_models.product_rows()),
+                                    app.processEvents()))
+        print(f"{'widget: fill every row':<32} {table.rowCount():>10} {elapsed * 1000:>10.1f}")
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def bench_action_buttons(args):
+    """Refresh a task-style table: per-row QPushButtons vs a painting delegate."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication, QPushButton, QTableWidget, QTableWidgetItem
+    from table_models import ActionButtonDelegate
+
+    app = QApplication.instance() or QApplication([])
+    rows = [(i, f'Restock Product {i}', 'Start' if i % 2 else 'Complete')
+            for i in range(args.rows)]
+
+    def fill(table, use_delegate):
+        table.setRowCount(len(rows))
+        for row, (task_id, description, action) in enumerate(rows):
+            table.setItem(row, 0, QTableWidgetItem(str(task_id)))
+            table.setItem(row, 1, QTableWidgetItem(description))
+            if use_delegate:
+                table.setItem(row, 2, QTableWidgetItem(action))
+            else:
+                button = QPushButton(action)
+                button.clicked.connect(lambda checked, t=task_id: None)
+                table.setCellWidget(row, 2, button)
+        app.processEvents()
+
+    print(f"{'path':<12} {'refresh':>8} {'ms':>10} {'child widgets':>14}")
+    for label, use_delegate in [('widgets', False), ('delegate', True)]:
+        table = QTableWidget(0, 3)
+        if use_delegate:
+            table.setItemDelegateForColumn(2, ActionButtonDelegate(table))
+        table.resize(1000, 700)
+        table.show()
+        for refresh in range(1, args.refreshes + 1):
+            elapsed, _ = timed(fill, table, use_delegate)
+            print(f"{label:<12} {refresh:>8} {elapsed * 1000:>10.1f} "
+                  f"{len(table.findChildren(QPushButton)):>14}")
+        table.deleteLater()
+        app.processEvents()
+
+def bench_dashboard_stats(args):
+    """Dashboard KPIs: loading every row vs one aggregate query each."""
+    from dashboard_stats import load_dashboard_stats
+
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        random.seed(args.seed)
+        db = DatabaseManager(os.path.join(workdir, 'stats.db'))
+        seed_products(db, args.products, store_quantity=0)
+        seed_sales(db, args.sales, args.products)
+        db.rebuild_sales_rollup()
+
+        def one_shot():
+            # What the dashboard computed once at startup before
+            today = datetime.now().date()
+            month_start = today.replace(day=1)
+            return {
+                'total_products': len(db.get_all_products()),
+                'low_stock_items': len(db.get_low_stock_products()),
+                'today_sales': db.get_sales_totals(today, today)['revenue'],
+                'monthly_revenue': db.get_sales_totals(month_start, today)['revenue'],
+            }
+
+        print(f"{'path':<12} {'ms':>10}  values")
+        for label, load in [('load rows', one_shot), ('aggregates', lambda: load_dashboard_stats(db))]:
+            db.session.expunge_all()
+            elapsed, values = timed(load)
+            print(f"{label:<12} {elapsed * 1000:>10.1f}  {values}")
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def bench_change_feed(args):
+    """Picking up other connections' commits: ChangeFeed vs a reload timer."""
+    from change_feed import ChangeFeed
+    from dashboard_stats import load_dashboard_stats
+
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+    try:
+        random.seed(args.seed)
+        db = DatabaseManager(os.path.join(workdir, 'feed.db'))
+        seed_products(db, args.products, store_quantity=0)
+        read_models = ReadModels(db)
+        feed = ChangeFeed(db.db_path)
+        product_ids = db.session.execute(select(Product.id)).scalars().all()
+
+        def blind_reload():
+            # What a refresh timer would re-query on every tick
+            read_models.product_page(limit=200)
+            read_models.customer_page(limit=200)
+            read_models.low_stock_rows()
+            load_dashboard_stats(db)
+
+        def changed_poll():
+            # Commits on the session's connection, which the feed sees
+            db.update_product(random.choice(product_ids),
+                              {'store_quantity': random.randint(0, 20)})
+            start = time.perf_counter()
+            db.sync_changes(feed.poll())
+            return time.perf_counter() - start
+
+        print(f"{'per tick':<36} {'ms':>10}")
+        elapsed, _ = timed(lambda: [feed.poll() for _ in range(args.polls)])
+        print(f"{'feed: nothing committed':<36} {elapsed * 1000 / args.polls:>10.3f}")
+        elapsed = sum(changed_poll() for _ in range(args.commits))
+        print(f"{'feed: one product committed':<36} {elapsed * 1000 / args.commits:>10.3f}")
+        elapsed, _ = timed(lambda: [blind_reload() for _ in range(args.commits)])
+        print(f"{'timer: reload pages and stats':<36} {elapsed * 1000 / args.commits:>10.3f}")
+        feed.close()
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=42)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    profiles = subparsers.add_parser('profiles', help='compare SQLite connection profiles')
+    profiles.add_argument('--profile', action='append', choices=list(CONNECTION_PROFILES),
+                          help='profile to run (repeatable, default: all)')
+    profiles.add_argument('--products', type=int, default=200)
+    profiles.add_argument('--sales', type=int, default=20000)
+    profiles.add_argument('--checkouts', type=int, default=300)
+    profiles.add_argument('--repeat', type=int, default=5)
+    profiles.set_defaults(func=bench_profiles)
+
+    read_models = subparsers.add_parser('read-models', help='ORM objects vs projected rows')
+    read_models.add_argument('--products', type=int, default=50000)
+    read_models.set_defaults(func=bench_read_models)
+
+    search = subparsers.add_parser('search', help='full-text search latency')
+    search.add_argument('--rows', type=int, default=100000)
+    search.add_argument('--repeat', type=int, default=5)
+    search.set_defaults(func=bench_search)
+
+    serials = subparsers.add_parser('serials', help='serial number resolution')
+    serials.add_argument('--units', type=int, default=1000000)
+    serials.add_argument('--products', type=int, default=1000)
+    serials.add_argument('--lookups', type=int, default=100000)
+    serials.set_defaults(func=bench_serials)
+
+    product_cache = subparsers.add_parser('product-cache', help='get_product with and without the cache')
+    product_cache.add_argument('--products', type=int, default=1000)
+    product_cache.add_argument('--lookups', type=int, default=20000)
+    product_cache.add_argument('--commit-every', type=int, default=5)
+    product_cache.add_argument('--batch', type=int, default=200)
+    product_cache.set_defaults(func=bench_product_cache)
+
+    stress = subparsers.add_parser('checkout-stress', help='concurrent checkouts from several processes')
+    stress.add_argument('--processes', type=int, default=4)
+    stress.add_argument('--checkouts', type=int, default=300, help='per process')
+    stress.add_argument('--products', type=int, default=20)
+    stress.add_argument('--stock', type=int, default=None,
+                        help='store units per product (default: half the expected demand)')
+    stress.set_defaults(func=bench_checkout_stress)
+
+    restock = subparsers.add_parser('restock', help='multi-product warehouse to store transfer')
+    restock.add_argument('--products', type=int, default=2000)
+    restock.add_argument('--skus', type=int, default=40)
+    restock.add_argument('--units', type=int, default=25, help='units moved per SKU')
+    restock.set_defaults(func=bench_restock)
+
+    task_sweep = subparsers.add_parser('task-sweep', help='restock/assembly task generation')
+    task_sweep.add_argument('--skus', type=int, default=10000, help='low-stock products')
+    task_sweep.add_argument('--baseline-skus', type=int, default=1000,
+                            help='low-stock products for the per-product sweep')
+    task_sweep.set_defaults(func=bench_task_sweep)
+
+    ledger = subparsers.add_parser('ledger', help='stock as of a past date')
+    ledger.add_argument('--products', type=int, default=1000)
+    ledger.add_argument('--days', type=int, default=90)
+    ledger.add_argument('--movements', type=int, default=2000, help='per day')
+    ledger.add_argument('--repeat', type=int, default=10)
+    ledger.set_defaults(func=bench_ledger)
+
+    inventory_table = subparsers.add_parser('inventory-table', help='inventory page refresh')
+    inventory_table.add_argument('--products', type=int, default=50000)
+    inventory_table.add_argument('--pages', type=int, default=10, help='pages fetched by scrolling')
+    inventory_table.set_defaults(func=bench_inventory_table)
+
+    action_buttons = subparsers.add_parser('action-buttons', help='table refresh with row buttons')
+    action_buttons.add_argument('--rows', type=int, default=10000)
+    action_buttons.add_argument('--refreshes', type=int, default=3)
+    action_buttons.set_defaults(func=bench_action_buttons)
+
+    dashboard_stats = subparsers.add_parser('dashboard-stats', help='dashboard KPI queries')
+    dashboard_stats.add_argument('--products', type=int, default=50000)
+    dashboard_stats.add_argument('--sales', type=int, default=20000)
+    dashboard_stats.set_defaults(func=bench_dashboard_stats)
+
+    change_feed = subparsers.add_parser('change-feed', help='cross-process change detection')
+    change_feed.add_argument('--products', type=int, default=50000)
+    change_feed.add_argument('--polls', type=int, default=10000)
+    change_feed.add_argument('--commits', type=int, default=200)
+    change_feed.set_defaults(func=bench_change_feed)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+if __name__ == '__main__':
+    main()
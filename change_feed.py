@@ -0,0 +1,102 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from database import CHANGE_LOG_MODELS, DataChange, get_engine
+
+class ChangeFeed:
+    """Reports the rows committed to a database file since the last poll.
+
+    SQLite bumps PRAGMA data_version on a connection whenever any other
+    connection commits to the file, from this process or another one. The
+    feed keeps a connection of its own for that PRAGMA, so an idle poll
+    reads no tables; only when the version moves are the new data_changes
+    rows read.
+    """
+
+    # A poll that finds more new rows than this reports everything changed
+    MAX_BATCH = 5000
+
+    def __init__(self, db_path='inventory.db'):
+        self.conn = get_engine(db_path).connect()
+        try:
+            self.data_version = self._data_version()
+            # Start from now: whoever opens the feed has just loaded its data
+            self.last_id = self.conn.execute(select(func.coalesce(func.max(DataChange.id), 0))).scalar()
+        finally:
+            self.conn.rollback()
+
+    def _data_version(self):
+        return self.conn.exec_driver_sql('PRAGMA data_version').scalar()
+
+    def poll(self):
+        """Return {table name: set of row ids} committed since the last poll.
+
+        The result is empty when nothing was committed, and None when too
+        much changed to list: more than MAX_BATCH rows, or rows the feed
+        hadn't read yet were pruned from the log.
+        """
+        try:
+            version = self._data_version()
+            if version == self.data_version:
+                return {}
+            rows = self.conn.execute(
+                select(DataChange.id, DataChange.table_name, DataChange.row_id)
+                .where(DataChange.id > self.last_id)
+                .order_by(DataChange.id).limit(self.MAX_BATCH + 1)
+            ).all()
+            newest = self.conn.execute(select(func.max(DataChange.id))).scalar() \
+                if len(rows) > self.MAX_BATCH else None
+        finally:
+            self.conn.rollback()
+
+        self.data_version = version
+        if not rows:
+            return {}
+        # Log ids have no gaps, so a jump means unread rows were pruned
+        if newest is not None or rows[0].id != self.last_id + 1:
+            self.last_id = newest or rows[-1].id
+            return None
+        self.last_id = rows[-1].id
+        changed = {}
+        for row in rows:
+            changed.setdefault(row.table_name, set()).add(row.row_id)
+        return changed
+
+    def close(self):
+        self.conn.close()
+
+class ChangeWatcher(QObject):
+    """Polls a ChangeFeed on the GUI thread and brings db up to date.
+
+    Changed rows are synced into db (see DatabaseManager.sync_changes)
+    before changed(table_name, ids) is emitted, once per changed table per
+    poll. ids is None when the feed lost track and the whole table should
+    be reloaded. Commits made by this process show up as well, since they
+    go through other connections than the feed's.
+    """
+    changed = pyqtSignal(str, object)
+
+    def __init__(self, db, interval_ms, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.feed = ChangeFeed(db.db_path)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(interval_ms)
+
+    def poll(self):
+        try:
+            changed = self.feed.poll()
+        except OperationalError:
+            return  # locked by a writer; the next tick tries again
+        if changed == {}:
+            return
+        self.db.sync_changes(changed)
+        if changed is None:
+            changed = dict.fromkeys(CHANGE_LOG_MODELS)
+        for table_name, ids in changed.items():
+            self.changed.emit(table_name, ids)
+
+    def stop(self):
+        self.timer.stop()
+        self.feed.close()
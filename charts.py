@@ -4,13 +4,40 @@ from PyQt6.QtGui import QFont, QPainter
 from PyQt6.QtCharts import QChart, QChartView, QBarSeries, QBarSet, QBarCategoryAxis, QValueAxis, QPieSeries
 from PyQt6.QtCharts import QLineSeries, QDateTimeAxis
 from datetime import datetime, timedelta
-import pandas as pd
-import numpy as np
+from async_db import AsyncDataAccess
+from read_models import ReadModels
+
+def load_daily_revenue(db, start_date, end_date):
+    """(day, revenue) pairs from the sales rollup."""
+    return [(row.day, row.revenue) for row in db.get_daily_sales(start_date.date(), end_date.date())]
+
+def load_category_counts(db, start_date, end_date):
+    """(category, product count) pairs."""
+    return db.get_category_counts()
+
+def load_top_margins(db, start_date, end_date):
+    """(name, margin %) for the 10 products with the highest profit margin."""
+    margins = []
+    for product in ReadModels(db).product_rows():
+        if product.selling_price > 0 and product.purchase_price > 0:
+            margin = (product.selling_price - product.purchase_price) / product.selling_price * 100
+            margins.append((product.name, margin))
+    margins.sort(key=lambda x: x[1], reverse=True)
+    return margins[:10]
 
 class ChartWidget(QWidget):
+    # chart type -> function(db, start_date, end_date) run on a worker thread
+    CHART_LOADERS = {
+        'Sales Trend': load_daily_revenue,
+        'Product Categories': load_category_counts,
+        'Revenue by Day': load_daily_revenue,
+        'Profit Margin': load_top_margins,
+    }
+    
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db = db_manager
+        self.async_db = AsyncDataAccess(db_manager.db_path, parent=self)
         self.setup_ui()
     
     def setup_ui(self):
@@ -34,6 +61,14 @@ class ChartWidget(QWidget):
         
         layout.addLayout(selection_layout)
         
+        # Loading indicator, visible while chart data is fetched
+        self.loading_label = QLabel('Loading chart data...')
+        self.loading_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.loading_label.hide()
+        self.async_db.loading_changed.connect(
+            lambda key, loading: self.loading_label.setVisible(loading))
+        layout.addWidget(self.loading_label)
+        
         # Chart view
         self.chart_view = QChartView()
         self.chart_view.setRenderHint(QPainter.RenderHint.Antialiasing)
@@ -45,19 +80,30 @@ class ChartWidget(QWidget):
     def update_chart(self):
         chart_type = self.chart_type_combo.currentText()
         period = self.period_combo.currentText()
-        
+        start_date, end_date = self.get_date_range(period)
+        loader = self.CHART_LOADERS[chart_type]
+        
+        # Fetch data off the GUI thread; a newer request replaces this one
+        self.async_db.submit(
+            'chart',
+            lambda db: loader(db, start_date, end_date),
+            lambda data: self.show_chart(chart_type, period, data),
+            self.show_error
+        )
+    
+    def show_chart(self, chart_type, period, data):
         # Clear previous chart
         self.chart_view.chart().deleteLater() if self.chart_view.chart() else None
         
         # Create new chart based on selection
         if chart_type == 'Sales Trend':
-            chart = self.create_sales_trend_chart(period)
+            chart = self.create_sales_trend_chart(period, data)
         elif chart_type == 'Product Categories':
-            chart = self.create_category_chart(period)
+            chart = self.create_category_chart(period, data)
         elif chart_type == 'Revenue by Day':
-            chart = self.create_revenue_chart(period)
+            chart = self.create_revenue_chart(period, data)
         elif chart_type == 'Profit Margin':
-            chart = self.create_profit_margin_chart(period)
+            chart = self.create_profit_margin_chart(period, data)
         
         # Apply theme and set chart
         chart.setTheme(QChart.ChartTheme.ChartThemeBlueIcy)
@@ -67,6 +113,11 @@ class ChartWidget(QWidget):
         
         self.chart_view.setChart(chart)
     
+    def show_error(self, error):
+        chart = QChart()
+        chart.setTitle(f"Could not load chart data: {error}")
+        self.chart_view.setChart(chart)
+    
     def get_date_range(self, period):
         end_date = datetime.now()
         
@@ -81,39 +132,25 @@ class ChartWidget(QWidget):
         
         return start_date, end_date
     
-    def create_sales_trend_chart(self, period):
-        start_date, end_date = self.get_date_range(period)
-        
-        # Get sales data
-        sales = self.db.get_sales_report(start_date, end_date)
-        
+    def create_sales_trend_chart(self, period, daily_sales):
         # Process data for chart
-        if not sales:
+        if not daily_sales:
             # Create empty chart if no data
             chart = QChart()
             chart.setTitle("No Sales Data Available")
             return chart
         
-        # Group sales by date
-        sales_by_date = {}
-        for sale in sales:
-            date_key = sale.sale_date.date()
-            if date_key in sales_by_date:
-                sales_by_date[date_key] += sale.total_amount
-            else:
-                sales_by_date[date_key] = sale.total_amount
-        
         # Create line series
         series = QLineSeries()
         series.setName("Daily Sales")
         
         # Add data points
         dates = []
-        for date, amount in sorted(sales_by_date.items()):
+        for day, revenue in daily_sales:
             # Convert to milliseconds since epoch for QDateTime
-            timestamp = datetime.combine(date, datetime.min.time()).timestamp() * 1000
-            series.append(timestamp, amount)
-            dates.append(date)
+            timestamp = datetime.combine(day, datetime.min.time()).timestamp() * 1000
+            series.append(timestamp, revenue)
+            dates.append(day)
         
         # Create chart
         chart = QChart()
@@ -137,20 +174,12 @@ class ChartWidget(QWidget):
         
         return chart
     
-    def create_category_chart(self, period):
-        start_date, end_date = self.get_date_range(period)
-        
-        # Get all products
-        products = self.db.get_all_products()
-        
-        # Group products by category
+    def create_category_chart(self, period, category_counts):
+        # Merge products without a category
         categories = {}
-        for product in products:
-            category = product.category or "Uncategorized"
-            if category in categories:
-                categories[category] += 1
-            else:
-                categories[category] = 1
+        for category, count in category_counts:
+            category = category or "Uncategorized"
+            categories[category] = categories.get(category, 0) + count
         
         # Create pie series
         series = QPieSeries()
@@ -168,14 +197,9 @@ class ChartWidget(QWidget):
         
         return chart
     
-    def create_revenue_chart(self, period):
-        start_date, end_date = self.get_date_range(period)
-        
-        # Get sales data
-        sales = self.db.get_sales_report(start_date, end_date)
-        
+    def create_revenue_chart(self, period, daily_sales):
         # Process data for chart
-        if not sales:
+        if not daily_sales:
             chart = QChart()
             chart.setTitle("No Revenue Data Available")
             return chart
@@ -184,9 +208,9 @@ class ChartWidget(QWidget):
         days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         revenue_by_day = {day: 0 for day in days_of_week}
         
-        for sale in sales:
-            day_name = days_of_week[sale.sale_date.weekday()]
-            revenue_by_day[day_name] += sale.total_amount
+        for day, revenue in daily_sales:
+            day_name = days_of_week[day.weekday()]
+            revenue_by_day[day_name] += revenue
         
         # Create bar set
         bar_set = QBarSet("Revenue")
@@ -218,24 +242,7 @@ class ChartWidget(QWidget):
         
         return chart
     
-    def create_profit_margin_chart(self, period):
-        # Get all products
-        products = self.db.get_all_products()
-        
-        # Calculate profit margins
-        margins = []
-        names = []
-        
-        # Get top 10 products by margin
-        for product in products:
-            if product.selling_price > 0 and product.purchase_price > 0:
-                margin = (product.selling_price - product.purchase_price) / product.selling_price * 100
-                margins.append((product.name, margin))
-        
-        # Sort by margin and take top 10
-        margins.sort(key=lambda x: x[1], reverse=True)
-        top_margins = margins[:10]
-        
+    def create_profit_margin_chart(self, period, top_margins):
         # Create bar set
         bar_set = QBarSet("Profit Margin %")
         names = []
@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+def load_dashboard_stats(db, today=None):
+    """Every dashboard KPI by name, one aggregate query each."""
+    today = today or date.today()
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return {
+        'total_products': db.count_products(),
+        'low_stock_items': db.count_alerted_products('low_stock'),
+        'today_sales': db.get_sales_totals(today, today)['revenue'],
+        'monthly_revenue': db.get_sales_totals(month_start, month_end)['revenue'],
+    }
+
+class DashboardStats(QObject):
+    """Keeps the dashboard KPIs current without blocking the GUI thread.
+
+    The stats are recomputed on a worker thread every interval_ms and
+    shortly after each refresh_soon() call. changed(name, value)
+    is emitted only for values that differ from the last ones loaded.
+    """
+    changed = pyqtSignal(str, object)
+
+    # refresh_soon() calls closer together than this share one refresh
+    DEBOUNCE_MS = 300
+
+    def __init__(self, async_db, interval_ms, parent=None):
+        super().__init__(parent)
+        self.async_db = async_db
+        self.values = {}
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(interval_ms)
+        self._pending = QTimer(self)
+        self._pending.setSingleShot(True)
+        self._pending.setInterval(self.DEBOUNCE_MS)
+        self._pending.timeout.connect(self.refresh)
+
+    def refresh(self):
+        self.async_db.submit('dashboard-stats', load_dashboard_stats, self._update)
+
+    def refresh_soon(self):
+        """Refresh after DEBOUNCE_MS, folding in any other requests meanwhile."""
+        self._pending.start()
+
+    def stop(self):
+        self.timer.stop()
+        self._pending.stop()
+
+    def _update(self, values):
+        for name, value in values.items():
+            if name not in self.values or self.values[name] != value:
+                self.values[name] = value
+                self.changed.emit(name, value)
@@ -1,18 +1,38 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Index, func, insert, select, update, delete, tuple_, table, column, bindparam, literal, literal_column
 from sqlalchemy.types import Text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
-from datetime import datetime
+from sqlalchemy.orm import relationship, sessionmaker, scoped_session, joinedload, selectinload
+from sqlalchemy.orm.util import identity_key
+from datetime import datetime, timedelta
+import os
+import re
+import threading
+from collections import namedtuple
+from serial_index import SerialIndex
+from product_cache import ProductCache
+from task_rules import TaskRule, TaskRuleEngine
+from stock_ledger import StockLedger
 
 Base = declarative_base()
 
+def counter_total(store_quantity, warehouse_quantity):
+    """Store plus warehouse stock, with NULL counters read as 0.
+    
+    The 0 is inlined rather than bound, so queries render the same SQL as
+    the ix_products_total_quantity expression index and can use it.
+    """
+    zero = literal_column('0')
+    return func.coalesce(store_quantity, zero) + func.coalesce(warehouse_quantity, zero)
+
 class Product(Base):
     __tablename__ = 'products'
     
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     description = Column(String)
-    category = Column(String)
+    category = Column(String, index=True)
     purchase_price = Column(Float, nullable=False)
     selling_price = Column(Float, nullable=False)
     store_quantity = Column(Integer, default=0)
@@ -27,6 +47,17 @@ class Product(Base):
     supplier = relationship('Supplier', backref='products')
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    __table_args__ = (
+        # Range lookups for InventoryManager's fixed-threshold suggestions
+        Index('ix_products_store_quantity', store_quantity),
+        Index('ix_products_total_quantity', counter_total(store_quantity, warehouse_quantity)),
+        # Products changed since a reconciliation watermark
+        Index('ix_products_updated_at', updated_at),
+    )
+
+# Total stock of a product; use it wherever ix_products_total_quantity should apply
+PRODUCT_TOTAL_QUANTITY = counter_total(Product.store_quantity, Product.warehouse_quantity)
 
 class RepairTask(Base):
     __tablename__ = 'repair_tasks'
@@ -42,12 +73,16 @@ class RepairTask(Base):
     total_cost = Column(Float, default=0.0)
     assigned_to = Column(String)  # Employee name
     customer = relationship('Customer', backref='repair_tasks')
+    
+    __table_args__ = (
+        Index('ix_repair_tasks_status_assigned_to', 'status', 'assigned_to'),
+    )
 
 class RepairPart(Base):
     __tablename__ = 'repair_parts'
     
     id = Column(Integer, primary_key=True)
-    repair_task_id = Column(Integer, ForeignKey('repair_tasks.id'))
+    repair_task_id = Column(Integer, ForeignKey('repair_tasks.id'), index=True)
     product_id = Column(Integer, ForeignKey('products.id'))
     quantity = Column(Integer, default=1)
     unit_price = Column(Float, nullable=False)
@@ -59,7 +94,7 @@ class Customer(Base):
     __tablename__ = 'customers'
     
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     phone = Column(String)
     email = Column(String)
     address = Column(String)
@@ -71,24 +106,130 @@ class Sale(Base):
     __tablename__ = 'sales'
     
     id = Column(Integer, primary_key=True)
-    customer_id = Column(Integer, ForeignKey('customers.id'))
+    customer_id = Column(Integer, ForeignKey('customers.id'), index=True)
     total_amount = Column(Float, nullable=False)
     tax_amount = Column(Float, nullable=False)
-    sale_date = Column(DateTime, default=datetime.now)
+    sale_date = Column(DateTime, default=datetime.now, index=True)
     customer = relationship('Customer', backref='sales')
 
 class SaleItem(Base):
     __tablename__ = 'sale_items'
     
     id = Column(Integer, primary_key=True)
-    sale_id = Column(Integer, ForeignKey('sales.id'))
-    product_id = Column(Integer, ForeignKey('products.id'))
+    sale_id = Column(Integer, ForeignKey('sales.id'), index=True)
+    product_id = Column(Integer, ForeignKey('products.id'), index=True)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Float, nullable=False)
     subtotal = Column(Float, nullable=False)
     sale = relationship('Sale', backref='items')
     product = relationship('Product')
 
+class SalesDailyRollup(Base):
+    """Per-day sales totals, kept current by DatabaseManager.add_sale."""
+    __tablename__ = 'sales_daily_rollup'
+    
+    day = Column(Date, primary_key=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    tax = Column(Float, nullable=False, default=0.0)
+    sale_count = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+
+class StockReservation(Base):
+    """Store stock held by an open cart until checkout or expiry."""
+    __tablename__ = 'stock_reservations'
+    
+    id = Column(Integer, primary_key=True)
+    cart_id = Column(String, nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    serial_number = Column(String, index=True)
+    created_at = Column(DateTime, default=datetime.now)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        Index('ix_stock_reservations_product_expires', 'product_id', 'expires_at'),
+    )
+
+class StockAlert(Base):
+    """A product currently in one of the STOCK_ALERTS states.
+    
+    Maintained by SQLite triggers on products, never written by the app.
+    """
+    __tablename__ = 'stock_alerts'
+    
+    kind = Column(String, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id'), primary_key=True)
+    raised_at = Column(DateTime)
+    product = relationship('Product')
+
+class StockAlertEvent(Base):
+    """History of stock alerts being raised and cleared."""
+    __tablename__ = 'stock_alert_events'
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    product_id = Column(Integer, nullable=False, index=True)
+    event = Column(String, nullable=False)  # raised, cleared
+    created_at = Column(DateTime, nullable=False, index=True)
+
+class StockMovement(Base):
+    """Append-only ledger of stock counter changes."""
+    __tablename__ = 'stock_movements'
+    
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    location = Column(String, nullable=False)  # store, warehouse
+    change = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)  # initial, sale, transfer, assembly, received, adjustment, deleted
+    reference = Column(String)  # e.g. sale:42
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_stock_movements_product_created', 'product_id', 'created_at'),
+    )
+
+class StockSnapshot(Base):
+    """Per-product stock counters at a checkpoint.
+    
+    Every row of a checkpoint shares taken_at and last_movement_id, the
+    newest ledger row the counters already include.
+    """
+    __tablename__ = 'stock_snapshots'
+    
+    id = Column(Integer, primary_key=True)
+    taken_at = Column(DateTime, nullable=False)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    store_quantity = Column(Integer, nullable=False)
+    warehouse_quantity = Column(Integer, nullable=False)
+    last_movement_id = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_stock_snapshots_taken_product', 'taken_at', 'product_id'),
+    )
+
+class ReconciliationRun(Base):
+    """One pass of reconciliation.StockReconciler."""
+    __tablename__ = 'reconciliation_runs'
+    
+    id = Column(Integer, primary_key=True)
+    started_at = Column(DateTime, nullable=False, index=True)
+    since = Column(DateTime)  # watermark; None for a full pass
+    products_checked = Column(Integer, default=0)
+    discrepancies = Column(Integer, default=0)
+    applied = Column(Boolean, default=False)
+
+class DataChange(Base):
+    """Rows of CHANGE_LOG_MODELS tables changed by a commit, in commit order.
+    
+    Appended by SQLite triggers, so writes from every process and tool are
+    logged; change_feed.ChangeFeed reads it to see what others changed.
+    """
+    __tablename__ = 'data_changes'
+    
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+
 class Supplier(Base):
     __tablename__ = 'suppliers'
     
@@ -117,6 +258,11 @@ class TodoTask(Base):
     
     # Relationships
     product = relationship('Product', backref='todo_tasks')
+    
+    __table_args__ = (
+        Index('ix_todo_tasks_status_type_product', 'status', 'task_type', 'product_id'),
+        Index('ix_todo_tasks_product_id', 'product_id'),
+    )
 
 class ProductItem(Base):
     __tablename__ = 'product_items'
@@ -134,17 +280,533 @@ class ProductItem(Base):
     
     # Relationships
     product = relationship('Product', backref='items')
+    
+    __table_args__ = (
+        Index('ix_product_items_product_location_status', 'product_id', 'location', 'status'),
+        Index('ix_product_items_product_item_number', 'product_id', 'item_number'),
+        Index('ix_product_items_updated_at', 'updated_at'),
+    )
+
+# Bump when the schema changes and register the upgrade step in MIGRATIONS.
+# The version is stamped into the database file with PRAGMA user_version.
+SCHEMA_VERSION = 12
+
+def create_declared_indexes(conn):
+    """Create any index declared on the models that the database lacks."""
+    # Checked by name: reflection can't see expression indexes
+    existing = set(conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+
+def rebuild_sales_rollup(conn):
+    """Recompute sales_daily_rollup from the full sales history."""
+    units_per_sale = select(
+        SaleItem.sale_id,
+        func.sum(SaleItem.quantity).label('units')
+    ).group_by(SaleItem.sale_id).subquery()
+    day = func.date(Sale.sale_date)
+    totals = select(
+        day,
+        func.sum(Sale.total_amount),
+        func.sum(Sale.tax_amount),
+        func.count(Sale.id),
+        func.coalesce(func.sum(units_per_sale.c.units), 0)
+    ).select_from(Sale).outerjoin(
+        units_per_sale, units_per_sale.c.sale_id == Sale.id
+    ).where(Sale.sale_date.isnot(None)).group_by(day)
+    
+    conn.execute(delete(SalesDailyRollup))
+    result = conn.execute(insert(SalesDailyRollup).from_select(
+        ['day', 'revenue', 'tax', 'sale_count', 'units'], totals))
+    return result.rowcount
+
+# Full-text search: base table -> {indexed column: bm25 weight}. Each gets
+# an external content FTS5 table named <table>_fts, kept in sync by triggers.
+SEARCH_INDEXES = {
+    'products': {'name': 10.0, 'description': 1.0, 'category': 2.0, 'supplier_info': 1.0},
+    'customers': {'name': 10.0, 'phone': 5.0, 'email': 5.0},
+    'todo_tasks': {'description': 1.0},
+    'repair_tasks': {'description': 1.0},
+}
+
+def create_search_indexes(conn):
+    """Create the FTS5 tables and sync triggers, then index existing rows."""
+    for table_name, columns in SEARCH_INDEXES.items():
+        fts = f'{table_name}_fts'
+        names = ', '.join(columns)
+        new_values = ', '.join(f'new.{name}' for name in columns)
+        old_values = ', '.join(f'old.{name}' for name in columns)
+        # prefix='2 3' keeps extra indexes for short prefixes so "tri*" stays fast
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, "
+            f"content='{table_name}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+            f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END")
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END")
+        # Only edits to indexed columns touch the index, not stock updates
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table_name} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END")
+        conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+def search_table(table_name):
+    """Table clause for a base table's FTS5 index, for use in joins."""
+    fts = f'{table_name}_fts'
+    return table(fts, column('rowid'), column(fts))
+
+def fts_query(text):
+    """Turn user input into an FTS5 query where every word is a prefix match.
+    
+    Returns None when the input has no searchable words.
+    """
+    words = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+def search_filter(query, model, text, limit):
+    """Restrict an ORM or Core query on model to the best ``limit`` rows
+    matching text, best first.
+    
+    Ranking runs inside the FTS5 table before the join, so only the top
+    matches are looked up in the base table.
+    """
+    fts = search_table(model.__tablename__)
+    weights = SEARCH_INDEXES[model.__tablename__].values()
+    rank = func.bm25(fts.c[fts.name], *weights).label('rank')
+    ranked = select(fts.c.rowid, rank)\
+        .where(fts.c[fts.name].op('MATCH')(fts_query(text)))\
+        .order_by(rank).limit(limit).subquery()
+    return query.join(ranked, ranked.c.rowid == model.id).order_by(ranked.c.rank)
+
+# Stock alert kind -> SQL condition on a products row, written against {row}
+# so the triggers can check it for both old and new.
+STOCK_ALERTS = {
+    # store stock or total stock at or below the reorder threshold
+    'low_stock': '({row}.store_quantity <= {row}.reorder_threshold OR '
+                 '{row}.store_quantity + {row}.warehouse_quantity <= {row}.reorder_threshold)',
+    # total stock at or below the threshold: more units need assembling
+    'assembly': '({row}.store_quantity + {row}.warehouse_quantity <= {row}.reorder_threshold)',
+    # store stock at or below the threshold with units left in the warehouse
+    'restock': '({row}.store_quantity <= {row}.reorder_threshold AND {row}.warehouse_quantity > 0)',
+}
+
+# Product columns the STOCK_ALERTS conditions read
+STOCK_ALERT_COLUMNS = ('store_quantity', 'warehouse_quantity', 'reorder_threshold')
+
+def create_stock_alerts(conn):
+    """Create the triggers that keep stock_alerts current, then fill it.
+    
+    Triggers only fire when a condition flips, so ordinary stock updates
+    cost a WHEN check per kind. Each flip is logged in stock_alert_events.
+    """
+    now = "datetime('now', 'localtime')"
+    quantities = ', '.join(STOCK_ALERT_COLUMNS)
+    for kind, condition in STOCK_ALERTS.items():
+        new, old = condition.format(row='new'), condition.format(row='old')
+        raise_alert = (
+            f"INSERT OR IGNORE INTO stock_alerts(kind, product_id, raised_at) VALUES ('{kind}', new.id, {now}); "
+            f"INSERT INTO stock_alert_events(kind, product_id, event, created_at) VALUES ('{kind}', new.id, 'raised', {now});")
+        clear_alert = (
+            f"DELETE FROM stock_alerts WHERE kind = '{kind}' AND product_id = {{row}}.id; "
+            f"INSERT INTO stock_alert_events(kind, product_id, event, created_at) VALUES ('{kind}', {{row}}.id, 'cleared', {now});")
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS stock_alerts_{kind}_ai AFTER INSERT ON products "
+            f"WHEN {new} BEGIN {raise_alert} END")
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS stock_alerts_{kind}_raise AFTER UPDATE OF {quantities} ON products "
+            f"WHEN {new} AND NOT coalesce({old}, 0) BEGIN {raise_alert} END")
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS stock_alerts_{kind}_clear AFTER UPDATE OF {quantities} ON products "
+            f"WHEN {old} AND NOT coalesce({new}, 0) BEGIN {clear_alert.format(row='new')} END")
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS stock_alerts_{kind}_ad AFTER DELETE ON products "
+            f"WHEN {old} BEGIN {clear_alert.format(row='old')} END")
+    
+    conn.execute(delete(StockAlert))
+    for kind, condition in STOCK_ALERTS.items():
+        conn.exec_driver_sql(
+            f"INSERT INTO stock_alerts(kind, product_id, raised_at) "
+            f"SELECT '{kind}', id, {now} FROM products WHERE {condition.format(row='products')}")
+
+class AlertTaskRule(TaskRule):
+    """Creates a task for products in a stock alert that have no pending
+    task of the rule's type. Subclasses build the task row.
+    """
+    alert_kind = None
+    
+    def new_tasks(self, session, product_ids=None):
+        pending = select(TodoTask.id).where(
+            TodoTask.product_id == Product.id,
+            TodoTask.task_type == self.task_type,
+            TodoTask.status == 'pending'
+        ).exists()
+        query = select(Product.id, Product.name, Product.store_quantity,
+                       Product.warehouse_quantity, Product.reorder_threshold)\
+            .join(StockAlert, StockAlert.product_id == Product.id)\
+            .where(StockAlert.kind == self.alert_kind, ~pending)
+        if product_ids is not None:
+            query = query.where(Product.id.in_(product_ids))
+        rows = (self.task_row(product) for product in session.execute(query))
+        return [row for row in rows if row]
+    
+    def task_row(self, product):
+        """Return the task row dict for a product, or None to skip it."""
+        raise NotImplementedError
+
+class RestockRule(AlertTaskRule):
+    """Move units from the warehouse when store stock is low."""
+    task_type = 'restock'
+    alert_kind = 'restock'
+    
+    def task_row(self, product):
+        needed_in_store = max(product.reorder_threshold - product.store_quantity, 0)
+        quantity_to_move = min(needed_in_store, product.warehouse_quantity)
+        if quantity_to_move <= 0:
+            return None
+        return {
+            'task_type': 'restock',
+            'description': f"Move {quantity_to_move} units of '{product.name}' from warehouse to store",
+            'product_id': product.id,
+            'quantity_needed': quantity_to_move,
+            'priority': 'high' if product.store_quantity <= 2 else 'medium'
+        }
+
+class AssemblyRule(AlertTaskRule):
+    """Assemble more units when total stock is low."""
+    task_type = 'assembly'
+    alert_kind = 'assembly'
+    
+    def task_row(self, product):
+        total_quantity = product.store_quantity + product.warehouse_quantity
+        # Order 5 extra units above the threshold
+        assembly_qty = max(product.reorder_threshold - total_quantity + 5, 0)
+        return {
+            'task_type': 'assembly',
+            'description': f"Assemble {assembly_qty} units of '{product.name}' for warehouse stock",
+            'product_id': product.id,
+            'quantity_needed': assembly_qty,
+            'priority': 'medium'
+        }
+
+def default_task_rules():
+    return [RestockRule(), AssemblyRule()]
+
+# Product counter per ledger location
+STOCK_LOCATIONS = {'store': 'store_quantity', 'warehouse': 'warehouse_quantity'}
+
+# How often MainWindow checkpoints stock counters into stock_snapshots
+STOCK_SNAPSHOT_INTERVAL = timedelta(days=1)
+
+# Daily snapshots are kept this long; older ones are thinned to the first
+# of each month by prune_stock_snapshots()
+STOCK_SNAPSHOT_RETENTION = timedelta(days=90)
+
+def stock_snapshot_insert(taken_at):
+    """INSERT ... SELECT copying every product's counters into a checkpoint."""
+    last_movement_id = select(func.coalesce(func.max(StockMovement.id), 0)).scalar_subquery()
+    return insert(StockSnapshot).from_select(
+        ['taken_at', 'product_id', 'store_quantity', 'warehouse_quantity', 'last_movement_id'],
+        select(literal(taken_at, DateTime), Product.id,
+               func.coalesce(Product.store_quantity, 0),
+               func.coalesce(Product.warehouse_quantity, 0),
+               last_movement_id))
+
+def take_opening_stock_snapshot(conn):
+    """Checkpoint the current counters; the ledger starts from here."""
+    conn.execute(stock_snapshot_insert(datetime.now()))
+
+# Models whose changes are logged in data_changes for other processes, by table
+CHANGE_LOG_MODELS = {model.__tablename__: model for model in (
+    Product, ProductItem, Customer, Sale, TodoTask, RepairTask)}
+
+# data_changes rows kept by prune_data_changes(); a feed that falls further
+# behind than this reloads everything instead
+DATA_CHANGE_LOG_SIZE = 50000
+
+def create_change_log(conn):
+    """Create the triggers that append changed rows to data_changes."""
+    for table_name in CHANGE_LOG_MODELS:
+        for operation, row in (('insert', 'new'), ('update', 'new'), ('delete', 'old')):
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS data_changes_{table_name}_{operation} "
+                f"AFTER {operation.upper()} ON {table_name} BEGIN "
+                f"INSERT INTO data_changes(table_name, row_id) VALUES ('{table_name}', {row}.id); END")
+
+def recreate_total_quantity_index(conn):
+    """Rebuild ix_products_total_quantity over NULL-safe counters."""
+    conn.exec_driver_sql('DROP INDEX IF EXISTS ix_products_total_quantity')
+    create_declared_indexes(conn)
+
+# version -> callable(connection) upgrading an existing database to that version
+MIGRATIONS = {
+    2: create_declared_indexes,
+    3: rebuild_sales_rollup,
+    4: create_search_indexes,
+    # 5: stock_reservations, created by create_all
+    6: create_declared_indexes,
+    7: create_stock_alerts,
+    8: take_opening_stock_snapshot,
+    9: create_declared_indexes,
+    10: create_declared_indexes,
+    11: create_change_log,
+    12: recreate_total_quantity_index,
+}
+
+# Named PRAGMA sets applied to every new SQLite connection.
+CONNECTION_PROFILES = {
+    # Library defaults: rollback journal, synchronous=FULL, small page cache
+    'default': {},
+    # WAL lets readers run during checkout commits; NORMAL only fsyncs at
+    # checkpoints, which is still crash-safe in WAL mode
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,  # negative means KiB, so ~64MB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,  # ms to wait on a locked database
+    },
+    # WAL with a full fsync on every commit
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+}
+
+DEFAULT_PROFILE = os.environ.get('INVENTORY_DB_PROFILE', 'performance')
+
+def apply_connection_profile(engine, profile=None):
+    """Run the profile's PRAGMAs on every connection the engine opens."""
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    pragmas = CONNECTION_PROFILES[profile] if isinstance(profile, str) else dict(profile)
+    if not pragmas:
+        return pragmas
+    
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    
+    return pragmas
+
+class InsufficientStockError(ValueError):
+    """A checkout asked for more store stock than is left."""
+    def __init__(self, shortages):
+        # product id -> store quantity left (None for an unknown product)
+        self.shortages = shortages
+        details = ', '.join(
+            f'product {product_id} has {available}' if available is not None
+            else f'product {product_id} does not exist'
+            for product_id, available in shortages.items())
+        super().__init__(f"Insufficient store stock: {details}")
+
+class ItemReservedError(ValueError):
+    """A scanned unit is already held by another cart."""
+    def __init__(self, serial_number):
+        self.serial_number = serial_number
+        super().__init__(f"Item {serial_number} is already in a cart")
+
+# How long a scanned item is held for its cart
+RESERVATION_TTL = timedelta(minutes=30)
+
+# Serial given to an item added without one
+ITEM_SERIAL_FORMAT = 'P{product_id}I{item_number}'
+
+# Times add_product_items renumbers a batch that collided with items
+# another connection numbered at the same time
+ITEM_NUMBER_ATTEMPTS = 3
+
+def reserved_units(product_id, now, cart_id=None):
+    """Scalar subquery: units of a product held by unexpired reservations,
+    leaving out cart_id's own.
+    """
+    reservations = StockReservation.__table__
+    held = select(func.coalesce(func.sum(reservations.c.quantity), 0))\
+        .where(reservations.c.product_id == product_id)\
+        .where(reservations.c.expires_at > now)
+    if cart_id is not None:
+        held = held.where(reservations.c.cart_id != cart_id)
+    return held.scalar_subquery()
+
+# Guarded decrement used by checkout; matches no row when the store stock
+# not held by other carts is short. Pass cart_id='' for a sale without a cart.
+DECREMENT_STORE_STOCK = update(Product.__table__)\
+    .where(Product.__table__.c.id == bindparam('product_id'))\
+    .where(Product.__table__.c.store_quantity - reserved_units(
+        Product.__table__.c.id, bindparam('now'), bindparam('cart_id')) >= bindparam('quantity'))\
+    .values(store_quantity=Product.__table__.c.store_quantity - bindparam('quantity'))
+
+# Restock counters for a transfer, one executemany row per product
+SHIFT_WAREHOUSE_TO_STORE = update(Product.__table__)\
+    .where(Product.__table__.c.id == bindparam('product_id'))\
+    .values(warehouse_quantity=Product.__table__.c.warehouse_quantity - bindparam('moved'),
+            store_quantity=Product.__table__.c.store_quantity + bindparam('moved'))
+
+# Upper bound on cached products per database, see ProductCache
+PRODUCT_CACHE_SIZE = 2048
+
+RegistryEntry = namedtuple('RegistryEntry', [
+    'engine', 'Session', 'serial_index', 'product_cache', 'task_rules', 'stock_ledger'
+])
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+class QueryCounter:
+    """Context manager counting the SQL statements an engine executes.
+    
+        with QueryCounter(db.engine) as counter:
+            db.get_sales_report_with_items(start, end)
+        counter.assert_at_most(3)
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+    
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+        return False
+    
+    def assert_at_most(self, limit):
+        if self.count > limit:
+            statements = '\n'.join(' '.join(s.split())[:120] for s in self.statements)
+            raise AssertionError(f"Expected at most {limit} queries, got {self.count}:\n{statements}")
+
+def keyset_page(query, key_columns, cursor=None, limit=100, descending=False):
+    """Fetch one page of a query ordered by ``key_columns``.
+    
+    Returns (rows, next_cursor). Pass next_cursor back to get the following
+    page; it is None once the last page has been returned. The last key
+    column must be unique (normally the primary key).
+    """
+    key = tuple_(*key_columns) if len(key_columns) > 1 else key_columns[0]
+    if cursor is not None:
+        bound = tuple_(*cursor) if len(key_columns) > 1 else cursor[0]
+        query = query.filter(key < bound if descending else key > bound)
+        if len(key_columns) > 1:
+            # Redundant bound on the leading column so SQLite can seek an index
+            leading = key_columns[0]
+            query = query.filter(leading <= cursor[0] if descending else leading >= cursor[0])
+    order = [column.desc() if descending else column for column in key_columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, tuple(getattr(last, column.key) for column in key_columns)
+
+def ensure_schema(engine):
+    """Create or upgrade the schema unless the file is already current."""
+    with engine.connect() as conn:
+        version = conn.exec_driver_sql('PRAGMA user_version').scalar()
+    if version >= SCHEMA_VERSION:
+        return False
+    
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            migration = MIGRATIONS.get(target)
+            if migration:
+                migration(conn)
+        conn.exec_driver_sql(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return True
+
+def _registry_entry(db_path, profile=None):
+    key = db_path if db_path == ':memory:' else os.path.abspath(db_path)
+    with _registry_lock:
+        entry = _registry.get(key)
+        if entry is None:
+            engine = create_engine(f'sqlite:///{db_path}')
+            apply_connection_profile(engine, profile)
+            ensure_schema(engine)
+            # Thread-local sessions: the GUI thread shares one identity map,
+            # worker threads get their own session from the same factory.
+            # The serial index and product cache are shared by every thread.
+            factory = sessionmaker(bind=engine)
+            product_cache = ProductCache(Product, PRODUCT_CACHE_SIZE)
+            product_cache.watch(factory)
+            task_rules = TaskRuleEngine(Product, TodoTask, default_task_rules(), STOCK_ALERT_COLUMNS)
+            task_rules.watch(factory)
+            stock_ledger = StockLedger(Product, StockMovement, STOCK_LOCATIONS)
+            stock_ledger.watch(factory)
+            serial_index = SerialIndex()
+            serial_index.watch(factory)
+            entry = RegistryEntry(engine, scoped_session(factory), serial_index,
+                                  product_cache, task_rules, stock_ledger)
+            _registry[key] = entry
+        return entry
+
+def get_engine(db_path='inventory.db', profile=None):
+    """Return the process-wide engine for a database file.
+    
+    The connection profile only takes effect when the engine is first created.
+    """
+    return _registry_entry(db_path, profile).engine
+
+def get_session(db_path='inventory.db', profile=None):
+    """Return the current thread's session for a database file."""
+    return _registry_entry(db_path, profile).Session()
+
+def get_serial_index(db_path='inventory.db'):
+    """Return the process-wide serial index for a database file."""
+    return _registry_entry(db_path).serial_index
+
+def get_product_cache(db_path='inventory.db'):
+    """Return the process-wide product cache for a database file."""
+    return _registry_entry(db_path).product_cache
+
+def get_task_rules(db_path='inventory.db'):
+    """Return the process-wide task rule engine for a database file."""
+    return _registry_entry(db_path).task_rules
+
+def get_stock_ledger(db_path='inventory.db'):
+    """Return the process-wide stock ledger for a database file."""
+    return _registry_entry(db_path).stock_ledger
+
+def dispose_engines():
+    """Close every registered session and engine."""
+    with _registry_lock:
+        for entry in _registry.values():
+            entry.Session.remove()
+            entry.engine.dispose()
+        _registry.clear()
 
 class DatabaseManager:
-    def __init__(self, db_path='inventory.db'):
-        self.engine = create_engine(f'sqlite:///{db_path}')
-        Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+    def __init__(self, db_path='inventory.db', profile=None):
+        self.db_path = db_path
+        self.engine = get_engine(db_path, profile)
+        self.session = get_session(db_path)
+        self.serial_index = get_serial_index(db_path)
+        self.product_cache = get_product_cache(db_path)
+        self.task_rules = get_task_rules(db_path)
+        self.stock_ledger = get_stock_ledger(db_path)
     
     def add_product(self, product_data):
         product = Product(**product_data)
         self.session.add(product)
+        self.session.flush()
+        self.serial_index.set_product(product.id, product.name, product.selling_price, self.session)
         self.session.commit()
         return product
     
@@ -153,6 +815,9 @@ class DatabaseManager:
         if product:
             for key, value in product_data.items():
                 setattr(product, key, value)
+            if 'name' in product_data or 'selling_price' in product_data:
+                self.serial_index.set_product(product.id, product.name, product.selling_price,
+                                              self.session)
             self.session.commit()
             return product
         return None
@@ -162,34 +827,111 @@ class DatabaseManager:
         if product:
             self.session.delete(product)
             self.session.commit()
+            self.serial_index.forget_product(product_id)
             return True
         return False
     
     def get_product(self, product_id):
-        return self.session.query(Product).filter_by(id=product_id).first()
+        """Get a product, from the product cache when possible."""
+        product = self.product_cache.load(self.session, product_id)
+        if product is None:
+            product = self.session.query(Product).filter_by(id=product_id).first()
+            if product is not None:
+                self.product_cache.put(product)
+        return product
+    
+    def get_products(self, product_ids):
+        """Get products by id, in the given order, skipping unknown ids.
+        
+        Ids missing from the product cache are loaded with one IN query.
+        """
+        found = {}
+        missing = []
+        for product_id in dict.fromkeys(product_ids):
+            product = self.product_cache.load(self.session, product_id)
+            if product is None:
+                missing.append(product_id)
+            else:
+                found[product_id] = product
+        if missing:
+            for product in self.session.query(Product).filter(Product.id.in_(missing)):
+                self.product_cache.put(product)
+                found[product.id] = product
+        return [found[product_id] for product_id in product_ids if product_id in found]
     
     def get_all_products(self):
         return self.session.query(Product).all()
     
+    def count_products(self):
+        return self.session.query(func.count(Product.id)).scalar()
+    
+    def get_products_page(self, cursor=None, limit=100):
+        """Get one page of products ordered by id, plus the next page's cursor."""
+        return keyset_page(self.session.query(Product), [Product.id], cursor, limit)
+    
+    def search(self, model, text, limit=50):
+        """Get rows of model whose indexed text matches every word in text
+        as a prefix, best match first. See SEARCH_INDEXES for the columns.
+        """
+        if fts_query(text) is None:
+            return []
+        return search_filter(self.session.query(model), model, text, limit).all()
+    
+    def search_products(self, text, limit=50):
+        return self.search(Product, text, limit)
+    
+    def search_customers(self, text, limit=50):
+        return self.search(Customer, text, limit)
+    
+    def search_todo_tasks(self, text, limit=50):
+        return self.search(TodoTask, text, limit)
+    
+    def search_repair_tasks(self, text, limit=50):
+        return self.search(RepairTask, text, limit)
+    
+    def get_category_counts(self):
+        """Get (category, product count) pairs."""
+        return self.session.query(Product.category, func.count(Product.id))\
+            .group_by(Product.category).all()
+    
+    def get_alerted_products(self, kind):
+        """Products currently in a STOCK_ALERTS state, via the stock_alerts table."""
+        return self.session.query(Product).join(
+            StockAlert, StockAlert.product_id == Product.id
+        ).filter(StockAlert.kind == kind).all()
+    
+    def count_alerted_products(self, kind):
+        """Number of products currently in a STOCK_ALERTS state."""
+        return self.session.query(func.count()).select_from(StockAlert)\
+            .filter(StockAlert.kind == kind).scalar()
+    
     def get_low_stock_products(self):
-        # Get products where either store quantity is low or total quantity is low
-        return self.session.query(Product).filter(
-            ((Product.store_quantity <= Product.reorder_threshold) |
-             ((Product.store_quantity + Product.warehouse_quantity) <= Product.reorder_threshold))
-        ).all()
+        # Products where either store quantity or total quantity is low
+        return self.get_alerted_products('low_stock')
 
     def get_products_needing_assembly(self):
-        # Get products where total quantity (store + warehouse) is below threshold
-        return self.session.query(Product).filter(
-            (Product.store_quantity + Product.warehouse_quantity) <= Product.reorder_threshold
-        ).all()
+        # Products where total quantity (store + warehouse) is below threshold
+        return self.get_alerted_products('assembly')
 
     def get_products_needing_restock(self):
-        # Get products where store quantity is low but warehouse has stock
-        return self.session.query(Product).filter(
-            (Product.store_quantity <= Product.reorder_threshold) &
-            (Product.warehouse_quantity > 0)
-        ).all()
+        # Products where store quantity is low but warehouse has stock
+        return self.get_alerted_products('restock')
+    
+    def get_stock_alert_events(self, since, kind=None):
+        """Alerts raised and cleared since a datetime, oldest first."""
+        query = self.session.query(StockAlertEvent).filter(StockAlertEvent.created_at >= since)
+        if kind:
+            query = query.filter(StockAlertEvent.kind == kind)
+        return query.order_by(StockAlertEvent.created_at, StockAlertEvent.id).all()
+    
+    def get_stock_alert_churn(self, since):
+        """Map kind -> (raised, cleared) counts since a datetime."""
+        raised = func.count(StockAlertEvent.id).filter(StockAlertEvent.event == 'raised')
+        cleared = func.count(StockAlertEvent.id).filter(StockAlertEvent.event == 'cleared')
+        rows = self.session.query(StockAlertEvent.kind, raised, cleared)\
+            .filter(StockAlertEvent.created_at >= since)\
+            .group_by(StockAlertEvent.kind).all()
+        return {kind: (raised, cleared) for kind, raised, cleared in rows}
     
     def add_customer(self, customer_data):
         customer = Customer(**customer_data)
@@ -197,35 +939,324 @@ class DatabaseManager:
         self.session.commit()
         return customer
     
-    def add_sale(self, sale_data, items_data):
-        sale = Sale(**sale_data)
-        self.session.add(sale)
-        self.session.flush()
+    def add_sale(self, sale_data, items_data, cart_id=None):
+        """Record a sale and take its items out of store stock, atomically.
         
+        Stock drops through one guarded UPDATE per product, sent as a single
+        executemany, so concurrent checkouts can't oversell. Units reserved
+        by other carts are not available. If any product has too little
+        stock, nothing is written and InsufficientStockError is raised.
+        With a cart_id the cart's reservations are released in the same
+        transaction. A sale without items raises ValueError.
+        """
+        if not items_data:
+            raise ValueError("A sale needs at least one item")
+        now = datetime.now()
+        quantities = {}
         for item_data in items_data:
-            item_data['sale_id'] = sale.id
-            sale_item = SaleItem(**item_data)
-            self.session.add(sale_item)
+            product_id = item_data['product_id']
+            quantities[product_id] = quantities.get(product_id, 0) + item_data['quantity']
+        
+        try:
+            # First statement of the transaction, so the write lock is taken
+            # (or waited for) before anything is read
+            if quantities:
+                result = self.session.execute(DECREMENT_STORE_STOCK, [
+                    {'product_id': product_id, 'quantity': quantity,
+                     'now': now, 'cart_id': cart_id or ''}
+                    for product_id, quantity in quantities.items()
+                ])
+                if result.rowcount != len(quantities):
+                    # Undo the rows that did match before reading what's left
+                    self.session.rollback()
+                    raise InsufficientStockError(self._store_shortages(quantities, cart_id or ''))
+                self.product_cache.invalidate_on_commit(self.session, quantities)
+                self.task_rules.touch(self.session, quantities)
             
-            # Update product store quantity
-            product = self.get_product(item_data['product_id'])
-            if product:
-                product.store_quantity -= item_data['quantity']
+            sale = Sale(**sale_data)
+            self.session.add(sale)
+            self.session.flush()
+            
+            serial_numbers = []
+            rows = []
+            for item_data in items_data:
+                row = dict(item_data, sale_id=sale.id)
+                serial_numbers.extend(row.pop('serial_numbers', ()))
+                rows.append(row)
+            if rows:
+                self.session.execute(insert(SaleItem), rows)
+            for product_id, quantity in quantities.items():
+                self.stock_ledger.record(self.session, product_id, 'store', -quantity,
+                                         'sale', f'sale:{sale.id}')
+            
+            if serial_numbers:
+                self.sell_product_items(serial_numbers)
+            if cart_id:
+                self.session.execute(delete(StockReservation).where(
+                    StockReservation.cart_id == cart_id))
+            self.record_daily_sale(sale, sum(quantities.values()))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return sale
+    
+    def _store_shortages(self, quantities, cart_id=None):
+        """Map product id -> available store stock, for products that can't cover quantities."""
+        available = self.get_available_stock(quantities, cart_id)
+        return {product_id: available.get(product_id)
+                for product_id, quantity in quantities.items()
+                if (available.get(product_id) or 0) < quantity}
+    
+    def take_stock_snapshot(self, now=None):
+        """Checkpoint every product's counters. Returns the rows written."""
+        try:
+            result = self.session.execute(stock_snapshot_insert(now or datetime.now()))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return result.rowcount
+    
+    def take_stock_snapshot_if_due(self, interval=STOCK_SNAPSHOT_INTERVAL):
+        """Checkpoint when the newest snapshot is older than interval."""
+        now = datetime.now()
+        last = self.session.execute(select(func.max(StockSnapshot.taken_at))).scalar()
+        if last is not None and now - last < interval:
+            return 0
+        return self.take_stock_snapshot(now)
+    
+    def prune_stock_snapshots(self, keep=STOCK_SNAPSHOT_RETENTION, now=None):
+        """Delete snapshots older than keep except each month's first one.
+        Returns the rows deleted.
+
+        Stock as of an older date then starts from that month's snapshot
+        and reads up to a month of ledger rows.
+        """
+        cutoff = (now or datetime.now()) - keep
+        monthly = select(func.min(StockSnapshot.taken_at))\
+            .where(StockSnapshot.taken_at < cutoff)\
+            .group_by(func.strftime('%Y-%m', StockSnapshot.taken_at))
+        try:
+            result = self.session.execute(delete(StockSnapshot).where(
+                StockSnapshot.taken_at < cutoff, StockSnapshot.taken_at.not_in(monthly)))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return result.rowcount
+    
+    def get_stock_as_of(self, when, product_ids=None):
+        """Map product id -> (store, warehouse) quantities at a past moment.
+        
+        Starts from the newest snapshot taken at or before ``when`` and adds
+        the ledger rows written after it, so only one snapshot interval of
+        movements is read. History starts at the first snapshot.
+        """
+        checkpoint = self.session.execute(
+            select(StockSnapshot.taken_at, StockSnapshot.last_movement_id)
+            .where(StockSnapshot.taken_at <= when)
+            .order_by(StockSnapshot.taken_at.desc()).limit(1)
+        ).first()
+        
+        stock = {}
+        last_movement_id = 0
+        if checkpoint:
+            taken_at, last_movement_id = checkpoint
+            base = select(StockSnapshot.product_id, StockSnapshot.store_quantity,
+                          StockSnapshot.warehouse_quantity)\
+                .where(StockSnapshot.taken_at == taken_at)
+            if product_ids is not None:
+                base = base.where(StockSnapshot.product_id.in_(list(product_ids)))
+            for product_id, store, warehouse in self.session.execute(base):
+                stock[product_id] = {'store': store, 'warehouse': warehouse}
+        
+        # Summed here rather than with GROUP BY, which SQLite would answer by
+        # walking the whole product_id index instead of the id range
+        deltas = select(StockMovement.product_id, StockMovement.location, StockMovement.change)\
+            .where(StockMovement.id > last_movement_id, StockMovement.created_at <= when)
+        if product_ids is not None:
+            deltas = deltas.where(StockMovement.product_id.in_(list(product_ids)))
+        for product_id, location, change in self.session.execute(deltas):
+            counters = stock.setdefault(product_id, {'store': 0, 'warehouse': 0})
+            counters[location] += change
+        
+        return {product_id: (counters['store'], counters['warehouse'])
+                for product_id, counters in stock.items()}
+    
+    def get_inventory_valuation(self, when):
+        """Stock value at purchase price as of ``when``.
+        
+        Quantities come from get_stock_as_of(); prices are today's, since
+        price history is not kept.
+        """
+        stock = self.get_stock_as_of(when)
+        prices = dict(self.session.execute(select(Product.id, Product.purchase_price)).all())
+        return sum((store + warehouse) * prices.get(product_id, 0.0)
+                   for product_id, (store, warehouse) in stock.items())
+    
+    def get_available_stock(self, product_ids, cart_id=None):
+        """Map product id -> store stock not held by other carts' reservations."""
+        available = Product.store_quantity - reserved_units(Product.id, datetime.now(), cart_id)
+        return dict(self.session.execute(
+            select(Product.id, available).where(Product.id.in_(list(product_ids)))
+        ).all())
+    
+    def reserve_stock(self, cart_id, product_id, quantity=1, serial_number=None, ttl=None):
+        """Hold store stock for a cart and return the reservation id.
         
+        A single guarded INSERT ... SELECT, so two carts can't both take the
+        last unit. A serial number can be held by one cart at a time.
+        Raises InsufficientStockError when the stock isn't available and
+        ItemReservedError when the serial number is held by another cart.
+        """
+        now = datetime.now()
+        reservations = StockReservation.__table__
+        products = Product.__table__
+        guarded = select(
+            literal(cart_id), products.c.id, literal(quantity), literal(serial_number),
+            literal(now), literal(now + (ttl or RESERVATION_TTL))
+        ).where(products.c.id == product_id)\
+            .where(products.c.store_quantity - reserved_units(products.c.id, now) >= quantity)
+        if serial_number:
+            guarded = guarded.where(~select(reservations.c.id)
+                .where(reservations.c.serial_number == serial_number)
+                .where(reservations.c.expires_at > now).exists())
+        try:
+            reservation_id = self.session.execute(insert(reservations).from_select(
+                ['cart_id', 'product_id', 'quantity', 'serial_number', 'created_at', 'expires_at'],
+                guarded
+            ).returning(reservations.c.id)).scalar()
+            if reservation_id is None:
+                self.session.rollback()
+                shortages = self._store_shortages({product_id: quantity})
+                if shortages:
+                    raise InsufficientStockError(shortages)
+                raise ItemReservedError(serial_number)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return reservation_id
+    
+    def release_reservation(self, reservation_id):
+        """Give back the stock held by one reservation."""
+        self.session.execute(delete(StockReservation).where(StockReservation.id == reservation_id))
         self.session.commit()
-        return sale
+    
+    def release_cart(self, cart_id):
+        """Give back everything a cart holds. Returns the number of reservations."""
+        result = self.session.execute(delete(StockReservation).where(StockReservation.cart_id == cart_id))
+        self.session.commit()
+        return result.rowcount
+    
+    def sweep_expired_reservations(self, now=None):
+        """Delete every expired reservation in one statement. Returns the count."""
+        result = self.session.execute(delete(StockReservation).where(
+            StockReservation.expires_at <= (now or datetime.now())))
+        self.session.commit()
+        return result.rowcount
+    
+    def record_daily_sale(self, sale, units):
+        """Add a sale to its day's rollup row, inside the current transaction."""
+        row = {
+            'day': (sale.sale_date or datetime.now()).date(),
+            'revenue': sale.total_amount,
+            'tax': sale.tax_amount,
+            'sale_count': 1,
+            'units': units
+        }
+        upsert = sqlite_insert(SalesDailyRollup).values(**row)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[SalesDailyRollup.day],
+            set_={
+                'revenue': SalesDailyRollup.revenue + upsert.excluded.revenue,
+                'tax': SalesDailyRollup.tax + upsert.excluded.tax,
+                'sale_count': SalesDailyRollup.sale_count + upsert.excluded.sale_count,
+                'units': SalesDailyRollup.units + upsert.excluded.units
+            }
+        )
+        self.session.execute(upsert)
+    
+    def rebuild_sales_rollup(self):
+        """Recompute the daily sales rollup from all historical sales."""
+        days = rebuild_sales_rollup(self.session.connection())
+        self.session.commit()
+        return days
+    
+    def get_daily_sales(self, start_day, end_day):
+        """Get rollup rows for each day with sales between two dates (inclusive)."""
+        return self.session.query(SalesDailyRollup).filter(
+            SalesDailyRollup.day.between(start_day, end_day)
+        ).order_by(SalesDailyRollup.day).all()
+    
+    def get_sales_totals(self, start_day, end_day):
+        """Sum revenue, tax, sale count and units between two dates (inclusive)."""
+        revenue, tax, sale_count, units = self.session.query(
+            func.coalesce(func.sum(SalesDailyRollup.revenue), 0.0),
+            func.coalesce(func.sum(SalesDailyRollup.tax), 0.0),
+            func.coalesce(func.sum(SalesDailyRollup.sale_count), 0),
+            func.coalesce(func.sum(SalesDailyRollup.units), 0)
+        ).filter(SalesDailyRollup.day.between(start_day, end_day)).one()
+        return {'revenue': revenue, 'tax': tax, 'sale_count': sale_count, 'units': units}
     
     def get_sales_report(self, start_date, end_date):
         return self.session.query(Sale).filter(
             Sale.sale_date.between(start_date, end_date)
         ).all()
     
+    def get_sales_page(self, start_date, end_date, cursor=None, limit=100):
+        """Get one page of sales in a date range ordered by (sale_date, id)."""
+        query = self.session.query(Sale).options(joinedload(Sale.customer)).filter(
+            Sale.sale_date.between(start_date, end_date)
+        )
+        return keyset_page(query, [Sale.sale_date, Sale.id], cursor, limit)
+    
+    def iter_sales(self, start_date, end_date, batch_size=1000):
+        """Stream sales in a date range with customers and line items, batch by batch."""
+        return self.session.query(Sale).options(
+            joinedload(Sale.customer),
+            selectinload(Sale.items)
+        ).filter(
+            Sale.sale_date.between(start_date, end_date)
+        ).order_by(Sale.sale_date, Sale.id).yield_per(batch_size)
+    
+    def get_sales_report_with_items(self, start_date, end_date):
+        """Get sales with customer, line items and their products preloaded.
+        
+        Issues a fixed number of queries no matter how many sales match.
+        """
+        return self.session.query(Sale).options(
+            joinedload(Sale.customer),
+            selectinload(Sale.items).joinedload(SaleItem.product)
+        ).filter(
+            Sale.sale_date.between(start_date, end_date)
+        ).order_by(Sale.sale_date).all()
+    
+    def get_sales_summary(self, start_date, end_date):
+        """(sale id, date, customer name, item count, total) per sale, oldest
+        first, counted in SQL rather than by loading the items.
+        """
+        # Counted per sale so the date range can still use its index
+        item_count = select(func.count(SaleItem.id))\
+            .where(SaleItem.sale_id == Sale.id).scalar_subquery()
+        return self.session.execute(
+            select(Sale.id, Sale.sale_date, Customer.name, item_count, Sale.total_amount)
+            .outerjoin(Customer, Sale.customer_id == Customer.id)
+            .where(Sale.sale_date.between(start_date, end_date))
+            .order_by(Sale.sale_date)
+        ).all()
+    
     def get_customer(self, customer_id):
         return self.session.query(Customer).filter_by(id=customer_id).first()
     
     def get_all_customers(self):
         return self.session.query(Customer).all()
     
+    def get_customers_page(self, cursor=None, limit=100):
+        """Get one page of customers ordered by id, plus the next page's cursor."""
+        return keyset_page(self.session.query(Customer), [Customer.id], cursor, limit)
+    
     def update_customer(self, customer_id, customer_data):
         customer = self.session.query(Customer).filter_by(id=customer_id).first()
         if customer:
@@ -235,23 +1266,89 @@ class DatabaseManager:
             return customer
         return None
     
-    def add_product_item(self, product_id, serial_number, qr_code_path=None, barcode_path=None, location='store'):
-        """Add a new product item with unique serial number."""
-        # Get the next item number for this product
-        last_item = self.session.query(ProductItem).filter_by(product_id=product_id).order_by(ProductItem.item_number.desc()).first()
-        item_number = (last_item.item_number + 1) if last_item else 1
+    def reserve_item_numbers(self, product_id, count):
+        """Reserve a contiguous block of item numbers for a product.
+
+        Only the current highest item number is read, so the block is valid
+        until items are inserted for the product again. add_product_items
+        numbers and inserts in one go and should be preferred.
+        """
+        last_number = self.session.query(func.max(ProductItem.item_number)).filter(
+            ProductItem.product_id == product_id
+        ).scalar()
+        first_number = (last_number or 0) + 1
+        return range(first_number, first_number + count)
+    
+    def add_product_items(self, product_id, items_data, adjust_quantities=False):
+        """Add many product items in a single transaction.
+        
+        Each entry may carry serial_number, item_number, qr_code_path,
+        barcode_path and location. Entries without an item_number are numbered
+        from one freshly reserved block, and entries without a serial_number
+        get ITEM_SERIAL_FORMAT. If another connection numbered items for the
+        product in between, the insert fails on the unique serial; the
+        transaction is rolled back and the batch renumbered. With
+        adjust_quantities the product's store/warehouse counters are bumped in
+        the same commit. Items are returned in the order of items_data.
+        """
+        if not items_data:
+            return []
+        
+        unnumbered = sum(1 for data in items_data if data.get('item_number') is None)
+        for attempt in range(1, ITEM_NUMBER_ATTEMPTS + 1):
+            item_numbers = iter(self.reserve_item_numbers(product_id, unnumbered))
+            rows = []
+            for data in items_data:
+                row = {
+                    'product_id': product_id,
+                    'item_number': None,
+                    'serial_number': None,
+                    'qr_code_path': None,
+                    'barcode_path': None,
+                    'location': 'store'
+                }
+                row.update(data)
+                if row['item_number'] is None:
+                    row['item_number'] = next(item_numbers)
+                if row['serial_number'] is None:
+                    row['serial_number'] = ITEM_SERIAL_FORMAT.format(
+                        product_id=product_id, item_number=row['item_number'])
+                rows.append(row)
+            
+            # One executemany-style INSERT for the whole batch, RETURNING
+            # rows in parameter order
+            try:
+                items = self.session.scalars(
+                    insert(ProductItem).returning(ProductItem, sort_by_parameter_order=True),
+                    rows).all()
+                break
+            except IntegrityError:
+                self.session.rollback()
+                if not unnumbered or attempt == ITEM_NUMBER_ATTEMPTS:
+                    raise
+        self.serial_index.track(items, self.session)
+        
+        if adjust_quantities:
+            product = self.get_product(product_id)
+            if product:
+                self.stock_ledger.set_reason(self.session, 'received')
+                product.store_quantity = (product.store_quantity or 0) + sum(
+                    1 for row in rows if row['location'] == 'store')
+                product.warehouse_quantity = (product.warehouse_quantity or 0) + sum(
+                    1 for row in rows if row['location'] == 'warehouse')
         
-        item = ProductItem(
-            product_id=product_id,
-            item_number=item_number,
-            serial_number=serial_number,
-            qr_code_path=qr_code_path,
-            barcode_path=barcode_path,
-            location=location
-        )
-        self.session.add(item)
         self.session.commit()
-        return item
+        return items
+    
+    def add_product_item(self, product_id, serial_number, qr_code_path=None, barcode_path=None, location='store'):
+        """Add a new product item with unique serial number."""
+        items = self.add_product_items(product_id, [{
+            'serial_number': serial_number,
+            'qr_code_path': qr_code_path,
+            'barcode_path': barcode_path,
+            'location': location
+        }])
+        return items[0]
     
     def get_product_items(self, product_id, location=None, status=None):
         """Get product items, optionally filtered by location and status."""
@@ -269,38 +1366,166 @@ class DatabaseManager:
         item = self.session.query(ProductItem).get(item_id)
         if item:
             item.location = new_location
+            self.serial_index.track([item], self.session)
             self.session.commit()
             return item
         return None
     
     def move_items_warehouse_to_store(self, product_id, quantity):
         """Move items from warehouse to store location."""
-        # Get warehouse items for this product
-        warehouse_items = self.session.query(ProductItem).filter_by(
-            product_id=product_id,
-            location='warehouse',
-            status='in_stock'
-        ).limit(quantity).all()
+        return self.transfer_warehouse_to_store({product_id: quantity})
+    
+    def transfer_warehouse_to_store(self, transfers):
+        """Move in-stock items of several products from warehouse to store
+        in one transaction.
         
-        moved_items = []
-        for item in warehouse_items:
-            item.location = 'store'
-            moved_items.append(item)
+        transfers maps product id -> quantity (or is a list of pairs). Each
+        product takes one UPDATE ... WHERE id IN (SELECT ... LIMIT n) on its
+        lowest numbered warehouse items, and the product counters move in a
+        single executemany, so a whole restock is one commit. Products with
+        fewer warehouse items move what there is.
         
-        if moved_items:
-            # Update product quantities
-            product = self.get_product(product_id)
-            if product:
-                product.warehouse_quantity -= len(moved_items)
-                product.store_quantity += len(moved_items)
+        Returns the moved items as (id, product_id, serial_number, location,
+        status) rows.
+        """
+        pairs = transfers.items() if isinstance(transfers, dict) else transfers
+        quantities = {}
+        for product_id, quantity in pairs:
+            if quantity > 0:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+        
+        items = ProductItem.__table__
+        moved_items = []
+        moved = {}
+        try:
+            for product_id, quantity in quantities.items():
+                batch = select(items.c.id)\
+                    .where(items.c.product_id == product_id)\
+                    .where(items.c.location == 'warehouse')\
+                    .where(items.c.status == 'in_stock')\
+                    .order_by(items.c.item_number).limit(quantity)
+                rows = self.session.execute(
+                    update(items).where(items.c.id.in_(batch))
+                    .values(location='store')
+                    .returning(items.c.id, items.c.product_id, items.c.serial_number,
+                               items.c.location, items.c.status)
+                ).all()
+                if rows:
+                    moved[product_id] = len(rows)
+                    moved_items.extend(rows)
             
+            if moved:
+                self.session.execute(SHIFT_WAREHOUSE_TO_STORE, [
+                    {'product_id': product_id, 'moved': count}
+                    for product_id, count in moved.items()
+                ])
+                self.product_cache.invalidate_on_commit(self.session, moved)
+                self.task_rules.touch(self.session, moved)
+                for product_id, count in moved.items():
+                    self.stock_ledger.record(self.session, product_id, 'warehouse', -count, 'transfer')
+                    self.stock_ledger.record(self.session, product_id, 'store', count, 'transfer')
+                self.serial_index.track(moved_items, self.session)
             self.session.commit()
-        
+        except Exception:
+            self.session.rollback()
+            raise
         return moved_items
     
-    def get_todo_tasks(self, status=None, task_type=None, assigned_to=None):
-        """Get todo tasks with optional filters."""
-        query = self.session.query(TodoTask)
+    def sell_product_items(self, serial_numbers):
+        """Mark in-stock items as sold, inside the current transaction."""
+        items = self.session.query(ProductItem).filter(
+            ProductItem.serial_number.in_(serial_numbers),
+            ProductItem.status == 'in_stock'
+        ).all()
+        for item in items:
+            item.location = 'sold'
+            item.status = 'sold'
+        self.serial_index.track(items, self.session)
+        return items
+    
+    def warm_serial_index(self):
+        """Load every product item into the serial index. Returns its size."""
+        # Core rows on the session's connection: about twice as fast as
+        # going through the ORM result layer for a million rows
+        conn = self.session.connection()
+        items = conn.execute(select(
+            ProductItem.serial_number, ProductItem.id, ProductItem.product_id,
+            ProductItem.location, ProductItem.status
+        ))
+        products = conn.execute(select(Product.id, Product.name, Product.selling_price))
+        self.serial_index.warm(items, products)
+        return len(self.serial_index)
+    
+    def resolve_serial(self, serial_number):
+        """Look up a scanned serial number. Returns a SerialEntry or None.
+        
+        Served from the serial index; a miss (index not warmed yet, or an
+        item added by another process) is looked up and added to it.
+        """
+        entry = self.serial_index.resolve(serial_number)
+        if entry is None:
+            item = self.session.query(ProductItem).filter_by(serial_number=serial_number).first()
+            if item is None:
+                return None
+            product = self.get_product(item.product_id)
+            if product:
+                self.serial_index.set_product(product.id, product.name, product.selling_price)
+            self.serial_index.track([item])
+            entry = self.serial_index.resolve(serial_number)
+        return entry
+    
+    def sync_changes(self, changed):
+        """Catch up with rows that other connections committed.
+        
+        changed maps table name -> row ids, as read by ChangeFeed, or is
+        None when everything may have changed. The rows are dropped from
+        the product cache and expired in the session so they reload; objects
+        with unflushed changes are left alone. Listed items and products are
+        reloaded into the serial index, which is not touched for None: call
+        warm_serial_index() for that.
+        """
+        if changed is None:
+            self.product_cache.invalidate()
+            stale = list(self.session.identity_map.values())
+        else:
+            self.product_cache.invalidate(changed.get('products', ()))
+            stale = []
+            for table_name, ids in changed.items():
+                model = CHANGE_LOG_MODELS[table_name]
+                for row_id in ids:
+                    obj = self.session.identity_map.get(identity_key(model, row_id))
+                    if obj is not None:
+                        stale.append(obj)
+            self._sync_serial_index(changed.get('product_items'), changed.get('products'))
+        for obj in stale:
+            if obj not in self.session.dirty and obj not in self.session.deleted:
+                self.session.expire(obj)
+    
+    def _sync_serial_index(self, item_ids, product_ids):
+        if item_ids:
+            self.serial_index.track(self.session.execute(select(
+                ProductItem.serial_number, ProductItem.id, ProductItem.product_id,
+                ProductItem.location, ProductItem.status
+            ).where(ProductItem.id.in_(item_ids))).all())
+        if product_ids:
+            rows = self.session.execute(select(Product.id, Product.name, Product.selling_price)
+                                        .where(Product.id.in_(product_ids))).all()
+            for row in rows:
+                self.serial_index.set_product(row.id, row.name, row.selling_price)
+            for product_id in set(product_ids) - {row.id for row in rows}:
+                self.serial_index.forget_product(product_id)
+    
+    def prune_data_changes(self, keep=DATA_CHANGE_LOG_SIZE):
+        """Delete all but the newest keep change log rows. Returns the count."""
+        newest = self.session.execute(select(func.max(DataChange.id))).scalar()
+        if newest is None or newest <= keep:
+            return 0
+        result = self.session.execute(delete(DataChange).where(DataChange.id <= newest - keep))
+        self.session.commit()
+        return result.rowcount
+    
+    def _todo_tasks_query(self, status=None, task_type=None, assigned_to=None):
+        query = self.session.query(TodoTask).options(joinedload(TodoTask.product))
         
         if status:
             query = query.filter_by(status=status)
@@ -308,13 +1533,34 @@ class DatabaseManager:
             query = query.filter_by(task_type=task_type)
         if assigned_to:
             query = query.filter_by(assigned_to=assigned_to)
-            
+        
+        return query
+    
+    def get_todo_tasks(self, status=None, task_type=None, assigned_to=None):
+        """Get todo tasks with optional filters."""
+        query = self._todo_tasks_query(status, task_type, assigned_to)
         return query.order_by(TodoTask.created_at.desc()).all()
     
+    def get_todo_tasks_page(self, status=None, task_type=None, assigned_to=None, cursor=None, limit=100):
+        """Get one page of todo tasks, newest first, plus the next page's cursor."""
+        query = self._todo_tasks_query(status, task_type, assigned_to)
+        return keyset_page(query, [TodoTask.created_at, TodoTask.id], cursor, limit, descending=True)
+    
     def close(self):
-        self.session.close()
+        """Close and discard this thread's session.
+
+        For worker threads only, once they are done with the database. The
+        main thread's session is shared by every widget's manager, and
+        closing it would detach the objects they hold.
+        """
+        if threading.current_thread() is threading.main_thread():
+            raise RuntimeError("DatabaseManager.close() must not run on the main thread")
+        _registry_entry(self.db_path).Session.remove()
 
 class RepairTaskManager:
+    # Spelled out instead of "!= 'completed'" so the status index can be used
+    OPEN_STATUSES = ('pending', 'in_progress')
+    
     def __init__(self, db_manager):
         self.db = db_manager
     
@@ -329,7 +1575,7 @@ class RepairTaskManager:
         return task
     
     def add_part(self, task_id, product_id, quantity):
-        product = self.db.session.query(Product).get(product_id)
+        product = self.db.get_product(product_id)
         if not product:
             return None
         
@@ -371,13 +1617,15 @@ class RepairTaskManager:
     
     def get_pending_tasks(self):
         return self.db.session.query(RepairTask)\
-            .filter(RepairTask.status != 'completed')\
+            .options(joinedload(RepairTask.customer))\
+            .filter(RepairTask.status.in_(self.OPEN_STATUSES))\
             .order_by(RepairTask.created_at.desc())\
             .all()
     
     def get_employee_tasks(self, employee_name):
         return self.db.session.query(RepairTask)\
+            .options(joinedload(RepairTask.customer))\
             .filter(RepairTask.assigned_to == employee_name)\
-            .filter(RepairTask.status != 'completed')\
+            .filter(RepairTask.status.in_(self.OPEN_STATUSES))\
             .order_by(RepairTask.created_at.desc())\
             .all()
\ No newline at end of file
@@ -0,0 +1,357 @@
+"""Maintenance commands for the inventory database.
+
+    python db_tools.py [--db inventory.db] migrate
+    python db_tools.py [--db inventory.db] audit-plans
+    python db_tools.py [--db inventory.db] rebuild-rollup
+    python db_tools.py [--db inventory.db] reconcile [--full] [--apply]
+    python db_tools.py check-queries
+    python db_tools.py export-sales --start 2024-01-01 --end 2024-12-31 --out sales.csv
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from change_feed import ChangeFeed
+from database import (Customer, DatabaseManager, QueryCounter, RepairTask,
+                      RepairTaskManager, SCHEMA_VERSION, TodoTask,
+                      dispose_engines, get_engine)
+from inventory_manager import InventoryManager
+from read_models import ReadModels
+from reconciliation import StockReconciler, corrected_counters
+from todo_manager import TodoManager
+
+# Queries that list a whole table on purpose; their scans are reported but
+# don't fail the audit.
+EXPECTED_SCANS = {
+    'DatabaseManager.get_all_products',
+    'DatabaseManager.get_all_customers',
+    'InventoryManager.get_inventory_breakdown',
+    'DatabaseManager.get_inventory_valuation',
+}
+
+def migrate(args):
+    """Create or upgrade the schema and indexes of a database file."""
+    engine = get_engine(args.db)
+    with engine.connect() as conn:
+        version = conn.exec_driver_sql('PRAGMA user_version').scalar()
+    print(f"{args.db}: schema version {version} (current {SCHEMA_VERSION})")
+
+def rebuild_rollup(args):
+    """Recompute the daily sales rollup from historical sales."""
+    db = DatabaseManager(args.db)
+    days = db.rebuild_sales_rollup()
+    print(f"{args.db}: rebuilt sales rollup for {days} day(s)")
+
+def reconcile(args):
+    """Report product counters that disagree with their in-stock items,
+    and with --apply lower the ones that are too high."""
+    db = DatabaseManager(args.db)
+    result = StockReconciler(db).reconcile(full=args.full, apply=args.apply)
+    scope = f"changed since {result.since:%Y-%m-%d %H:%M}" if result.since else 'all'
+    print(f"{args.db}: checked {result.products_checked} product(s) ({scope})")
+    lowered = 0
+    for d in result.discrepancies:
+        store, warehouse = corrected_counters(d)
+        if (store, warehouse) != ((d.store_quantity or 0), (d.warehouse_quantity or 0)):
+            lowered += 1
+        # Counters below their item count are only reported, never raised
+        print(f"  product {d.product_id}: store {d.store_quantity} -> {store} ({d.store_items} items), "
+              f"warehouse {d.warehouse_quantity} -> {warehouse} ({d.warehouse_items} items)")
+    action = 'lowered' if args.apply else 'to lower with --apply'
+    print(f"{len(result.discrepancies)} discrepanc{'y' if len(result.discrepancies) == 1 else 'ies'}, "
+          f"{lowered} {action}")
+
+def export_sales(args):
+    """Stream sales in a date range to CSV without materializing the table."""
+    db = DatabaseManager(args.db)
+    start_date = datetime.strptime(args.start, '%Y-%m-%d')
+    end_date = datetime.combine(datetime.strptime(args.end, '%Y-%m-%d').date(), datetime.max.time())
+    exported = 0
+    with open(args.out, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Sale ID', 'Date', 'Customer', 'Items', 'Total Amount', 'Tax Amount'])
+        for sale in db.iter_sales(start_date, end_date, batch_size=args.batch_size):
+            writer.writerow([
+                sale.id,
+                sale.sale_date.strftime('%Y-%m-%d %H:%M'),
+                sale.customer.name if sale.customer else 'Walk-in Customer',
+                sum(item.quantity for item in sale.items),
+                f"{sale.total_amount:.2f}",
+                f"{sale.tax_amount:.2f}"
+            ])
+            exported += 1
+    print(f"Exported {exported} sale(s) to {args.out}")
+
+def query_probes(db):
+    """Yield (label, callable) for every read/write query the managers issue."""
+    inventory = InventoryManager(db)
+    todo = TodoManager(db)
+    repairs = RepairTaskManager(db)
+    read_models = ReadModels(db)
+    now = datetime.now()
+    product = db.get_all_products()[0]
+
+    yield 'DatabaseManager.get_product', lambda: db.get_product(product.id)
+    yield 'DatabaseManager.get_products', lambda: db.get_products([product.id, product.id + 1])
+    yield 'DatabaseManager.get_all_products', db.get_all_products
+    yield 'DatabaseManager.count_products', db.count_products
+    yield 'DatabaseManager.get_category_counts', db.get_category_counts
+    yield 'DatabaseManager.search_products', lambda: db.search_products('aud pro')
+    yield 'DatabaseManager.search_customers', lambda: db.search_customers('audit')
+    yield 'DatabaseManager.search_todo_tasks', lambda: db.search_todo_tasks('restock')
+    yield 'DatabaseManager.search_repair_tasks', lambda: db.search_repair_tasks('wheel')
+    yield 'DatabaseManager.get_low_stock_products', db.get_low_stock_products
+    yield 'DatabaseManager.count_alerted_products', lambda: db.count_alerted_products('low_stock')
+    yield 'DatabaseManager.get_products_needing_assembly', db.get_products_needing_assembly
+    yield 'DatabaseManager.get_products_needing_restock', db.get_products_needing_restock
+    yield 'DatabaseManager.get_stock_alert_events', lambda: db.get_stock_alert_events(now - timedelta(days=1), 'restock')
+    yield 'DatabaseManager.get_stock_alert_churn', lambda: db.get_stock_alert_churn(now - timedelta(days=1))
+    yield 'DatabaseManager.get_sales_report', lambda: db.get_sales_report(now - timedelta(days=30), now)
+    yield 'DatabaseManager.get_products_page', lambda: db.get_products_page(cursor=(product.id,), limit=10)
+    yield 'DatabaseManager.get_customers_page', lambda: db.get_customers_page(cursor=(0,), limit=10)
+    yield 'DatabaseManager.get_sales_page', lambda: db.get_sales_page(now - timedelta(days=30), now, cursor=(now - timedelta(days=1), 0), limit=10)
+    yield 'DatabaseManager.get_todo_tasks_page', lambda: db.get_todo_tasks_page(status='pending', cursor=(now, 0), limit=10)
+    yield 'DatabaseManager.get_sales_summary', lambda: db.get_sales_summary(now - timedelta(days=30), now)
+    yield 'DatabaseManager.get_sales_report_with_items', lambda: db.get_sales_report_with_items(now - timedelta(days=30), now)
+    yield 'DatabaseManager.get_daily_sales', lambda: db.get_daily_sales(now.date() - timedelta(days=30), now.date())
+    yield 'DatabaseManager.get_sales_totals', lambda: db.get_sales_totals(now.date().replace(day=1), now.date())
+    yield 'DatabaseManager.get_customer', lambda: db.get_customer(1)
+    yield 'DatabaseManager.get_all_customers', db.get_all_customers
+    yield 'DatabaseManager.reserve_item_numbers', lambda: db.reserve_item_numbers(product.id, 10)
+    yield 'DatabaseManager.get_product_items', lambda: db.get_product_items(product.id, location='store', status='in_stock')
+    yield 'DatabaseManager.resolve_serial', lambda: db.resolve_serial('missing-serial')
+    yield 'DatabaseManager.move_items_warehouse_to_store', lambda: db.move_items_warehouse_to_store(product.id, 1)
+    yield 'DatabaseManager.transfer_warehouse_to_store', lambda: db.transfer_warehouse_to_store({product.id: 1, 0: 1})
+    yield 'DatabaseManager.take_stock_snapshot_if_due', db.take_stock_snapshot_if_due
+    yield 'DatabaseManager.prune_stock_snapshots', lambda: db.prune_stock_snapshots(keep=timedelta(0))
+    yield 'DatabaseManager.get_stock_as_of', lambda: db.get_stock_as_of(now, [product.id])
+    yield 'DatabaseManager.get_inventory_valuation', lambda: db.get_inventory_valuation(now - timedelta(days=1))
+    yield 'DatabaseManager.get_available_stock', lambda: db.get_available_stock([product.id])
+    yield 'DatabaseManager.release_cart', lambda: db.release_cart('audit-cart')
+    yield 'DatabaseManager.sweep_expired_reservations', db.sweep_expired_reservations
+    yield 'DatabaseManager.get_todo_tasks', lambda: db.get_todo_tasks(status='pending', task_type='restock')
+    yield 'DatabaseManager.sync_changes', lambda: db.sync_changes({'products': {product.id}, 'product_items': {1}})
+    yield 'DatabaseManager.prune_data_changes', lambda: db.prune_data_changes(keep=10)
+    feed = ChangeFeed(db.db_path)
+    yield 'ChangeFeed.poll', lambda: (db.add_customer({'name': 'audit feed'}), feed.poll())
+    yield 'ReadModels.product_page', lambda: read_models.product_page('name', cursor=(product.name, product.id), limit=10)
+    yield 'ReadModels.product_page (quantity)', lambda: read_models.product_page('quantity', True, cursor=(5, product.id), limit=10)
+    yield 'ReadModels.product_page (assembly)', lambda: read_models.product_page(location='assembly', limit=10)
+    yield 'ReadModels.low_stock_rows', read_models.low_stock_rows
+    yield 'ReadModels.stock_page', lambda: read_models.stock_page('total_quantity', cursor=(0, 0), limit=10)
+    yield 'ReadModels.customer_page', lambda: read_models.customer_page('name', cursor=('audit', 0), limit=10)
+    yield 'InventoryManager.get_inventory_breakdown', inventory.get_inventory_breakdown
+    yield 'InventoryManager.get_assembly_suggestions', inventory.get_assembly_suggestions
+    yield 'InventoryManager.get_reorder_suggestions', inventory.get_reorder_suggestions
+    yield 'TodoManager.get_pending_tasks', lambda: todo.get_pending_tasks(task_type='restock')
+    yield 'TodoManager.get_high_priority_tasks', todo.get_high_priority_tasks
+    yield 'TodoManager.check_low_stock_and_create_tasks', todo.check_low_stock_and_create_tasks
+    yield 'StockReconciler.reconcile (full)', lambda: StockReconciler(db).reconcile(full=True, apply=True)
+    yield 'StockReconciler.reconcile', lambda: StockReconciler(db).reconcile(apply=True)
+    yield 'RepairTaskManager.get_pending_tasks', repairs.get_pending_tasks
+    yield 'RepairTaskManager.get_employee_tasks', lambda: repairs.get_employee_tasks('current_employee')
+
+def seed_audit_data(db):
+    """Make sure every probe has rows to touch."""
+    if db.get_all_products():
+        return
+    product = db.add_product({
+        'name': 'Audit Product',
+        'category': 'Other',
+        'purchase_price': 1.0,
+        'selling_price': 2.0,
+        'store_quantity': 1,
+        'warehouse_quantity': 2,
+        'reorder_threshold': 5
+    })
+    db.add_product_items(product.id, [
+        {'serial_number': f'AUDIT{n}', 'location': location}
+        for n, location in enumerate(['store', 'warehouse', 'warehouse'])
+    ])
+    db.add_customer({'name': 'Audit Customer'})
+
+def scan_details(plan_rows):
+    """Return the plan steps that walk a whole table.
+    
+    FTS5 MATCH lookups (VIRTUAL TABLE INDEX n:M) and scans of subquery
+    results are not table scans; the tables under a subquery get their own
+    plan steps.
+    """
+    return [detail for detail in plan_rows
+            if detail.startswith('SCAN ') and 'COVERING INDEX' not in detail
+            and not detail.startswith(('SCAN CONSTANT ROW', 'SCAN anon_'))
+            and not ('VIRTUAL TABLE INDEX' in detail and ':M' in detail)]
+
+def audit_plans(args):
+    """Run EXPLAIN QUERY PLAN on every manager query and flag table scans."""
+    workdir = tempfile.mkdtemp(prefix='inventory-audit-')
+    db_path = os.path.join(workdir, 'audit.db')
+    if args.db and os.path.exists(args.db):
+        # Probes write (task sweeps, stock moves), so audit a copy
+        shutil.copyfile(args.db, db_path)
+
+    try:
+        db = DatabaseManager(db_path, profile='default')
+        seed_audit_data(db)
+
+        captured = []
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                captured.append((statement, parameters))
+
+        results = []
+        for label, probe in query_probes(db):
+            captured.clear()
+            probe()
+            statements = list(captured)
+            results.append((label, statements))
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+        failures = 0
+        raw = db.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            for label, statements in results:
+                seen = set()
+                for statement, parameters in statements:
+                    if statement in seen:
+                        continue
+                    seen.add(statement)
+                    cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+                    plan = [row[3] for row in cursor.fetchall()]
+                    scans = scan_details(plan)
+                    if scans and label not in EXPECTED_SCANS:
+                        status = 'SCAN'
+                        failures += 1
+                    elif scans:
+                        status = 'scan (expected)'
+                    else:
+                        status = 'ok'
+                    print(f"[{status}] {label}")
+                    if args.verbose:
+                        print('    ' + ' '.join(statement.split()))
+                    if args.verbose or status == 'SCAN':
+                        for detail in plan:
+                            print(f"      {detail}")
+        finally:
+            raw.close()
+        print(f"{failures} unexpected table scan(s)")
+        return 1 if failures else 0
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def seed_report_data(db, rows):
+    """Create ``rows`` sales, todo tasks and repair tasks across many products."""
+    now = datetime.now()
+    products = [db.add_product({
+        'name': f'Product {n}',
+        'purchase_price': 1.0,
+        'selling_price': 2.0,
+        'store_quantity': 1000
+    }) for n in range(rows)]
+    customers = [Customer(name=f'Customer {n}') for n in range(rows)]
+    db.session.add_all(customers)
+    db.session.flush()
+    for n, (product, customer) in enumerate(zip(products, customers)):
+        db.add_sale({
+            'customer_id': customer.id,
+            'total_amount': 2.0,
+            'tax_amount': 0.36,
+            'sale_date': now - timedelta(hours=n)
+        }, [{'product_id': product.id, 'quantity': 1, 'unit_price': 2.0, 'subtotal': 2.0}])
+        db.session.add(TodoTask(task_type='restock', description='Restock', product_id=product.id))
+        db.session.add(RepairTask(customer_id=customer.id, description='Repair'))
+    db.session.commit()
+
+def touch_sales(sales):
+    for sale in sales:
+        sale.customer and sale.customer.name
+        for item in sale.items:
+            item.product.purchase_price
+
+def touch_task_products(tasks):
+    for task in tasks:
+        task.product and task.product.name
+
+def touch_repair_customers(tasks):
+    for task in tasks:
+        task.customer and task.customer.name
+
+def query_budgets(db):
+    """Yield (label, load, touch, max_queries) for each screen that walks relations."""
+    todo = TodoManager(db)
+    repairs = RepairTaskManager(db)
+    now = datetime.now()
+    start = now - timedelta(days=365)
+
+    yield ('ReportsWidget sales/profit report',
+           lambda: db.get_sales_report_with_items(start, now), touch_sales, 3)
+    yield ('TodoWidget pending tasks', todo.get_pending_tasks, touch_task_products, 1)
+    yield ('TodoWidget high priority tasks', todo.get_high_priority_tasks, touch_task_products, 1)
+    yield ('TodoWidget filtered tasks', lambda: db.get_todo_tasks(status='pending'), touch_task_products, 1)
+    yield ('RepairTaskWidget pending tasks', repairs.get_pending_tasks, touch_repair_customers, 1)
+
+def check_queries(args):
+    """Fail if a report screen's query count grows with the number of rows."""
+    workdir = tempfile.mkdtemp(prefix='inventory-queries-')
+    try:
+        db = DatabaseManager(os.path.join(workdir, 'queries.db'), profile='default')
+        seed_report_data(db, args.rows)
+        failures = 0
+        for label, load, touch, limit in query_budgets(db):
+            db.session.expunge_all()
+            with QueryCounter(db.engine) as counter:
+                touch(load())
+            try:
+                counter.assert_at_most(limit)
+                print(f"[ok] {label}: {counter.count} queries for {args.rows} rows")
+            except AssertionError as e:
+                failures += 1
+                print(f"[FAIL] {label}: {e}")
+        return 1 if failures else 0
+    finally:
+        dispose_engines()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Inventory database maintenance')
+    parser.add_argument('--db', default='inventory.db', help='database file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('migrate', help='create or upgrade schema and indexes').set_defaults(func=migrate)
+
+    subparsers.add_parser('rebuild-rollup', help='recompute the daily sales rollup').set_defaults(func=rebuild_rollup)
+
+    fix = subparsers.add_parser('reconcile', help='match product counters to their items')
+    fix.add_argument('--full', action='store_true', help='check every product, not just recent changes')
+    fix.add_argument('--apply', action='store_true', help='lower counters above their item count, including '
+                     'any stock added without items')
+    fix.set_defaults(func=reconcile)
+
+    audit = subparsers.add_parser('audit-plans', help='EXPLAIN QUERY PLAN every manager query')
+    audit.add_argument('-v', '--verbose', action='store_true', help='print every plan')
+    audit.set_defaults(func=audit_plans)
+
+    queries = subparsers.add_parser('check-queries', help='assert report screens avoid N+1 queries')
+    queries.add_argument('--rows', type=int, default=50, help='sales/tasks to seed')
+    queries.set_defaults(func=check_queries)
+
+    export = subparsers.add_parser('export-sales', help='stream sales in a date range to CSV')
+    export.add_argument('--start', required=True, help='first day, YYYY-MM-DD')
+    export.add_argument('--end', required=True, help='last day, YYYY-MM-DD')
+    export.add_argument('--out', required=True, help='CSV file to write')
+    export.add_argument('--batch-size', type=int, default=1000)
+    export.set_defaults(func=export_sales)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args) or 0)
+
+if __name__ == '__main__':
+    main()
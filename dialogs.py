@@ -205,13 +205,12 @@ class ProductDialog(QDialog):
                         }
                         self.db.update_product(self.product.id, updated_data)
                         
-                        # Create assembly task if total quantity is below threshold
-                        total_qty = updated_data['store_quantity'] + updated_data['warehouse_quantity']
-                        if total_qty <= self.product.reorder_threshold:
-                            assembly_qty = max(self.product.reorder_threshold - total_qty + 5, 0)  # Order 5 extra
-                            self.todo_manager.create_assembly_task(self.product.id, assembly_qty)
+                        # The commit runs the task rules, which create an
+                        # assembly task if total quantity is below threshold
+                        assembly_task = self.todo_manager.get_pending_task(self.product.id, 'assembly')
+                        if assembly_task:
                             QMessageBox.information(self, 'Success', 
-                                f'Added {add_store} store items and {add_warehouse} warehouse items!\n\nCreated assembly task for {assembly_qty} additional units.')
+                                f'Added {add_store} store items and {add_warehouse} warehouse items!\n\nAssembly task pending for {assembly_task.quantity_needed} additional units.')
                         else:
                             QMessageBox.information(self, 'Success', 
                                 f'Added {add_store} store items and {add_warehouse} warehouse items!')
@@ -232,19 +231,14 @@ class ProductDialog(QDialog):
                     product_data['warehouse_quantity'] = warehouse_qty
                     product = self.db.add_product(product_data)
                     
-                    # Check if initial quantity is below threshold
-                    total_qty = store_qty + warehouse_qty
-                    if total_qty <= product_data['reorder_threshold']:
-                        assembly_qty = max(product_data['reorder_threshold'] - total_qty + 5, 0)  # Order 5 extra
-                        self.todo_manager.create_assembly_task(product.id, assembly_qty)
+                    # Created by the task rules if initial quantity is below threshold
+                    assembly_task = self.todo_manager.get_pending_task(product.id, 'assembly')
+                    if assembly_task:
                         QMessageBox.information(self, 'Success', 
-                            f'Product created successfully!\n\nCreated assembly task for {assembly_qty} additional units.')
+                            f'Product created successfully!\n\nCreated assembly task for {assembly_task.quantity_needed} additional units.')
                     else:
                         QMessageBox.information(self, 'Success', 'Product created successfully!')
             
-            # Check for low stock and create restock tasks if needed
-            self.enhanced_manager.check_and_create_restock_tasks()
-            
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, 'Error', f'Failed to save product: {str(e)}')
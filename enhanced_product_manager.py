@@ -1,14 +1,7 @@
-import qrcode
-import barcode
-from barcode.writer import ImageWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
-from PIL import Image, ImageDraw, ImageFont
 import os
 from datetime import datetime
-from database import DatabaseManager, ProductItem
+from sqlalchemy import inspect
+from database import DatabaseManager, ProductItem, ITEM_SERIAL_FORMAT
 from todo_manager import TodoManager
 
 class EnhancedProductManager:
@@ -25,10 +18,11 @@ class EnhancedProductManager:
     
     def generate_serial_number(self, product_id, item_number):
         """Generate unique serial number in format P{product_id}I{item_number}."""
-        return f"P{product_id}I{item_number}"
+        return ITEM_SERIAL_FORMAT.format(product_id=product_id, item_number=item_number)
     
     def generate_qr_code(self, product_id, item_number, serial_number):
         """Generate QR code for a specific product item."""
+        import qrcode
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -53,6 +47,9 @@ class EnhancedProductManager:
     def generate_barcode(self, serial_number):
         """Generate barcode for the serial number."""
         try:
+            import barcode
+            from barcode.writer import ImageWriter
+            
             # Use Code128 barcode format
             code128 = barcode.get_barcode_class('code128')
             barcode_instance = code128(serial_number, writer=ImageWriter())
@@ -64,6 +61,32 @@ class EnhancedProductManager:
             print(f"Error generating barcode: {e}")
             return None
     
+    def generate_item_codes(self, items):
+        """Generate QR codes and barcodes for committed items and store their paths.
+
+        Runs after the insert so that no file is written while the
+        transaction numbering the items is open.
+        """
+        # The insert's commit expired the items; load them back in one query
+        # rather than one refresh per item
+        ids = [inspect(item).identity[0] for item in items]
+        self.db.session.query(ProductItem).filter(ProductItem.id.in_(ids)).all()
+        for item in items:
+            item.qr_code_path = self.generate_qr_code(item.product_id, item.item_number, item.serial_number)
+            item.barcode_path = self.generate_barcode(item.serial_number)
+        self.db.session.commit()
+    
+    def add_items(self, product_id, store_quantity, warehouse_quantity, adjust_quantities=False):
+        """Insert store then warehouse items with their codes; returns (store, warehouse) items."""
+        items = self.db.add_product_items(
+            product_id,
+            [{'location': 'store'}] * store_quantity + [{'location': 'warehouse'}] * warehouse_quantity,
+            adjust_quantities=adjust_quantities
+        )
+        self.generate_item_codes(items)
+        # add_product_items returns items in the order they were passed
+        return items[:store_quantity], items[store_quantity:]
+    
     def add_product_with_items(self, product_data, store_quantity=0, warehouse_quantity=0):
         """Add a new product with individual items and generate QR codes/barcodes."""
         # Set the quantities in product data
@@ -73,40 +96,7 @@ class EnhancedProductManager:
         # Add the main product
         product = self.db.add_product(product_data)
         
-        # Generate items for store
-        store_items = []
-        for i in range(store_quantity):
-            item_number = i + 1
-            serial_number = self.generate_serial_number(product.id, item_number)
-            qr_code_path = self.generate_qr_code(product.id, item_number, serial_number)
-            barcode_path = self.generate_barcode(serial_number)
-            
-            item = self.db.add_product_item(
-                product_id=product.id,
-                serial_number=serial_number,
-                qr_code_path=qr_code_path,
-                barcode_path=barcode_path,
-                location='store'
-            )
-            store_items.append(item)
-        
-        # Generate items for warehouse
-        warehouse_items = []
-        for i in range(warehouse_quantity):
-            item_number = store_quantity + i + 1
-            serial_number = self.generate_serial_number(product.id, item_number)
-            qr_code_path = self.generate_qr_code(product.id, item_number, serial_number)
-            barcode_path = self.generate_barcode(serial_number)
-            
-            item = self.db.add_product_item(
-                product_id=product.id,
-                serial_number=serial_number,
-                qr_code_path=qr_code_path,
-                barcode_path=barcode_path,
-                location='warehouse'
-            )
-            warehouse_items.append(item)
-        
+        store_items, warehouse_items = self.add_items(product.id, store_quantity, warehouse_quantity)
         return product, store_items, warehouse_items
     
     def add_quantity_to_product(self, product_id, store_quantity=0, warehouse_quantity=0):
@@ -115,55 +105,12 @@ class EnhancedProductManager:
         if not product:
             return None, [], []
         
-        # Get the last item number for this product
-        last_item = self.db.session.query(ProductItem).filter_by(
-            product_id=product_id
-        ).order_by(ProductItem.item_number.desc()).first()
-        
-        next_item_number = (last_item.item_number + 1) if last_item else 1
+        # Items are numbered after the last existing one, and the product
+        # quantities updated in the same transaction
+        new_store_items, new_warehouse_items = self.add_items(
+            product_id, store_quantity, warehouse_quantity, adjust_quantities=True)
         
-        # Generate new store items
-        new_store_items = []
-        for i in range(store_quantity):
-            item_number = next_item_number + i
-            serial_number = self.generate_serial_number(product_id, item_number)
-            qr_code_path = self.generate_qr_code(product_id, item_number, serial_number)
-            barcode_path = self.generate_barcode(serial_number)
-            
-            item = self.db.add_product_item(
-                product_id=product_id,
-                serial_number=serial_number,
-                qr_code_path=qr_code_path,
-                barcode_path=barcode_path,
-                location='store'
-            )
-            new_store_items.append(item)
-        
-        # Generate new warehouse items
-        new_warehouse_items = []
-        for i in range(warehouse_quantity):
-            item_number = next_item_number + store_quantity + i
-            serial_number = self.generate_serial_number(product_id, item_number)
-            qr_code_path = self.generate_qr_code(product_id, item_number, serial_number)
-            barcode_path = self.generate_barcode(serial_number)
-            
-            item = self.db.add_product_item(
-                product_id=product_id,
-                serial_number=serial_number,
-                qr_code_path=qr_code_path,
-                barcode_path=barcode_path,
-                location='warehouse'
-            )
-            new_warehouse_items.append(item)
-        
-        # Update product quantities
-        updated_data = {
-            'store_quantity': product.store_quantity + store_quantity,
-            'warehouse_quantity': product.warehouse_quantity + warehouse_quantity
-        }
-        updated_product = self.db.update_product(product_id, updated_data)
-        
-        return updated_product, new_store_items, new_warehouse_items
+        return self.db.get_product(product_id), new_store_items, new_warehouse_items
     
     def generate_qr_codes_pdf(self, product_id, location='store', include_barcode=True):
         """Generate a PDF containing QR codes and barcodes for product items."""
@@ -177,6 +124,10 @@ class EnhancedProductManager:
         if not items:
             raise ValueError(f"No items found for product {product_id} in {location}")
         
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import inch
+        
         # Create PDF
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         pdf_filename = f"{self.qr_code_dir}/product_{product_id}_{location}_codes_{timestamp}.pdf"
@@ -238,6 +189,10 @@ class EnhancedProductManager:
         moved_items = self.db.move_items_warehouse_to_store(product_id, quantity)
         return moved_items
     
+    def transfer_warehouse_to_store(self, transfers):
+        """Move several products from warehouse to store in one commit."""
+        return self.db.transfer_warehouse_to_store(transfers)
+    
     def get_product_summary(self, product_id):
         """Get a summary of product with item counts by location."""
         product = self.db.get_product(product_id)
@@ -1,16 +1,36 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QTableWidget, QTableWidgetItem, QPushButton,
-                             QSpinBox, QDialog, QMessageBox)
+                             QTableView, QPushButton, QSpinBox, QDialog, QMessageBox)
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont, QColor
 from datetime import datetime
 from inventory_manager import InventoryManager
+from read_models import ReadModels
+from table_models import ActionButtonDelegate, QueryTableModel, RowTableModel, TableColumn
+
+def last_ordered_text(product):
+    last_ordered = product.last_ordered_at or 'Never'
+    if isinstance(last_ordered, datetime):
+        last_ordered = last_ordered.strftime('%Y-%m-%d')
+    return str(last_ordered)
+
+def make_table(model, action=None):
+    """A sortable view of model. With action, the last column holds buttons
+    that call action(row) for their row."""
+    table = QTableView()
+    table.setModel(model)
+    table.setSortingEnabled(True)
+    if action:
+        delegate = ActionButtonDelegate(table)
+        delegate.clicked.connect(lambda index: action(model.row_at(index.row())))
+        table.setItemDelegateForColumn(model.columnCount() - 1, delegate)
+    return table
 
 class InventoryDashboardWidget(QWidget):
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db = db_manager
         self.inventory_manager = InventoryManager(db_manager)
+        self.read_models = ReadModels(db_manager)
         self.setup_ui()
     
     def setup_ui(self):
@@ -30,11 +50,14 @@ class InventoryDashboardWidget(QWidget):
         assembly_layout = QVBoxLayout(assembly_group)
         assembly_header = QLabel('Assembly Needed')
         assembly_header.setFont(QFont('Arial', 14))
-        self.assembly_table = QTableWidget()
-        self.assembly_table.setColumnCount(4)
-        self.assembly_table.setHorizontalHeaderLabels([
-            'Product', 'Store Qty', 'Warehouse Qty', 'Actions'
-        ])
+        self.assembly_model = RowTableModel([
+            TableColumn('Product', lambda p: p.name, lambda p: p.name),
+            TableColumn('Store Qty', lambda p: str(p.store_quantity), lambda p: p.store_quantity),
+            TableColumn('Warehouse Qty', lambda p: str(p.warehouse_quantity),
+                        lambda p: p.warehouse_quantity),
+            TableColumn('Actions', lambda p: 'Assemble'),
+        ], parent=self)
+        self.assembly_table = make_table(self.assembly_model, self.show_assembly_dialog)
         assembly_layout.addWidget(assembly_header)
         assembly_layout.addWidget(self.assembly_table)
         
@@ -43,11 +66,14 @@ class InventoryDashboardWidget(QWidget):
         reorder_layout = QVBoxLayout(reorder_group)
         reorder_header = QLabel('Reorder Needed')
         reorder_header.setFont(QFont('Arial', 14))
-        self.reorder_table = QTableWidget()
-        self.reorder_table.setColumnCount(4)
-        self.reorder_table.setHorizontalHeaderLabels([
-            'Product', 'Total Qty', 'Last Ordered', 'Actions'
-        ])
+        self.reorder_model = RowTableModel([
+            TableColumn('Product', lambda p: p.name, lambda p: p.name),
+            TableColumn('Total Qty', lambda p: str(p.store_quantity + p.warehouse_quantity),
+                        lambda p: p.store_quantity + p.warehouse_quantity),
+            TableColumn('Last Ordered', last_ordered_text, lambda p: p.last_ordered_at),
+            TableColumn('Actions', lambda p: 'Mark Ordered'),
+        ], parent=self)
+        self.reorder_table = make_table(self.reorder_model, self.mark_product_ordered)
         reorder_layout.addWidget(reorder_header)
         reorder_layout.addWidget(self.reorder_table)
         
@@ -60,11 +86,17 @@ class InventoryDashboardWidget(QWidget):
         inventory_header.setFont(QFont('Arial', 14))
         layout.addWidget(inventory_header)
         
-        self.inventory_table = QTableWidget()
-        self.inventory_table.setColumnCount(4)
-        self.inventory_table.setHorizontalHeaderLabels([
-            'Product', 'Store Quantity', 'Warehouse Quantity', 'Total'
-        ])
+        # Paged in from the database as the table scrolls
+        self.inventory_model = QueryTableModel([
+            TableColumn('Product', lambda i: i.name, 'name', self.stock_color),
+            TableColumn('Store Quantity', lambda i: str(i.store_quantity), 'store_quantity',
+                        self.stock_color),
+            TableColumn('Warehouse Quantity', lambda i: str(i.warehouse_quantity),
+                        'warehouse_quantity', self.stock_color),
+            TableColumn('Total', lambda i: str(i.total_quantity), 'total_quantity',
+                        self.stock_color),
+        ], self.read_models.stock_page, parent=self)
+        self.inventory_table = make_table(self.inventory_model)
         layout.addWidget(self.inventory_table)
         
         # Refresh button
@@ -75,55 +107,24 @@ class InventoryDashboardWidget(QWidget):
         self.refresh_dashboard()
     
     def refresh_dashboard(self):
-        # Update Assembly Needed list
-        assembly_products = self.inventory_manager.get_assembly_suggestions()
-        self.assembly_table.setRowCount(len(assembly_products))
-        for i, product in enumerate(assembly_products):
-            self.assembly_table.setItem(i, 0, QTableWidgetItem(product.name))
-            self.assembly_table.setItem(i, 1, QTableWidgetItem(str(product.store_quantity)))
-            self.assembly_table.setItem(i, 2, QTableWidgetItem(str(product.warehouse_quantity)))
-            
-            assemble_btn = QPushButton('Assemble')
-            assemble_btn.clicked.connect(lambda _, p=product: self.show_assembly_dialog(p))
-            self.assembly_table.setCellWidget(i, 3, assemble_btn)
-        
-        # Update Reorder Needed list
-        reorder_products = self.inventory_manager.get_reorder_suggestions()
-        self.reorder_table.setRowCount(len(reorder_products))
-        for i, product in enumerate(reorder_products):
-            self.reorder_table.setItem(i, 0, QTableWidgetItem(product.name))
-            total_qty = product.store_quantity + product.warehouse_quantity
-            self.reorder_table.setItem(i, 1, QTableWidgetItem(str(total_qty)))
-            
-            last_ordered = product.last_ordered_at or 'Never'
-            if isinstance(last_ordered, datetime):
-                last_ordered = last_ordered.strftime('%Y-%m-%d')
-            self.reorder_table.setItem(i, 2, QTableWidgetItem(str(last_ordered)))
-            
-            order_btn = QPushButton('Mark Ordered')
-            order_btn.clicked.connect(lambda _, p=product: self.mark_product_ordered(p))
-            self.reorder_table.setCellWidget(i, 3, order_btn)
-        
-        # Update Full Inventory table
-        inventory = self.inventory_manager.get_inventory_breakdown()
-        self.inventory_table.setRowCount(len(inventory))
-        for i, item in enumerate(inventory):
-            self.inventory_table.setItem(i, 0, QTableWidgetItem(item['name']))
-            self.inventory_table.setItem(i, 1, QTableWidgetItem(str(item['store_quantity'])))
-            self.inventory_table.setItem(i, 2, QTableWidgetItem(str(item['warehouse_quantity'])))
-            self.inventory_table.setItem(i, 3, QTableWidgetItem(str(item['total_quantity'])))
-            
-            # Highlight low quantities
-            if item['store_quantity'] < self.inventory_manager.MIN_STORE_THRESHOLD:
-                self.highlight_row(self.inventory_table, i, QColor(255, 200, 200))
-            elif item['total_quantity'] < self.inventory_manager.MIN_TOTAL_THRESHOLD:
-                self.highlight_row(self.inventory_table, i, QColor(255, 255, 200))
+        # Suggestion lists are short; the full inventory is paged
+        self.assembly_model.set_rows(self.inventory_manager.get_assembly_suggestions())
+        self.reorder_model.set_rows(self.inventory_manager.get_reorder_suggestions())
+        self.inventory_model.refresh()
         
         # Resize columns to content
         self.assembly_table.resizeColumnsToContents()
         self.reorder_table.resizeColumnsToContents()
         self.inventory_table.resizeColumnsToContents()
     
+    def stock_color(self, item):
+        # Highlight low quantities
+        if item.store_quantity < self.inventory_manager.MIN_STORE_THRESHOLD:
+            return QColor(255, 200, 200)
+        elif item.total_quantity < self.inventory_manager.MIN_TOTAL_THRESHOLD:
+            return QColor(255, 255, 200)
+        return None
+    
     def show_assembly_dialog(self, product):
         dialog = AssemblyDialog(product, self)
         if dialog.exec():
@@ -145,12 +146,6 @@ class InventoryDashboardWidget(QWidget):
         except ValueError as e:
             QMessageBox.warning(self, 'Error', str(e))
     
-    def highlight_row(self, table, row, color):
-        for col in range(table.columnCount()):
-            item = table.item(row, col)
-            if item:
-                item.setBackground(color)
-
 class AssemblyDialog(QDialog):
     def __init__(self, product, parent=None):
         super().__init__(parent)
@@ -1,6 +1,7 @@
 from datetime import datetime
 from sqlalchemy import and_
-from database import Product
+from database import PRODUCT_TOTAL_QUANTITY, Product
+from read_models import ReadModels
 
 class InventoryManager:
     def __init__(self, db_manager):
@@ -18,18 +19,15 @@ class InventoryManager:
         return self.db.add_product(product_data)
     
     def get_inventory_breakdown(self):
-        """List all products with store and warehouse quantities."""
-        products = self.db.session.query(Product).all()
-        return [{
-            'id': p.id,
-            'name': p.name,
-            'store_quantity': p.store_quantity,
-            'warehouse_quantity': p.warehouse_quantity,
-            'total_quantity': p.store_quantity + p.warehouse_quantity
-        } for p in products]
+        """List all products with store and warehouse quantities as StockRow tuples."""
+        return ReadModels(self.db).stock_rows()
     
     def get_assembly_suggestions(self, min_store_threshold=None):
-        """Get list of products that need assembly (low store quantity)."""
+        """Get list of products that need assembly (low store quantity).
+        
+        Uses the store_quantity index; see also DatabaseManager's
+        trigger-maintained per-product alerts.
+        """
         threshold = min_store_threshold or self.MIN_STORE_THRESHOLD
         return self.db.session.query(Product).filter(
             and_(
@@ -41,9 +39,8 @@ class InventoryManager:
     def get_reorder_suggestions(self, min_total_threshold=None):
         """Get list of products that need reordering (low total quantity)."""
         threshold = min_total_threshold or self.MIN_TOTAL_THRESHOLD
-        return self.db.session.query(Product).filter(
-            (Product.store_quantity + Product.warehouse_quantity) < threshold
-        ).all()
+        # Same expression as ix_products_total_quantity, so it is a range lookup
+        return self.db.session.query(Product).filter(PRODUCT_TOTAL_QUANTITY < threshold).all()
     
     def assemble_products(self, product_id, quantity):
         """Transfer products from warehouse to store after assembly."""
@@ -54,6 +51,7 @@ class InventoryManager:
         if product.warehouse_quantity < quantity:
             raise ValueError(f"Insufficient warehouse quantity. Available: {product.warehouse_quantity}")
         
+        self.db.stock_ledger.set_reason(self.db.session, 'assembly')
         product.warehouse_quantity -= quantity
         product.store_quantity += quantity
         product.updated_at = datetime.now()
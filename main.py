@@ -1,26 +1,171 @@
 import sys
+from startup_profile import ImportTimer, StartupReport
+# Installed before the app's own imports so the report can time them
+import_timer = ImportTimer().install() if '--startup-report' in sys.argv else None
+
 import os
+import time
+import uuid
+from functools import partial
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QStackedWidget,
-                             QTableWidget, QTableWidgetItem, QMessageBox, QComboBox)
-from PyQt6.QtCore import Qt
+                             QTableWidget, QTableWidgetItem, QTableView, QMessageBox,
+                             QComboBox, QLineEdit)
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
-from PyQt6.QtGui import QFont, QPainter, QPixmap
-from database import DatabaseManager
+from PyQt6.QtGui import QFont, QPainter, QPixmap, QColor
+from database import DatabaseManager, InsufficientStockError, ItemReservedError, fts_query
+from read_models import ReadModels
+from table_models import (ActionButtonDelegate, QueryTableModel, RowTableModel,
+                          TableColumn, selected_row)
+from async_db import AsyncDataAccess
 from qr_handler import QRHandler
-from datetime import datetime, timedelta
-from reports import ReportsWidget
-from charts import ChartWidget
-from repair_ui import RepairTaskWidget
-from todo_ui import TodoWidget
+from datetime import datetime
+from inventory_manager import InventoryManager
+from dashboard_stats import DashboardStats
+from change_feed import ChangeWatcher
+
+RESERVATION_SWEEP_MS = 60 * 1000
+# Dashboard stats also refresh after every commit the change watcher sees
+DASHBOARD_STATS_REFRESH_MS = 30 * 1000
+# How often to check the database file for commits by other terminals
+CHANGE_POLL_MS = 250
+# How often to check whether a stock snapshot checkpoint is due
+STOCK_SNAPSHOT_CHECK_MS = 60 * 60 * 1000
+
+def quantity_text(product):
+    store_qty = product.store_quantity or 0
+    warehouse_qty = product.warehouse_quantity or 0
+    return f"{store_qty + warehouse_qty} (S:{store_qty}, W:{warehouse_qty})"
+
+def low_stock_color(product):
+    # Light red when total stock is at or below the reorder threshold
+    threshold = product.reorder_threshold if product.reorder_threshold is not None else 5
+    if (product.store_quantity or 0) + (product.warehouse_quantity or 0) <= threshold:
+        return QColor(255, 200, 200)
+    return None
+
+def stock_location(product):
+    locations = [name for name, qty in (('store', product.store_quantity),
+                                        ('warehouse', product.warehouse_quantity)) if qty]
+    return ', '.join(locations) or '-'
+
+INVENTORY_COLUMNS = [
+    TableColumn('ID', lambda p: str(p.id), 'id'),
+    TableColumn('Name', lambda p: p.name, 'name'),
+    TableColumn('Category', lambda p: p.category or 'Uncategorized', 'category'),
+    TableColumn('Quantity', quantity_text, 'quantity', low_stock_color),
+    TableColumn('Purchase Price', lambda p: f"₹{p.purchase_price:.2f}", 'purchase_price'),
+    TableColumn('Selling Price', lambda p: f"₹{p.selling_price:.2f}", 'selling_price'),
+    TableColumn('Location', stock_location),
+    TableColumn('Supplier', lambda p: p.supplier_info or '', 'supplier'),
+]
+
+CUSTOMER_COLUMNS = [
+    TableColumn('ID', lambda c: str(c.id), 'id'),
+    TableColumn('Name', lambda c: c.name, 'name'),
+    TableColumn('Phone', lambda c: c.phone or '', 'phone'),
+    TableColumn('Email', lambda c: c.email or '', 'email'),
+    TableColumn('Loyalty Points', lambda c: str(c.loyalty_points), 'loyalty_points'),
+]
+
+# Dashboard stat box per load_dashboard_stats() value: (title, formatter)
+STAT_BOXES = {
+    'total_products': ('Total Products', str),
+    'low_stock_items': ('Low Stock Items', str),
+    'today_sales': ('Today\'s Sales', lambda value: f"₹{value:.2f}"),
+    'monthly_revenue': ('Monthly Revenue', lambda value: f"₹{value:.2f}"),
+}
+
+# Tables each page shows, by page index. A change to one of them refreshes
+# the page if it is showing, or marks it for a refresh when next shown.
+PAGE_TABLES = {
+    0: {'sales'},
+    1: {'products'},
+    3: {'customers'},
+    5: {'products'},
+    6: {'repair_tasks', 'customers'},
+    7: {'todo_tasks', 'products'},
+}
+
+LOW_STOCK_COLUMNS = [
+    TableColumn('Product', lambda p: p.name, lambda p: p.name),
+    TableColumn('Current Quantity', quantity_text,
+                lambda p: p.store_quantity + p.warehouse_quantity),
+    TableColumn('Threshold', lambda p: str(p.reorder_threshold), lambda p: p.reorder_threshold),
+    TableColumn('Supplier', lambda p: p.supplier_info or '', lambda p: p.supplier_info or ''),
+    TableColumn('Actions', lambda p: 'Reorder'),
+]
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup_report=None):
         super().__init__()
+        self.startup_report = startup_report
         self.db = DatabaseManager()
+        self.read_models = ReadModels(self.db)
+        self.async_db = AsyncDataAccess(self.db.db_path, parent=self)
+        self.async_db.error.connect(self.show_background_error)
+        self.cart_id = uuid.uuid4().hex  # reservations for the open cart
         self.qr_handler = QRHandler()
+        self.dashboard_stats = DashboardStats(self.async_db, DASHBOARD_STATS_REFRESH_MS, parent=self)
+        self.dashboard_stats.changed.connect(self.show_stat)
         self.load_stylesheet()
         self.setup_ui()
+        
+        # Follow commits from this and other terminals sharing the file
+        self.change_watcher = ChangeWatcher(self.db, CHANGE_POLL_MS, parent=self)
+        self.change_watcher.changed.connect(self.on_data_changed)
+        self.warm_serial_index()
+        
+        # Free stock held by abandoned carts
+        self.reservation_timer = QTimer(self)
+        self.reservation_timer.timeout.connect(self.sweep_reservations)
+        self.reservation_timer.start(RESERVATION_SWEEP_MS)
+        
+        # Checkpoint stock counters so past-date stock queries stay cheap
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.timeout.connect(self.snapshot_stock)
+        self.snapshot_timer.timeout.connect(self.prune_stock_snapshots)
+        self.snapshot_timer.timeout.connect(self.prune_change_log)
+        self.snapshot_timer.start(STOCK_SNAPSHOT_CHECK_MS)
+        self.snapshot_stock()
+    
+    def sweep_reservations(self):
+        self.async_db.submit('reservation-sweep', lambda db: db.sweep_expired_reservations(),
+                             lambda count: None)
+    
+    def snapshot_stock(self):
+        self.async_db.submit('stock-snapshot', lambda db: db.take_stock_snapshot_if_due(),
+                             lambda count: None)
+    
+    def prune_stock_snapshots(self):
+        self.async_db.submit('stock-snapshot-prune', lambda db: db.prune_stock_snapshots(),
+                             lambda count: None)
+    
+    def prune_change_log(self):
+        self.async_db.submit('change-log-prune', lambda db: db.prune_data_changes(),
+                             lambda count: None)
+    
+    def closeEvent(self, event):
+        self.change_watcher.stop()
+        self.dashboard_stats.stop()
+        # Give back whatever the open cart still holds
+        self.db.release_cart(self.cart_id)
+        super().closeEvent(event)
+    
+    def warm_serial_index(self):
+        # Load serial numbers off the GUI thread; scans before it finishes
+        # fall back to the database
+        self.async_db.submit(
+            'serial-index',
+            lambda db: db.warm_serial_index(),
+            lambda count: self.statusBar().showMessage(f"{count} serial numbers indexed", 5000)
+        )
+    
+    def show_background_error(self, key, error):
+        # Background jobs without an error handler of their own, e.g. the
+        # reservation sweep or dashboard stats
+        self.statusBar().showMessage(f"Background task '{key}' failed: {error}", 10000)
     
     def load_stylesheet(self):
         # Load and apply the QSS stylesheet
@@ -66,19 +211,33 @@ class MainWindow(QMainWindow):
         sidebar_layout.addStretch()
         layout.addWidget(sidebar)
         
-        # Create stacked widget for different pages
+        # Create stacked widget for different pages. Pages are built on
+        # first visit; until then each slot holds an empty placeholder.
         self.stacked_widget = QStackedWidget()
         layout.addWidget(self.stacked_widget)
         
-        # Create pages
-        self.create_dashboard_page()
-        self.create_inventory_page()
-        self.create_sales_page()
-        self.create_customers_page()
-        self.create_reports_page()
-        self.create_low_stock_page()
-        self.create_repair_tasks_page()
-        self.create_todo_tasks_page()
+        self.page_builders = [
+            self.create_dashboard_page,
+            self.create_inventory_page,
+            self.create_sales_page,
+            self.create_customers_page,
+            self.create_reports_page,
+            self.create_low_stock_page,
+            self.create_repair_tasks_page,
+            self.create_todo_tasks_page
+        ]
+        self.pages = [None] * len(self.page_builders)
+        self.stale_pages = set()  # built pages to refresh when next shown
+        self.page_refreshers = {
+            0: lambda: self.dashboard_chart.update_chart() if hasattr(self, 'dashboard_chart') else None,
+            1: lambda: self.inventory_model.reload(),
+            3: lambda: self.customers_model.reload(),
+            5: self.update_low_stock_table,
+            6: lambda: self.pages[6].refresh_tasks(),
+            7: lambda: self.pages[7].load_tasks(),
+        }
+        for _ in self.page_builders:
+            self.stacked_widget.addWidget(QWidget())
         
         # Show dashboard by default
         self.show_dashboard()
@@ -97,40 +256,42 @@ class MainWindow(QMainWindow):
         stats_widget = QWidget()
         stats_layout = QHBoxLayout(stats_widget)
         
-        # Add stat boxes
-        stat_boxes = [
-            ('Total Products', self.get_total_products),
-            ('Low Stock Items', self.get_low_stock_count),
-            ('Today\'s Sales', self.get_today_sales),
-            ('Monthly Revenue', self.get_monthly_revenue)
-        ]
-        
-        for title, callback in stat_boxes:
+        # Add stat boxes; DashboardStats fills them in off the GUI thread
+        self.stat_labels = {}
+        for name, (title, _) in STAT_BOXES.items():
             box = QWidget()
             box.setProperty('class', 'stat-box')
             box_layout = QVBoxLayout(box)
             
             title_label = QLabel(title)
-            value_label = QLabel(str(callback()))
+            value_label = QLabel('…')
             value_label.setFont(QFont('Arial', 20))
+            self.stat_labels[name] = value_label
             
             box_layout.addWidget(title_label)
             box_layout.addWidget(value_label)
             stats_layout.addWidget(box)
         
         layout.addWidget(stats_widget)
+        for name, value in self.dashboard_stats.values.items():
+            self.show_stat(name, value)
+        self.dashboard_stats.refresh()
         
         # Add a chart to the dashboard
         chart_label = QLabel('Sales Overview')
         chart_label.setFont(QFont('Arial', 16))
         layout.addWidget(chart_label)
         
-        # Add chart widget
-        chart_widget = ChartWidget(self.db)
-        chart_widget.setMaximumHeight(400)  # Limit height
-        layout.addWidget(chart_widget)
+        # Add chart widget once the window is up; QtCharts is slow to load
+        QTimer.singleShot(0, lambda: self.add_dashboard_chart(layout))
         
-        self.stacked_widget.addWidget(page)
+        return page
+    
+    def add_dashboard_chart(self, layout):
+        from charts import ChartWidget
+        self.dashboard_chart = ChartWidget(self.db)
+        self.dashboard_chart.setMaximumHeight(400)  # Limit height
+        layout.addWidget(self.dashboard_chart)
     
     def create_inventory_page(self):
         page = QWidget()
@@ -160,28 +321,30 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(actions)
         
-        # Location filter
+        # Search and location filter
         location_layout = QHBoxLayout()
+        self.inventory_search = QLineEdit()
+        self.inventory_search.setPlaceholderText('Search name, description, category or supplier')
+        self.inventory_search.setClearButtonEnabled(True)
+        self.inventory_search.textChanged.connect(self.update_inventory_table)
+        location_layout.addWidget(self.inventory_search)
         location_label = QLabel('Filter by Location:')
         self.location_filter = QComboBox()
         self.location_filter.addItems(['All', 'store', 'warehouse', 'assembly'])
         self.location_filter.currentTextChanged.connect(self.update_inventory_table)
         location_layout.addWidget(location_label)
         location_layout.addWidget(self.location_filter)
-        location_layout.addStretch()
         layout.addLayout(location_layout)
         
-        # Add inventory table
-        self.inventory_table = QTableWidget()
-        self.inventory_table.setColumnCount(8)
-        self.inventory_table.setHorizontalHeaderLabels([
-            'ID', 'Name', 'Category', 'Quantity', 'Purchase Price',
-            'Selling Price', 'Location', 'Supplier'
-        ])
+        # Add inventory table, paged in from the database as it scrolls
+        self.inventory_model = QueryTableModel(INVENTORY_COLUMNS, parent=self)
+        self.inventory_table = QTableView()
+        self.inventory_table.setModel(self.inventory_model)
+        self.inventory_table.setSortingEnabled(True)
         layout.addWidget(self.inventory_table)
         
-        self.stacked_widget.addWidget(page)
         self.update_inventory_table()
+        return page
     
     def create_sales_page(self):
         page = QWidget()
@@ -203,6 +366,9 @@ class MainWindow(QMainWindow):
         self.sales_table.setHorizontalHeaderLabels([
             'Product', 'Quantity', 'Unit Price', 'Subtotal', 'Actions'
         ])
+        self.remove_delegate = ActionButtonDelegate(self.sales_table)
+        self.remove_delegate.clicked.connect(lambda index: self.remove_from_sale(index.row()))
+        self.sales_table.setItemDelegateForColumn(4, self.remove_delegate)
         layout.addWidget(self.sales_table)
         
         # Add total amount display
@@ -225,7 +391,7 @@ class MainWindow(QMainWindow):
         layout.addLayout(total_layout)
         layout.addLayout(print_layout)
         
-        self.stacked_widget.addWidget(page)
+        return page
     
     def print_bill(self):
         if self.sales_table.rowCount() == 0:
@@ -258,81 +424,34 @@ class MainWindow(QMainWindow):
                 dialog = QPrintDialog(printer, self)
                 
                 if dialog.exec() == QPrintDialog.DialogCode.Accepted:
-                    # Create painter for drawing
-                    painter = QPainter(printer)
-                    
-                    # Set font for bill
-                    font = QFont('Arial', 10)
-                    painter.setFont(font)
-                    
-                    # Starting position
-                    x = 100
-                    y = 100
-                    
-                    # Print header
-                    painter.drawText(x, y, "Shop Inventory Management System")
-                    y += 30
-                    painter.drawText(x, y, "Sales Receipt")
-                    y += 30
-                    painter.drawText(x, y, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-                    y += 30
-                    
-                    # Print customer information
-                    painter.drawText(x, y, f"Customer: {customer_name}")
-                    y += 20
-                    painter.drawText(x, y, f"Phone: {customer_phone}")
-                    y += 20
-                    painter.drawText(x, y, f"Email: {customer_email}")
-                    y += 30
-                    
-                    # Print column headers
-                    col_width = 150
-                    painter.drawText(x, y, "Product")
-                    painter.drawText(x + col_width, y, "Quantity")
-                    painter.drawText(x + col_width * 2, y, "Unit Price")
-                    painter.drawText(x + col_width * 3, y, "Subtotal")
-                    y += 30
-                    
-                    # Print items and collect sale items data
+                    # Collect sale items data, and the bill lines to print
                     total_amount = 0
                     items_data = []
+                    bill_lines = []
                     
                     for row in range(self.sales_table.rowCount()):
-                        product = self.sales_table.item(row, 0).text()
                         product_id = self.sales_table.item(row, 0).data(Qt.ItemDataRole.UserRole)
                         serial_number = self.sales_table.item(row, 0).data(Qt.ItemDataRole.UserRole + 1)
                         quantity = int(self.sales_table.item(row, 1).text())
                         unit_price = self.sales_table.item(row, 2).text()
                         subtotal = self.sales_table.item(row, 3).text()
                         
-                        painter.drawText(x, y, f"{product} (SN: {serial_number})")
-                        painter.drawText(x + col_width, y, str(quantity))
-                        painter.drawText(x + col_width * 2, y, unit_price)
-                        painter.drawText(x + col_width * 3, y, subtotal)
-                        
                         # Extract amount from subtotal (remove currency symbol)
                         amount = float(subtotal.replace('₹', '').strip())
                         total_amount += amount
                         
-                        # Add to items data for database
                         items_data.append({
                             'product_id': product_id,
                             'quantity': quantity,
                             'unit_price': float(unit_price.replace('₹', '').strip()),
-                            'subtotal': amount
+                            'subtotal': amount,
+                            'serial_numbers': [serial_number] if serial_number else []
                         })
-                        
-                        y += 30
-                    
-                    # Print total
-                    y += 30
-                    painter.drawText(x + col_width * 2, y, "Total Amount:")
-                    painter.drawText(x + col_width * 3, y, f"₹{total_amount:.2f}")
-                    
-                    # End painting
-                    painter.end()
+                        bill_lines.append((self.sales_table.item(row, 0).text(), serial_number,
+                                           quantity, unit_price, subtotal))
                     
-                    # Save sale to database
+                    # Save sale to database before printing; it fails as a
+                    # whole if another terminal sold the last units
                     sale_data = {
                         'customer_id': customer.id,
                         'total_amount': total_amount,
@@ -340,19 +459,108 @@ class MainWindow(QMainWindow):
                         'sale_date': datetime.now()
                     }
                     
-                    self.db.add_sale(sale_data, items_data)
+                    try:
+                        self.db.add_sale(sale_data, items_data, cart_id=self.cart_id)
+                    except InsufficientStockError as e:
+                        QMessageBox.warning(self, "Insufficient Stock", str(e))
+                        return
                     
-                    # Clear sales table
+                    # The sale is recorded: empty the cart before printing
+                    # can fail, so the same goods can't be checked out twice
+                    self.cart_id = uuid.uuid4().hex
                     self.sales_table.setRowCount(0)
                     self.update_sales_total()
                     
-                    QMessageBox.information(self, "Success", "Bill printed successfully and sale recorded!")
+                    bill = {
+                        'date': sale_data['sale_date'],
+                        'customer_name': customer_name,
+                        'customer_phone': customer_phone,
+                        'customer_email': customer_email,
+                        'lines': bill_lines,
+                        'total_amount': total_amount,
+                    }
+                    self.print_recorded_bill(printer, bill)
                     
             except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to print bill: {str(e)}")
+                QMessageBox.critical(self, "Error", f"Failed to record sale: {str(e)}")
         else:
             QMessageBox.information(self, "Cancelled", "Bill printing cancelled.")
     
+    def print_recorded_bill(self, printer, bill):
+        """Print the bill of a sale that is already recorded, offering a
+        reprint (never a second sale) when printing fails.
+        """
+        while True:
+            try:
+                self.paint_bill(printer, bill)
+            except Exception as e:
+                answer = QMessageBox.question(
+                    self, "Printing Failed",
+                    f"The sale was recorded, but the bill could not be printed: {str(e)}\n\n"
+                    "Try printing the bill again?")
+                if answer != QMessageBox.StandardButton.Yes:
+                    return
+                if QPrintDialog(printer, self).exec() != QPrintDialog.DialogCode.Accepted:
+                    return
+                continue
+            QMessageBox.information(self, "Success", "Bill printed successfully and sale recorded!")
+            return
+    
+    def paint_bill(self, printer, bill):
+        # Create painter for drawing
+        painter = QPainter()
+        if not painter.begin(printer):
+            raise RuntimeError("the printer could not be opened")
+        try:
+            # Set font for bill
+            font = QFont('Arial', 10)
+            painter.setFont(font)
+            
+            # Starting position
+            x = 100
+            y = 100
+            
+            # Print header
+            painter.drawText(x, y, "Shop Inventory Management System")
+            y += 30
+            painter.drawText(x, y, "Sales Receipt")
+            y += 30
+            painter.drawText(x, y, f"Date: {bill['date'].strftime('%Y-%m-%d %H:%M')}")
+            y += 30
+            
+            # Print customer information
+            painter.drawText(x, y, f"Customer: {bill['customer_name']}")
+            y += 20
+            painter.drawText(x, y, f"Phone: {bill['customer_phone']}")
+            y += 20
+            painter.drawText(x, y, f"Email: {bill['customer_email']}")
+            y += 30
+            
+            # Print column headers
+            col_width = 150
+            painter.drawText(x, y, "Product")
+            painter.drawText(x + col_width, y, "Quantity")
+            painter.drawText(x + col_width * 2, y, "Unit Price")
+            painter.drawText(x + col_width * 3, y, "Subtotal")
+            y += 30
+            
+            # Print items
+            for product, serial_number, quantity, unit_price, subtotal in bill['lines']:
+                painter.drawText(x, y, f"{product} (SN: {serial_number})")
+                painter.drawText(x + col_width, y, str(quantity))
+                painter.drawText(x + col_width * 2, y, unit_price)
+                painter.drawText(x + col_width * 3, y, subtotal)
+                
+                y += 30
+            
+            # Print total
+            y += 30
+            painter.drawText(x + col_width * 2, y, "Total Amount:")
+            painter.drawText(x + col_width * 3, y, f"₹{bill['total_amount']:.2f}")
+        finally:
+            # End painting
+            painter.end()
+    
     def create_customers_page(self):
         page = QWidget()
         layout = QVBoxLayout(page)
@@ -375,20 +583,27 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(actions)
         
+        # Search box
+        self.customer_search = QLineEdit()
+        self.customer_search.setPlaceholderText('Search name, phone or email')
+        self.customer_search.setClearButtonEnabled(True)
+        self.customer_search.textChanged.connect(self.update_customers_table)
+        layout.addWidget(self.customer_search)
+        
         # Add customers table
-        self.customers_table = QTableWidget()
-        self.customers_table.setColumnCount(5)
-        self.customers_table.setHorizontalHeaderLabels([
-            'ID', 'Name', 'Phone', 'Email', 'Loyalty Points'
-        ])
+        self.customers_model = QueryTableModel(CUSTOMER_COLUMNS, parent=self)
+        self.customers_table = QTableView()
+        self.customers_table.setModel(self.customers_model)
+        self.customers_table.setSortingEnabled(True)
         layout.addWidget(self.customers_table)
         
-        self.stacked_widget.addWidget(page)
+        self.update_customers_table()
+        return page
     
     def create_reports_page(self):
         # Create reports widget with integrated charts
-        reports_widget = ReportsWidget(self.db)
-        self.stacked_widget.addWidget(reports_widget)
+        from reports import ReportsWidget
+        return ReportsWidget(self.db)
     
     def create_low_stock_page(self):
         page = QWidget()
@@ -399,123 +614,123 @@ class MainWindow(QMainWindow):
         header.setFont(QFont('Arial', 24))
         layout.addWidget(header)
         
-        # Add low stock table
-        self.low_stock_table = QTableWidget()
-        self.low_stock_table.setColumnCount(5)
-        self.low_stock_table.setHorizontalHeaderLabels([
-            'Product', 'Current Quantity', 'Threshold', 'Supplier', 'Actions'
-        ])
+        # Add low stock table; the Reorder buttons are painted by a delegate
+        self.low_stock_model = RowTableModel(LOW_STOCK_COLUMNS, parent=self)
+        self.low_stock_table = QTableView()
+        self.low_stock_table.setModel(self.low_stock_model)
+        self.low_stock_table.setSortingEnabled(True)
+        self.reorder_delegate = ActionButtonDelegate(self.low_stock_table)
+        self.reorder_delegate.clicked.connect(
+            lambda index: self.reorder_product(self.low_stock_model.row_at(index.row())))
+        self.low_stock_table.setItemDelegateForColumn(4, self.reorder_delegate)
         layout.addWidget(self.low_stock_table)
         
-        self.stacked_widget.addWidget(page)
         self.update_low_stock_table()
+        return page
     
     # Navigation methods
+    def show_page(self, index):
+        """Switch to a page, building it on first visit."""
+        if self.pages[index] is None:
+            start = time.perf_counter()
+            placeholder = self.stacked_widget.widget(index)
+            page = self.page_builders[index]()
+            self.pages[index] = page
+            self.stacked_widget.insertWidget(index, page)
+            self.stacked_widget.removeWidget(placeholder)
+            placeholder.deleteLater()
+            if self.startup_report:
+                self.startup_report.page_built(self.page_builders[index].__name__,
+                                               time.perf_counter() - start)
+        elif index in self.stale_pages:
+            self.page_refreshers[index]()
+        self.stale_pages.discard(index)
+        self.stacked_widget.setCurrentIndex(index)
+    
     def show_dashboard(self):
-        self.stacked_widget.setCurrentIndex(0)
+        self.show_page(0)
     
     def show_inventory(self):
-        self.stacked_widget.setCurrentIndex(1)
-        self.update_inventory_table()
+        self.show_page(1)
     
     def show_sales(self):
-        self.stacked_widget.setCurrentIndex(2)
+        self.show_page(2)
     
     def show_customers(self):
-        self.stacked_widget.setCurrentIndex(3)
+        self.show_page(3)
     
     def show_reports(self):
-        self.stacked_widget.setCurrentIndex(4)
+        self.show_page(4)
     
     def show_low_stock(self):
-        self.stacked_widget.setCurrentIndex(5)
+        self.show_page(5)
     
     def show_repair_tasks(self):
-        self.stacked_widget.setCurrentIndex(6)
+        self.show_page(6)
     
     def show_todo_tasks(self):
-        self.stacked_widget.setCurrentIndex(7)
+        self.show_page(7)
     
     def create_repair_tasks_page(self):
-        repair_widget = RepairTaskWidget(self.db)
-        self.stacked_widget.addWidget(repair_widget)
-        self.update_low_stock_table()
+        from repair_ui import RepairTaskWidget
+        return RepairTaskWidget(self.db)
     
     def create_todo_tasks_page(self):
-        todo_widget = TodoWidget()
-        self.stacked_widget.addWidget(todo_widget)
-    
-    # Utility methods
-    def get_total_products(self):
-        return len(self.db.get_all_products())
+        from todo_ui import TodoWidget
+        return TodoWidget()
     
-    def get_low_stock_count(self):
-        return len(self.db.get_low_stock_products())
+    def on_data_changed(self, table_name, ids):
+        """Refresh what shows table_name, now if on screen, else when shown."""
+        if table_name in ('products', 'sales'):
+            self.dashboard_stats.refresh_soon()
+        if table_name == 'product_items' and ids is None:
+            self.warm_serial_index()  # too many changes to sync one by one
+        current = self.stacked_widget.currentIndex()
+        for index, tables in PAGE_TABLES.items():
+            if table_name not in tables or self.pages[index] is None:
+                continue
+            if index == current:
+                # Several tables can change in one poll; refresh once
+                if index not in self.stale_pages:
+                    self.stale_pages.add(index)
+                    QTimer.singleShot(0, partial(self.refresh_page, index))
+            else:
+                self.stale_pages.add(index)
     
-    def get_today_sales(self):
-        today = datetime.now().date()
-        sales = self.db.get_sales_report(today, today + timedelta(days=1))
-        return sum(sale.total_amount for sale in sales)
+    def refresh_page(self, index):
+        if index in self.stale_pages:
+            self.stale_pages.discard(index)
+            self.page_refreshers[index]()
     
-    def get_monthly_revenue(self):
-        start_date = datetime.now().replace(day=1)
-        end_date = (start_date + timedelta(days=32)).replace(day=1)
-        sales = self.db.get_sales_report(start_date, end_date)
-        return sum(sale.total_amount for sale in sales)
+    # Utility methods
+    def show_stat(self, name, value):
+        label = self.stat_labels.get(name) if hasattr(self, 'stat_labels') else None
+        if label is not None:
+            label.setText(STAT_BOXES[name][1](value))
     
     def update_inventory_table(self):
-        products = self.db.get_all_products()
-        
-        # Filter by location if needed
-        location_filter = self.location_filter.currentText() if hasattr(self, 'location_filter') else 'All'
-        if location_filter != 'All':
-            products = [p for p in products if hasattr(p, 'location') and p.location == location_filter]
-        
-        self.inventory_table.setRowCount(len(products))
-        
-        for row, product in enumerate(products):
-            # Basic product information
-            self.inventory_table.setItem(row, 0, QTableWidgetItem(str(product.id)))
-            self.inventory_table.setItem(row, 1, QTableWidgetItem(product.name))
-            self.inventory_table.setItem(row, 2, QTableWidgetItem(product.category or 'Uncategorized'))
-            
-            # Quantity information
-            store_qty = getattr(product, 'store_quantity', 0)
-            warehouse_qty = getattr(product, 'warehouse_quantity', 0)
-            total_qty = store_qty + warehouse_qty
-            
-            # Format quantity display
-            qty_text = f"{total_qty} (S:{store_qty}, W:{warehouse_qty})"
-            qty_item = QTableWidgetItem(qty_text)
-            
-            # Highlight low stock
-            if total_qty <= getattr(product, 'reorder_threshold', 5):
-                qty_item.setBackground(QColor(255, 200, 200))  # Light red for low stock
-            
-            self.inventory_table.setItem(row, 3, qty_item)
-            
-            # Price information
-            self.inventory_table.setItem(row, 4, QTableWidgetItem(f"₹{product.purchase_price:.2f}"))
-            self.inventory_table.setItem(row, 5, QTableWidgetItem(f"₹{product.selling_price:.2f}"))
-            
-            # Location and supplier info
-            location = getattr(product, 'location', 'store')
-            self.inventory_table.setItem(row, 6, QTableWidgetItem(location))
-            self.inventory_table.setItem(row, 7, QTableWidgetItem(getattr(product, 'supplier_info', '')))
+        search_text = self.inventory_search.text()
+        location = self.location_filter.currentText()
+        # Searching, filtering and sorting all run in SQL; the model fetches
+        # further pages as the table scrolls
+        self.inventory_model.set_loader(partial(
+            self.read_models.product_page,
+            search=search_text if fts_query(search_text) else None,
+            location=None if location == 'All' else location
+        ))
     
     def update_low_stock_table(self):
-        products = self.db.get_low_stock_products()
-        self.low_stock_table.setRowCount(len(products))
-        
-        for row, product in enumerate(products):
-            self.low_stock_table.setItem(row, 0, QTableWidgetItem(product.name))
-            total_qty = product.store_quantity + product.warehouse_quantity
-            self.low_stock_table.setItem(row, 1, QTableWidgetItem(f"{total_qty} (S:{product.store_quantity}, W:{product.warehouse_quantity})"))
-            self.low_stock_table.setItem(row, 2, QTableWidgetItem(str(product.reorder_threshold)))
-            self.low_stock_table.setItem(row, 3, QTableWidgetItem(product.supplier_info))
-            
-            reorder_btn = QPushButton('Reorder')
-            self.low_stock_table.setCellWidget(row, 4, reorder_btn)
+        if not hasattr(self, 'low_stock_model'):
+            return  # loaded when the page is first built
+        self.low_stock_model.set_rows(self.read_models.low_stock_rows())
+    
+    def reorder_product(self, product):
+        try:
+            InventoryManager(self.db).mark_product_ordered(product.id)
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
+        QMessageBox.information(self, "Reorder", f"Marked {product.name} as ordered.")
     
     # Event handlers
     def add_product(self):
@@ -529,15 +744,12 @@ class MainWindow(QMainWindow):
             self.show_inventory()
     
     def edit_product(self):
-        selected_items = self.inventory_table.selectedItems()
-        if not selected_items:
+        selected = selected_row(self.inventory_table)
+        if selected is None:
             QMessageBox.warning(self, "No Selection", "Please select a product to edit.")
             return
         
-        # Get the product ID from the first column of the selected row
-        row = selected_items[0].row()
-        product_id = int(self.inventory_table.item(row, 0).text())
-        product = self.db.get_product(product_id)
+        product = self.db.get_product(selected.id)
         
         if product:
             from dialogs import ProductDialog
@@ -551,15 +763,13 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Could not find the selected product.")
     
     def delete_product(self):
-        selected_items = self.inventory_table.selectedItems()
-        if not selected_items:
+        selected = selected_row(self.inventory_table)
+        if selected is None:
             QMessageBox.warning(self, "No Selection", "Please select a product to delete.")
             return
         
-        # Get the product ID from the first column of the selected row
-        row = selected_items[0].row()
-        product_id = int(self.inventory_table.item(row, 0).text())
-        product_name = self.inventory_table.item(row, 1).text()
+        product_id = selected.id
+        product_name = selected.name
         
         # Confirm deletion
         confirm = QMessageBox.question(
@@ -580,15 +790,13 @@ class MainWindow(QMainWindow):
                 
     def print_inventory_qr_code(self):
         # Get selected product from inventory table
-        selected_items = self.inventory_table.selectedItems()
-        if not selected_items:
+        selected = selected_row(self.inventory_table)
+        if selected is None:
             QMessageBox.warning(self, "No Selection", "Please select a product to print QR code.")
             return
         
-        # Get product ID from the selected row
-        row = selected_items[0].row()
-        product_id = int(self.inventory_table.item(row, 0).text())
-        product_name = self.inventory_table.item(row, 1).text()
+        product_id = selected.id
+        product_name = selected.name
         
         # Ask for quantity
         from PyQt6.QtWidgets import QInputDialog
@@ -692,60 +900,7 @@ class MainWindow(QMainWindow):
             self.qr_handler.stop_camera()
             
             if qr_data:
-                # Parse QR data (format: product_id|product_name|quantity|serial_number)
-                try:
-                    qr_parts = qr_data.split('|')
-                    product_id = int(qr_parts[0])
-                    scan_quantity = int(qr_parts[2]) if len(qr_parts) > 2 else 1
-                    serial_number = qr_parts[3] if len(qr_parts) > 3 else None
-                    
-                    product = self.db.get_product(product_id)
-                    
-                    if product:
-                        if product.store_quantity >= scan_quantity:
-                            # Add product to sales table
-                            row = self.sales_table.rowCount()
-                            self.sales_table.insertRow(row)
-                            
-                            # Product name with ID as user data
-                            name_item = QTableWidgetItem(product.name)
-                            name_item.setData(Qt.ItemDataRole.UserRole, product.id)
-                            # Store serial number as additional user data if available
-                            if serial_number:
-                                name_item.setData(Qt.ItemDataRole.UserRole + 1, serial_number)
-                            self.sales_table.setItem(row, 0, name_item)
-                            
-                            # Quantity
-                            self.sales_table.setItem(row, 1, QTableWidgetItem(str(scan_quantity)))
-                            
-                            # Unit price
-                            self.sales_table.setItem(row, 2, QTableWidgetItem(f"₹{product.selling_price:.2f}"))
-                            
-                            # Subtotal
-                            subtotal = scan_quantity * product.selling_price
-                            self.sales_table.setItem(row, 3, QTableWidgetItem(f"₹{subtotal:.2f}"))
-                            
-                            # Remove button
-                            remove_btn = QPushButton("Remove")
-                            remove_btn.clicked.connect(lambda checked, r=row: self.remove_sale_item(r))
-                            self.sales_table.setCellWidget(row, 4, remove_btn)
-                            
-                            # Update total
-                            self.update_sales_total()
-                            
-                            # Update inventory - reduce store quantity
-                            product.store_quantity -= scan_quantity
-                            self.db.update_product(product.id, {'store_quantity': product.store_quantity})
-                            self.update_inventory_table()
-                            
-                            QMessageBox.information(self, "Success", f"Added {product.name} to cart.\nSerial Number: {serial_number}")
-                        else:
-                            QMessageBox.warning(self, "Insufficient Stock", 
-                                              f"Not enough stock available. Current store stock: {product.store_quantity}")
-                    else:
-                        QMessageBox.warning(self, "Product Not Found", "Could not find the scanned product.")
-                except Exception as e:
-                    QMessageBox.critical(self, "Error", f"Failed to process QR code: {str(e)}")
+                self.add_scanned_item(qr_data)
             else:
                 QMessageBox.information(self, "Cancelled", "QR code scanning was cancelled.")
                 
@@ -754,54 +909,96 @@ class MainWindow(QMainWindow):
             if self.qr_handler.camera:
                 self.qr_handler.stop_camera()
     
-    def add_to_sale(self, product, quantity=1):
-        """Add a product to the current sale"""
-        # Find if product already in sale table
-        for row in range(self.sales_table.rowCount()):
-            if self.sales_table.item(row, 0).data(Qt.ItemDataRole.UserRole) == product.id:
-                # Update quantity
-                current_qty = int(self.sales_table.item(row, 1).text())
-                new_qty = current_qty + quantity
-                self.sales_table.item(row, 1).setText(str(new_qty))
+    def add_scanned_item(self, qr_data):
+        """Add a scanned QR payload or barcode serial to the cart."""
+        try:
+            # QR codes carry product_id|product_name|quantity|serial_number,
+            # barcodes only the serial number
+            qr_parts = qr_data.split('|')
+            if len(qr_parts) == 1:
+                product_id = None
+                scan_quantity = 1
+                serial_number = qr_parts[0].strip()
+            else:
+                product_id = int(qr_parts[0])
+                scan_quantity = int(qr_parts[2]) if len(qr_parts) > 2 else 1
+                serial_number = qr_parts[3] if len(qr_parts) > 3 else None
+            
+            entry = self.db.resolve_serial(serial_number) if serial_number else None
+            if entry:
+                if entry.status != 'in_stock':
+                    QMessageBox.warning(self, "Already Sold",
+                                        f"Item {serial_number} is marked {entry.status}.")
+                    return
+                product_id = entry.product_id
+            
+            product = self.db.get_product(product_id) if product_id is not None else None
+            
+            if product:
+                # Hold the stock for this cart; it is taken at checkout
+                try:
+                    reservation_id = self.db.reserve_stock(
+                        self.cart_id, product.id, scan_quantity,
+                        serial_number=serial_number if entry else None)
+                except ItemReservedError as e:
+                    QMessageBox.warning(self, "Item Reserved", str(e))
+                    return
+                except ValueError as e:
+                    QMessageBox.warning(self, "Insufficient Stock", str(e))
+                    return
                 
-                # Update subtotal
-                unit_price = product.selling_price
-                subtotal = unit_price * new_qty
-                self.sales_table.item(row, 3).setText(f"${subtotal:.2f}")
-                return
-        
-        # Add new row if product not in table
-        row = self.sales_table.rowCount()
-        self.sales_table.setRowCount(row + 1)
-        
-        # Product name with ID as user data
-        name_item = QTableWidgetItem(product.name)
-        name_item.setData(Qt.ItemDataRole.UserRole, product.id)
-        
-        # Quantity
-        qty_item = QTableWidgetItem(str(quantity))
-        
-        # Unit price
-        price_item = QTableWidgetItem(f"₹{product.selling_price:.2f}")
-        
-        # Subtotal
-        subtotal = product.selling_price * quantity
-        subtotal_item = QTableWidgetItem(f"₹{subtotal:.2f}")
-        
-        # Add items to row
-        self.sales_table.setItem(row, 0, name_item)
-        self.sales_table.setItem(row, 1, qty_item)
-        self.sales_table.setItem(row, 2, price_item)
-        self.sales_table.setItem(row, 3, subtotal_item)
-        
-        # Add remove button
-        remove_btn = QPushButton("Remove")
-        remove_btn.clicked.connect(lambda: self.remove_from_sale(row))
-        self.sales_table.setCellWidget(row, 4, remove_btn)
+                if reservation_id:
+                    # Add product to sales table
+                    row = self.sales_table.rowCount()
+                    self.sales_table.insertRow(row)
+                    
+                    # Product name with ID as user data
+                    name_item = QTableWidgetItem(product.name)
+                    name_item.setData(Qt.ItemDataRole.UserRole, product.id)
+                    # Store serial number as additional user data if available
+                    if serial_number:
+                        name_item.setData(Qt.ItemDataRole.UserRole + 1, serial_number)
+                    name_item.setData(Qt.ItemDataRole.UserRole + 2, reservation_id)
+                    self.sales_table.setItem(row, 0, name_item)
+                    
+                    # Quantity
+                    self.sales_table.setItem(row, 1, QTableWidgetItem(str(scan_quantity)))
+                    
+                    # Unit price
+                    self.sales_table.setItem(row, 2, QTableWidgetItem(f"₹{product.selling_price:.2f}"))
+                    
+                    # Subtotal
+                    subtotal = scan_quantity * product.selling_price
+                    self.sales_table.setItem(row, 3, QTableWidgetItem(f"₹{subtotal:.2f}"))
+                    
+                    # Remove button, painted by remove_delegate
+                    self.sales_table.setItem(row, 4, QTableWidgetItem("Remove"))
+                    
+                    # Update total
+                    self.update_sales_total()
+                    
+                    QMessageBox.information(self, "Success", f"Added {product.name} to cart.\nSerial Number: {serial_number}")
+            else:
+                QMessageBox.warning(self, "Product Not Found", "Could not find the scanned product.")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to process QR code: {str(e)}")
     
     def remove_from_sale(self, row):
         """Remove a product from the current sale"""
+        reservation_id = self.sales_table.item(row, 0).data(Qt.ItemDataRole.UserRole + 2)
+        if reservation_id:
+            self.db.release_reservation(reservation_id)
         self.sales_table.removeRow(row)
+        self.update_sales_total()
+    
+    def update_sales_total(self):
+        """Recompute the cart total from the subtotal column"""
+        total = 0.0
+        for row in range(self.sales_table.rowCount()):
+            subtotal = self.sales_table.item(row, 3)
+            if subtotal:
+                total += float(subtotal.text().lstrip('₹$').strip())
+        self.total_amount_label.setText(f"₹{total:.2f}")
     
     def add_customer(self):
         from dialogs import CustomerDialog
@@ -811,15 +1008,12 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "Success", "Customer added successfully!")
     
     def edit_customer(self):
-        selected_items = self.customers_table.selectedItems()
-        if not selected_items:
+        selected = selected_row(self.customers_table)
+        if selected is None:
             QMessageBox.warning(self, "No Selection", "Please select a customer to edit.")
             return
         
-        # Get the customer ID from the first column of the selected row
-        row = selected_items[0].row()
-        customer_id = int(self.customers_table.item(row, 0).text())
-        customer = self.db.get_customer(customer_id)
+        customer = self.db.get_customer(selected.id)
         
         if customer:
             from dialogs import CustomerDialog
@@ -831,19 +1025,21 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Could not find the selected customer.")
             
     def update_customers_table(self):
-        customers = self.db.get_all_customers()
-        self.customers_table.setRowCount(len(customers))
-        
-        for row, customer in enumerate(customers):
-            self.customers_table.setItem(row, 0, QTableWidgetItem(str(customer.id)))
-            self.customers_table.setItem(row, 1, QTableWidgetItem(customer.name))
-            self.customers_table.setItem(row, 2, QTableWidgetItem(customer.phone))
-            self.customers_table.setItem(row, 3, QTableWidgetItem(customer.email))
-            self.customers_table.setItem(row, 4, QTableWidgetItem(str(customer.loyalty_points)))
+        search_text = self.customer_search.text()
+        self.customers_model.set_loader(partial(
+            self.read_models.customer_page,
+            search=search_text if fts_query(search_text) else None
+        ))
 
 def main():
+    report = StartupReport(import_timer) if import_timer else None
+    if report:
+        report.mark('imports done')
     app = QApplication(sys.argv)
-    window = MainWindow()
+    window = MainWindow(startup_report=report)
+    if report:
+        report.mark('window built')
+        report.watch(window)
     window.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+class ProductCache:
+    """Bounded LRU of product rows keyed by id, shared by every session of
+    one database.
+
+    Entries are plain column snapshots, never session-bound objects, so
+    any thread can read them. load() attaches a snapshot to the caller's
+    session with merge(load=False), which emits no SQL.
+
+    Sessions watched with watch() drop a product from the cache whenever
+    they flush or commit a change to it. Code that changes products with
+    Core UPDATE/DELETE statements must call invalidate() itself.
+    """
+
+    def __init__(self, model, max_size=1024):
+        self.model = model
+        self.max_size = max_size
+        self._columns = [attr.key for attr in inspect(model).column_attrs]
+        self._id_index = self._columns.index('id')
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def put(self, instance):
+        """Cache a loaded instance's column values."""
+        if self.max_size <= 0:
+            return
+        values = tuple(getattr(instance, key) for key in self._columns)
+        product_id = values[self._id_index]
+        with self._lock:
+            self._entries[product_id] = values
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, ids=None):
+        """Drop the given product ids, or everything when ids is None."""
+        with self._lock:
+            if ids is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                return
+            for product_id in ids:
+                if self._entries.pop(product_id, None) is not None:
+                    self.invalidations += 1
+
+    def invalidate_on_commit(self, session, ids):
+        """Drop ids now and again when session commits.
+
+        Another thread may cache the old row between a write and its commit.
+        """
+        self.invalidate(ids)
+        session.info.setdefault('changed_product_ids', set()).update(ids)
+
+    def load(self, session, product_id):
+        """Return the product attached to session without SQL, or None on a miss.
+
+        An instance the session already holds is returned as is when it is
+        loaded or has unflushed changes, so those changes are never
+        overwritten by the snapshot.
+        """
+        existing = session.identity_map.get(identity_key(self.model, product_id))
+        if existing is not None and existing not in session.deleted:
+            state = inspect(existing)
+            if not state.expired_attributes or state.modified:
+                self.hits += 1
+                return existing
+
+        with self._lock:
+            values = self._entries.get(product_id)
+            if values is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(product_id)
+            self.hits += 1
+
+        snapshot = self.model(**dict(zip(self._columns, values)))
+        make_transient_to_detached(snapshot)
+        return session.merge(snapshot, load=False)
+
+    def watch(self, session_factory):
+        """Invalidate products that sessions from session_factory change."""
+        model = self.model
+
+        def changed_ids(session):
+            return [obj.id for obj in list(session.dirty) + list(session.deleted)
+                    if isinstance(obj, model)]
+
+        @event.listens_for(session_factory, 'after_flush')
+        def after_flush(session, flush_context):
+            ids = changed_ids(session)
+            if ids:
+                self.invalidate_on_commit(session, ids)
+
+        @event.listens_for(session_factory, 'after_commit')
+        def after_commit(session):
+            ids = session.info.pop('changed_product_ids', None)
+            if ids:
+                self.invalidate(ids)
+
+        @event.listens_for(session_factory, 'after_rollback')
+        def after_rollback(session):
+            session.info.pop('changed_product_ids', None)
@@ -1,7 +1,3 @@
-import qrcode
-import cv2
-import numpy as np
-from PIL import Image
 from pathlib import Path
 from datetime import datetime
 
@@ -27,6 +23,7 @@ class QRHandler:
         if not serial_number:
             serial_number = f"SN{product_id}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
+        import qrcode
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -49,6 +46,7 @@ class QRHandler:
     
     def start_camera(self):
         """Initialize and start the camera"""
+        import cv2
         self.camera = cv2.VideoCapture(0)
         if not self.camera.isOpened():
             raise Exception("Could not open camera")
@@ -64,6 +62,7 @@ class QRHandler:
         if not self.camera:
             raise Exception("Camera not initialized")
         
+        import cv2
         qr_decoder = cv2.QRCodeDetector()
         
         while True:
@@ -91,6 +90,8 @@ class QRHandler:
     
     def generate_label(self, product_id, product_name, price):
         """Generate a printable label with QR code and product information"""
+        from PIL import Image, ImageDraw, ImageFont
+        
         # Create QR code
         qr_path = self.generate_qr_code(product_id, product_name)
         qr_image = Image.open(qr_path)
@@ -106,7 +107,6 @@ class QRHandler:
         label.paste(qr_image, (10, 25))
         
         # Add text information
-        from PIL import ImageDraw, ImageFont
         draw = ImageDraw.Draw(label)
         
         # Use a default font
@@ -0,0 +1,156 @@
+from collections import namedtuple
+from sqlalchemy import and_, func, select
+from database import (PRODUCT_TOTAL_QUANTITY, Customer, Product, StockAlert, fts_query,
+                      keyset_page, search_filter)
+
+# Compact read-only rows for table rendering. They carry only the columns a
+# screen shows and are never tracked by the session.
+ProductRow = namedtuple('ProductRow', [
+    'id', 'name', 'category', 'store_quantity', 'warehouse_quantity',
+    'reorder_threshold', 'purchase_price', 'selling_price', 'supplier_info'
+])
+
+StockRow = namedtuple('StockRow', [
+    'id', 'name', 'store_quantity', 'warehouse_quantity', 'total_quantity'
+])
+
+CustomerRow = namedtuple('CustomerRow', [
+    'id', 'name', 'phone', 'email', 'loyalty_points'
+])
+
+PRODUCT_COLUMNS = (
+    Product.id, Product.name, Product.category, Product.store_quantity,
+    Product.warehouse_quantity, Product.reorder_threshold, Product.purchase_price,
+    Product.selling_price, Product.supplier_info
+)
+
+CUSTOMER_COLUMNS = (
+    Customer.id, Customer.name, Customer.phone, Customer.email,
+    Customer.loyalty_points
+)
+
+# Sort keys the paged queries accept, by name. Nullable columns are
+# coalesced so keyset cursors never compare against NULL; a NULL key would
+# drop its row, and every row after it, from the pages.
+PRODUCT_SORT_KEYS = {
+    'id': Product.id,
+    'name': Product.name,
+    'category': func.coalesce(Product.category, ''),
+    'quantity': PRODUCT_TOTAL_QUANTITY,
+    'purchase_price': Product.purchase_price,
+    'selling_price': Product.selling_price,
+    'supplier': func.coalesce(Product.supplier_info, ''),
+}
+
+STOCK_SORT_KEYS = {
+    'id': Product.id,
+    'name': Product.name,
+    'store_quantity': func.coalesce(Product.store_quantity, 0),
+    'warehouse_quantity': func.coalesce(Product.warehouse_quantity, 0),
+    'total_quantity': PRODUCT_TOTAL_QUANTITY,
+}
+
+CUSTOMER_SORT_KEYS = {
+    'id': Customer.id,
+    'name': Customer.name,
+    'phone': func.coalesce(Customer.phone, ''),
+    'email': func.coalesce(Customer.email, ''),
+    'loyalty_points': func.coalesce(Customer.loyalty_points, 0),
+}
+
+# Inventory location filter -> condition on products
+LOCATION_FILTERS = {
+    'store': Product.store_quantity > 0,
+    'warehouse': Product.warehouse_quantity > 0,
+}
+
+PAGE_SIZE = 200
+
+class ReadModels:
+    """Column projections for list screens, bypassing the ORM identity map."""
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    def _rows(self, row_type, statement):
+        return [row_type._make(row) for row in self.db.session.execute(statement)]
+
+    def _page(self, row_type, query, model, sort_keys, sort, descending, cursor, limit, search):
+        """One page of query as row_type tuples, plus the next page's cursor.
+
+        Pages are keyset-ordered on (sort key, id). With search text the
+        best matches come back as a single page, ranked unless sort is given.
+        """
+        width = len(row_type._fields)
+        if search is not None:
+            if fts_query(search) is None:
+                return [], None
+            query = search_filter(query, model, search, limit)
+            if sort is not None:
+                key = sort_keys[sort]
+                query = query.order_by(None).order_by(
+                    key.desc() if descending else key, model.id.desc() if descending else model.id)
+            return [row_type._make(row[:width]) for row in query], None
+
+        key = sort_keys[sort or 'id']
+        if key is model.id:
+            rows, cursor = keyset_page(query, [model.id], cursor, limit, descending)
+        else:
+            key = key.label('sort_key')
+            rows, cursor = keyset_page(query.add_columns(key), [key, model.id],
+                                       cursor, limit, descending)
+        return [row_type._make(row[:width]) for row in rows], cursor
+
+    def product_rows(self):
+        """All products with the columns shown on the inventory page."""
+        return self._rows(ProductRow, select(*PRODUCT_COLUMNS).order_by(Product.id))
+
+    def product_page(self, sort=None, descending=False, cursor=None, limit=PAGE_SIZE,
+                     search=None, location=None):
+        """A page of inventory ProductRows sorted by a PRODUCT_SORT_KEYS name.
+
+        location is 'store' or 'warehouse' for products with stock there, or
+        'assembly' for products with an open assembly alert.
+        """
+        query = self.db.session.query(*PRODUCT_COLUMNS)
+        if location == 'assembly':
+            query = query.join(StockAlert, and_(StockAlert.product_id == Product.id,
+                                                StockAlert.kind == 'assembly'))
+        elif location in LOCATION_FILTERS:
+            query = query.filter(LOCATION_FILTERS[location])
+        return self._page(ProductRow, query, Product, PRODUCT_SORT_KEYS,
+                          sort, descending, cursor, limit, search)
+
+    def low_stock_rows(self):
+        """Products where store quantity or total quantity is at or below threshold."""
+        # Read from the trigger-maintained alerts instead of checking every product
+        return self._rows(ProductRow, select(*PRODUCT_COLUMNS).join(
+            StockAlert, and_(StockAlert.product_id == Product.id, StockAlert.kind == 'low_stock')
+        ).order_by(Product.id))
+
+    def stock_rows(self):
+        """Store, warehouse and total quantity per product."""
+        return self._rows(StockRow, select(
+            Product.id,
+            Product.name,
+            Product.store_quantity,
+            Product.warehouse_quantity,
+            PRODUCT_TOTAL_QUANTITY
+        ).order_by(Product.id))
+
+    def stock_page(self, sort=None, descending=False, cursor=None, limit=PAGE_SIZE):
+        """A page of StockRows sorted by a STOCK_SORT_KEYS name."""
+        query = self.db.session.query(
+            Product.id,
+            Product.name,
+            Product.store_quantity,
+            Product.warehouse_quantity,
+            PRODUCT_TOTAL_QUANTITY
+        )
+        return self._page(StockRow, query, Product, STOCK_SORT_KEYS,
+                          sort, descending, cursor, limit, None)
+
+    def customer_page(self, sort=None, descending=False, cursor=None, limit=PAGE_SIZE, search=None):
+        """A page of CustomerRows sorted by a CUSTOMER_SORT_KEYS name."""
+        return self._page(CustomerRow, self.db.session.query(*CUSTOMER_COLUMNS), Customer,
+                          CUSTOMER_SORT_KEYS, sort, descending, cursor, limit, search)
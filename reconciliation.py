@@ -0,0 +1,141 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, insert, select, union, update
+from database import Product, ProductItem, ReconciliationRun
+
+StockDiscrepancy = namedtuple('StockDiscrepancy', [
+    'product_id', 'store_quantity', 'warehouse_quantity', 'store_items', 'warehouse_items'
+])
+
+ReconcileResult = namedtuple('ReconcileResult', [
+    'run_id', 'since', 'products_checked', 'discrepancies'
+])
+
+# An incremental pass re-checks changes made this long before the previous
+# pass started, in case a transaction was still open when it read
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Largest IN list used when reading counters
+BATCH_SIZE = 500
+
+def corrected_counters(discrepancy):
+    """(store, warehouse) counters a discrepancy is fixed to.
+
+    Only counters above their in-stock item count come down to it. A
+    counter below it is left as is: sales by product QR code or without
+    serial numbers lower the counter but leave the items in_stock, so
+    raising it would undo those sales.
+    """
+    d = discrepancy
+    return (min(d.store_quantity or 0, d.store_items),
+            min(d.warehouse_quantity or 0, d.warehouse_items))
+
+SET_STOCK_COUNTERS = update(Product.__table__)\
+    .where(Product.__table__.c.id == bindparam('product_id'))\
+    .values(store_quantity=bindparam('store'), warehouse_quantity=bindparam('warehouse'))
+
+class StockReconciler:
+    """Brings Product store/warehouse counters in line with their in-stock
+    ProductItem rows.
+
+    Only products that have item rows are checked; stock kept as bare
+    counters is left alone. Counters are only ever lowered to the item
+    count, see corrected_counters(), and only when asked to: units added
+    to such a product without items (e.g. a plain quantity edit) would be
+    lowered away as well. The rest is reported. Each pass is
+    recorded in reconciliation_runs, and an incremental pass only looks at
+    products or items changed since the last applied pass.
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    def watermark(self):
+        """Start of the last applied pass less WATERMARK_OVERLAP, or None."""
+        last = self.db.session.execute(
+            select(func.max(ReconciliationRun.started_at))
+            .where(ReconciliationRun.applied.is_(True))
+        ).scalar()
+        return last - WATERMARK_OVERLAP if last else None
+
+    def reconcile(self, full=False, apply=False):
+        """Diff counters against item counts and, with apply, lower the
+        ones that are too high. By default nothing but the run is written.
+
+        Runs incrementally from watermark() unless full is set or there is
+        no earlier pass. Returns a ReconcileResult.
+        """
+        session = self.db.session
+        since = None if full else self.watermark()
+        try:
+            # Writing first takes the write lock, so counters can't change
+            # between counting and fixing
+            run_id = session.execute(insert(ReconciliationRun).values(
+                started_at=datetime.now(), since=since, applied=apply
+            ).returning(ReconciliationRun.id)).scalar()
+
+            counts = self._item_counts(since)
+            discrepancies = [
+                StockDiscrepancy(product_id, store, warehouse,
+                                 counts[product_id]['store'], counts[product_id]['warehouse'])
+                for product_id, store, warehouse in self._counters(list(counts))
+                if ((store or 0), (warehouse or 0)) !=
+                   (counts[product_id]['store'], counts[product_id]['warehouse'])
+            ]
+
+            if apply and discrepancies:
+                self._apply(discrepancies)
+            session.execute(update(ReconciliationRun)
+                            .where(ReconciliationRun.id == run_id)
+                            .values(products_checked=len(counts), discrepancies=len(discrepancies)))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return ReconcileResult(run_id, since, len(counts), discrepancies)
+
+    def _item_counts(self, since):
+        """Map product id -> {'store': n, 'warehouse': n} of in-stock items."""
+        query = select(ProductItem.product_id, ProductItem.location,
+                       ProductItem.status, func.count())\
+            .group_by(ProductItem.product_id, ProductItem.location, ProductItem.status)
+        if since is not None:
+            touched = union(
+                select(Product.id).where(Product.updated_at > since),
+                select(ProductItem.product_id).where(ProductItem.updated_at > since)
+            )
+            query = query.where(ProductItem.product_id.in_(touched))
+
+        counts = {}
+        for product_id, location, status, count in self.db.session.execute(query):
+            product_counts = counts.setdefault(product_id, {'store': 0, 'warehouse': 0})
+            if status == 'in_stock' and location in product_counts:
+                product_counts[location] += count
+        return counts
+
+    def _counters(self, product_ids):
+        """Yield (id, store_quantity, warehouse_quantity) for existing products."""
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            yield from self.db.session.execute(
+                select(Product.id, Product.store_quantity, Product.warehouse_quantity)
+                .where(Product.id.in_(product_ids[start:start + BATCH_SIZE])))
+
+    def _apply(self, discrepancies):
+        fixes = [(d, corrected_counters(d)) for d in discrepancies]
+        fixes = [(d, store, warehouse) for d, (store, warehouse) in fixes
+                 if (store, warehouse) != ((d.store_quantity or 0), (d.warehouse_quantity or 0))]
+        if not fixes:
+            return
+        session = self.db.session
+        session.execute(SET_STOCK_COUNTERS, [
+            {'product_id': d.product_id, 'store': store, 'warehouse': warehouse}
+            for d, store, warehouse in fixes
+        ])
+        ids = [d.product_id for d, _, _ in fixes]
+        self.db.product_cache.invalidate_on_commit(session, ids)
+        self.db.task_rules.touch(session, ids)
+        for d, store, warehouse in fixes:
+            self.db.stock_ledger.record(session, d.product_id, 'store',
+                                        store - (d.store_quantity or 0), 'reconcile')
+            self.db.stock_ledger.record(session, d.product_id, 'warehouse',
+                                        warehouse - (d.warehouse_quantity or 0), 'reconcile')
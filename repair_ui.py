@@ -8,6 +8,7 @@ from PyQt6.QtPdf import QPdfDocument
 from datetime import datetime
 from qr_handler import QRHandler
 from database import Customer, RepairTask, RepairTaskManager
+from table_models import ActionButtonDelegate
 import os
 
 class RepairTaskWidget(QWidget):
@@ -129,6 +130,10 @@ class RepairTaskDialog(QDialog):
         self.parts_table.setHorizontalHeaderLabels([
             'Part', 'Quantity', 'Unit Price', 'Subtotal', 'Actions'
         ])
+        self.remove_delegate = ActionButtonDelegate(self.parts_table)
+        self.remove_delegate.clicked.connect(
+            lambda index: self.remove_part(self.task.parts[index.row()]))
+        self.parts_table.setItemDelegateForColumn(4, self.remove_delegate)
         layout.addWidget(self.parts_table)
         
         # Add part button
@@ -191,10 +196,7 @@ class RepairTaskDialog(QDialog):
             self.parts_table.setItem(i, 1, QTableWidgetItem(str(part.quantity)))
             self.parts_table.setItem(i, 2, QTableWidgetItem(f'${part.unit_price:.2f}'))
             self.parts_table.setItem(i, 3, QTableWidgetItem(f'${part.subtotal:.2f}'))
-            
-            remove_btn = QPushButton('Remove')
-            remove_btn.clicked.connect(lambda _, p=part: self.remove_part(p))
-            self.parts_table.setCellWidget(i, 4, remove_btn)
+            self.parts_table.setItem(i, 4, QTableWidgetItem('Remove'))
     
     def remove_part(self, part):
         self.db.session.delete(part)
@@ -334,6 +336,6 @@ class AddPartDialog(QDialog):
     
     def add_part(self):
         product_id = self.product_combo.currentData()
-        self.selected_product = self.db.session.query(Product).get(product_id)
+        self.selected_product = self.db.get_product(product_id)
         if self.selected_product:
             self.accept()
\ No newline at end of file
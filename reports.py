@@ -1,19 +1,101 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QComboBox, QDateEdit, QFileDialog,
-                             QTabWidget, QTableWidget, QTableWidgetItem, QMessageBox)
+                             QTabWidget, QTableView, QMessageBox)
 from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtGui import QFont
 from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from charts import ChartWidget
+from async_db import AsyncDataAccess
+from read_models import ReadModels
+from table_models import RowTableModel, TableColumn
+
+# Report loaders run on a worker thread and return plain rows
+
+def load_sales_report(db, start_date, end_date):
+    """(sale id, date, customer name, item count, total) per sale."""
+    return [(sale_id, sale_date, customer_name or 'Walk-in Customer', item_count, total)
+            for sale_id, sale_date, customer_name, item_count, total
+            in db.get_sales_summary(start_date, end_date)]
+
+def load_inventory_report(db):
+    return ReadModels(db).product_rows()
+
+def stock_status(product):
+    total_qty = product.store_quantity + product.warehouse_quantity
+    if total_qty <= 0:
+        return "Out of Stock"
+    elif total_qty <= product.reorder_threshold:
+        return "Low Stock"
+    return "In Stock"
+
+def profit_margin(data):
+    return (data['profit'] / data['revenue']) * 100 if data['revenue'] > 0 else None
+
+SALES_REPORT_COLUMNS = [
+    TableColumn('Sale ID', lambda s: str(s[0]), lambda s: s[0]),
+    TableColumn('Date', lambda s: s[1].strftime('%Y-%m-%d %H:%M'), lambda s: s[1]),
+    TableColumn('Customer', lambda s: s[2], lambda s: s[2]),
+    TableColumn('Items', lambda s: str(s[3]), lambda s: s[3]),
+    TableColumn('Total Amount', lambda s: f"₹{s[4]:.2f}", lambda s: s[4]),
+]
+
+INVENTORY_REPORT_COLUMNS = [
+    TableColumn('Product ID', lambda p: str(p.id), lambda p: p.id),
+    TableColumn('Name', lambda p: p.name, lambda p: p.name),
+    TableColumn('Category', lambda p: p.category or 'Uncategorized', lambda p: p.category or ''),
+    TableColumn('Quantity',
+                lambda p: f"{p.store_quantity + p.warehouse_quantity} "
+                          f"(S:{p.store_quantity}, W:{p.warehouse_quantity})",
+                lambda p: p.store_quantity + p.warehouse_quantity),
+    TableColumn('Value',
+                lambda p: f"₹{(p.store_quantity + p.warehouse_quantity) * p.purchase_price:.2f}",
+                lambda p: (p.store_quantity + p.warehouse_quantity) * p.purchase_price),
+    TableColumn('Status', stock_status, stock_status),
+]
+
+PROFIT_REPORT_COLUMNS = [
+    TableColumn('Product', lambda d: d['name'], lambda d: d['name']),
+    TableColumn('Quantity Sold', lambda d: str(d['quantity']), lambda d: d['quantity']),
+    TableColumn('Revenue', lambda d: f"${d['revenue']:.2f}", lambda d: d['revenue']),
+    TableColumn('Cost', lambda d: f"${d['cost']:.2f}", lambda d: d['cost']),
+    TableColumn('Profit', lambda d: f"${d['profit']:.2f}", lambda d: d['profit']),
+    TableColumn('Margin %',
+                lambda d: "N/A" if profit_margin(d) is None else f"{profit_margin(d):.2f}%",
+                profit_margin),
+]
+
+def load_profit_report(db, start_date, end_date):
+    """Quantity, revenue, cost and profit per product sold in the period."""
+    product_profits = {}
+    
+    # Calculate profits for each product
+    for sale in db.get_sales_report_with_items(start_date, end_date):
+        for item in sale.items:
+            product = item.product
+            profit = (item.unit_price - product.purchase_price) * item.quantity
+            
+            if product.id in product_profits:
+                product_profits[product.id]['quantity'] += item.quantity
+                product_profits[product.id]['revenue'] += item.subtotal
+                product_profits[product.id]['profit'] += profit
+            else:
+                product_profits[product.id] = {
+                    'name': product.name,
+                    'quantity': item.quantity,
+                    'revenue': item.subtotal,
+                    'cost': product.purchase_price * item.quantity,
+                    'profit': profit
+                }
+    return product_profits
 
 class ReportsWidget(QWidget):
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db = db_manager
+        self.async_db = AsyncDataAccess(db_manager.db_path, parent=self)
         self.setup_ui()
+        self.async_db.loading_changed.connect(self.set_loading)
     
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -88,8 +170,11 @@ class ReportsWidget(QWidget):
     def setup_table_tab(self):
         layout = QVBoxLayout(self.table_tab)
         
-        # Create table for report data
-        self.report_table = QTableWidget()
+        # Create table for report data; cells are formatted as they are shown
+        self.report_model = RowTableModel([], parent=self)
+        self.report_table = QTableView()
+        self.report_table.setModel(self.report_model)
+        self.report_table.setSortingEnabled(True)
         layout.addWidget(self.report_table)
     
     def generate_report(self):
@@ -107,145 +192,60 @@ class ReportsWidget(QWidget):
         start_datetime = datetime.combine(start_date, datetime.min.time())
         end_datetime = datetime.combine(end_date, datetime.max.time())
         
+        # Query on a worker thread, fill the table once the rows arrive
+        if report_type == 'Sales Report':
+            load = lambda db: load_sales_report(db, start_datetime, end_datetime)
+            show = self.generate_sales_report
+        elif report_type == 'Inventory Report':
+            load = load_inventory_report
+            show = self.generate_inventory_report
+        elif report_type == 'Profit Analysis':
+            load = lambda db: load_profit_report(db, start_datetime, end_datetime)
+            show = self.generate_profit_report
+        
+        self.async_db.submit('report', load, lambda data: self.show_report(show, data),
+                             self.show_report_error)
+    
+    def set_loading(self, key, loading):
+        self.generate_btn.setEnabled(not loading)
+        self.generate_btn.setText('Generating...' if loading else 'Generate Report')
+    
+    def show_report(self, show, data):
         try:
-            if report_type == 'Sales Report':
-                self.generate_sales_report(start_datetime, end_datetime)
-            elif report_type == 'Inventory Report':
-                self.generate_inventory_report()
-            elif report_type == 'Profit Analysis':
-                self.generate_profit_report(start_datetime, end_datetime)
-                
+            show(data)
+            
             # Switch to table tab to show results
             self.tabs.setCurrentIndex(1)
             
         except Exception as e:
-            QMessageBox.critical(self, "Report Generation Error", 
-                                f"An error occurred: {str(e)}")
+            self.show_report_error(e)
     
-    def generate_sales_report(self, start_date, end_date):
-        # Get sales data from database
-        sales = self.db.get_sales_report(start_date, end_date)
-        
-        # Prepare table
-        self.report_table.clear()
-        self.report_table.setRowCount(len(sales))
-        self.report_table.setColumnCount(5)
-        self.report_table.setHorizontalHeaderLabels([
-            'Sale ID', 'Date', 'Customer', 'Items', 'Total Amount'
-        ])
-        
-        # Fill table with data
-        for row, sale in enumerate(sales):
-            self.report_table.setItem(row, 0, QTableWidgetItem(str(sale.id)))
-            self.report_table.setItem(row, 1, QTableWidgetItem(sale.sale_date.strftime('%Y-%m-%d %H:%M')))
-            
-            customer_name = sale.customer.name if sale.customer else 'Walk-in Customer'
-            self.report_table.setItem(row, 2, QTableWidgetItem(customer_name))
-            
-            # Count items
-            item_count = len(sale.items) if hasattr(sale, 'items') else 0
-            self.report_table.setItem(row, 3, QTableWidgetItem(str(item_count)))
-            
-            self.report_table.setItem(row, 4, QTableWidgetItem(f"₹{sale.total_amount:.2f}"))
-        
-        # Resize columns to content
+    def show_report_error(self, error):
+        QMessageBox.critical(self, "Report Generation Error", 
+                            f"An error occurred: {str(error)}")
+    
+    def show_rows(self, columns, rows):
+        self.report_model.set_rows(rows, columns)
+        # Back to load order until a header is clicked
+        self.report_table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
         self.report_table.resizeColumnsToContents()
+    
+    def generate_sales_report(self, sales):
+        self.show_rows(SALES_REPORT_COLUMNS, sales)
         
         # Update chart
         self.chart_widget.chart_type_combo.setCurrentText('Sales Trend')
         self.chart_widget.update_chart()
     
-    def generate_inventory_report(self):
-        # Get inventory data
-        products = self.db.get_all_products()
-        
-        # Prepare table
-        self.report_table.clear()
-        self.report_table.setRowCount(len(products))
-        self.report_table.setColumnCount(6)
-        self.report_table.setHorizontalHeaderLabels([
-            'Product ID', 'Name', 'Category', 'Quantity', 'Value', 'Status'
-        ])
-        
-        # Fill table with data
-        for row, product in enumerate(products):
-            self.report_table.setItem(row, 0, QTableWidgetItem(str(product.id)))
-            self.report_table.setItem(row, 1, QTableWidgetItem(product.name))
-            self.report_table.setItem(row, 2, QTableWidgetItem(product.category or 'Uncategorized'))
-            total_qty = product.store_quantity + product.warehouse_quantity
-            self.report_table.setItem(row, 3, QTableWidgetItem(f"{total_qty} (S:{product.store_quantity}, W:{product.warehouse_quantity})"))
-            
-            # Calculate inventory value
-            value = total_qty * product.purchase_price
-            self.report_table.setItem(row, 4, QTableWidgetItem(f"₹{value:.2f}"))
-            
-            # Stock status
-            if total_qty <= 0:
-                status = "Out of Stock"
-            elif total_qty <= product.reorder_threshold:
-                status = "Low Stock"
-            else:
-                status = "In Stock"
-            self.report_table.setItem(row, 5, QTableWidgetItem(status))
-        
-        # Resize columns to content
-        self.report_table.resizeColumnsToContents()
+    def generate_inventory_report(self, products):
+        self.show_rows(INVENTORY_REPORT_COLUMNS, products)
         
         # Update chart
         self.chart_widget.chart_type_combo.setCurrentText('Product Categories')
         self.chart_widget.update_chart()
     
-    def generate_profit_report(self, start_date, end_date):
-        # Get sales data
-        sales = self.db.get_sales_report(start_date, end_date)
-        
-        # Dictionary to store product profits
-        product_profits = {}
-        
-        # Calculate profits for each product
-        for sale in sales:
-            for item in sale.items:
-                product = item.product
-                profit = (item.unit_price - product.purchase_price) * item.quantity
-                
-                if product.id in product_profits:
-                    product_profits[product.id]['quantity'] += item.quantity
-                    product_profits[product.id]['revenue'] += item.subtotal
-                    product_profits[product.id]['profit'] += profit
-                else:
-                    product_profits[product.id] = {
-                        'name': product.name,
-                        'quantity': item.quantity,
-                        'revenue': item.subtotal,
-                        'cost': product.purchase_price * item.quantity,
-                        'profit': profit
-                    }
-        
-        # Prepare table
-        self.report_table.clear()
-        self.report_table.setRowCount(len(product_profits))
-        self.report_table.setColumnCount(6)
-        self.report_table.setHorizontalHeaderLabels([
-            'Product', 'Quantity Sold', 'Revenue', 'Cost', 'Profit', 'Margin %'
-        ])
-        
-        # Fill table with data
-        for row, (product_id, data) in enumerate(product_profits.items()):
-            self.report_table.setItem(row, 0, QTableWidgetItem(data['name']))
-            self.report_table.setItem(row, 1, QTableWidgetItem(str(data['quantity'])))
-            self.report_table.setItem(row, 2, QTableWidgetItem(f"${data['revenue']:.2f}"))
-            self.report_table.setItem(row, 3, QTableWidgetItem(f"${data['cost']:.2f}"))
-            self.report_table.setItem(row, 4, QTableWidgetItem(f"${data['profit']:.2f}"))
-            
-            # Calculate margin percentage
-            if data['revenue'] > 0:
-                margin = (data['profit'] / data['revenue']) * 100
-                self.report_table.setItem(row, 5, QTableWidgetItem(f"{margin:.2f}%"))
-            else:
-                self.report_table.setItem(row, 5, QTableWidgetItem("N/A"))
-        
-        # Resize columns to content
-        self.report_table.resizeColumnsToContents()
+    def generate_profit_report(self, product_profits):
+        self.show_rows(PROFIT_REPORT_COLUMNS, product_profits.values())
         
         # Update chart
         self.chart_widget.chart_type_combo.setCurrentText('Profit Margin')
@@ -261,19 +261,10 @@ class ReportsWidget(QWidget):
             return
         
         try:
-            # Convert table data to pandas DataFrame
-            rows = self.report_table.rowCount()
-            cols = self.report_table.columnCount()
-            headers = [self.report_table.horizontalHeaderItem(col).text() for col in range(cols)]
-            
-            data = []
-            for row in range(rows):
-                row_data = []
-                for col in range(cols):
-                    item = self.report_table.item(row, col)
-                    row_data.append(item.text() if item else "")
-                data.append(row_data)
+            import pandas as pd
             
+            # Convert table data to pandas DataFrame
+            headers, data = self.report_model.table_data()
             df = pd.DataFrame(data, columns=headers)
             
             # Export to CSV
@@ -315,19 +306,11 @@ class ReportsWidget(QWidget):
                                 f"Failed to export report: {str(e)}")
     
     def generate_pdf_with_matplotlib(self, file_path):
-        # Convert table data to pandas DataFrame
-        rows = self.report_table.rowCount()
-        cols = self.report_table.columnCount()
-        headers = [self.report_table.horizontalHeaderItem(col).text() for col in range(cols)]
-        
-        data = []
-        for row in range(rows):
-            row_data = []
-            for col in range(cols):
-                item = self.report_table.item(row, col)
-                row_data.append(item.text() if item else "")
-            data.append(row_data)
+        import pandas as pd
+        import matplotlib.pyplot as plt
         
+        # Convert table data to pandas DataFrame
+        headers, data = self.report_model.table_data()
         df = pd.DataFrame(data, columns=headers)
         
         # Create a figure with a table
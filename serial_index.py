@@ -0,0 +1,117 @@
+import sys
+import threading
+from collections import namedtuple
+from sqlalchemy import event
+
+SerialEntry = namedtuple('SerialEntry', [
+    'item_id', 'product_id', 'location', 'status', 'price', 'name'
+])
+
+class SerialIndex:
+    """In-memory serial number -> product item map for the scanning path.
+
+    Items are kept as (item id, product id, location, status) tuples and
+    product name/price once per product, so a million tracked units stay
+    in the low hundreds of MB. Lookups are a single dict access.
+
+    The index only sees changes made through DatabaseManager in this
+    process; DatabaseManager.resolve_serial() falls back to the database
+    on a miss. Changes made inside a transaction are passed with its
+    session and only applied once it commits, see watch().
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._products = {}
+        self._lock = threading.Lock()
+        self._pending = None  # changes made while warm() is loading
+        self.warmed = False
+
+    def __len__(self):
+        return len(self._items)
+
+    def warm(self, item_rows, product_rows):
+        """Replace the index contents.
+
+        item_rows yields (serial, item id, product id, location, status) and
+        product_rows yields (product id, name, selling price). Changes
+        tracked while the rows load are replayed on top.
+        """
+        with self._lock:
+            self._pending = []
+        intern = sys.intern
+        items = {
+            serial: (item_id, product_id, intern(location or ''), intern(status or ''))
+            for serial, item_id, product_id, location, status in item_rows
+        }
+        products = {product_id: (name, price) for product_id, name, price in product_rows}
+        with self._lock:
+            for change in self._pending:
+                change(items, products)
+            self._items, self._products = items, products
+            self._pending = None
+            self.warmed = True
+
+    def _apply(self, change, session=None):
+        if session is not None:
+            session.info.setdefault('serial_index_changes', []).append(change)
+            return
+        with self._lock:
+            change(self._items, self._products)
+            if self._pending is not None:
+                self._pending.append(change)
+
+    def resolve(self, serial):
+        """Return the SerialEntry for a serial number, or None."""
+        item = self._items.get(serial)
+        if item is None:
+            return None
+        name, price = self._products.get(item[1], (None, None))
+        return SerialEntry(*item, price, name)
+
+    def track(self, items, session=None):
+        """Add or update product items (anything with ProductItem's attributes).
+
+        With a session, the change waits for that session to commit.
+        """
+        rows = [(item.serial_number, (item.id, item.product_id,
+                                      sys.intern(item.location or ''),
+                                      sys.intern(item.status or '')))
+                for item in items]
+
+        def change(items, products):
+            items.update(rows)
+        self._apply(change, session)
+
+    def set_product(self, product_id, name, price, session=None):
+        def change(items, products):
+            products[product_id] = (name, price)
+        self._apply(change, session)
+
+    def forget_product(self, product_id, session=None):
+        """Drop a deleted product and its items. Walks the whole index."""
+        def change(items, products):
+            products.pop(product_id, None)
+            for serial in [s for s, item in items.items() if item[1] == product_id]:
+                del items[serial]
+        self._apply(change, session)
+
+    def watch(self, session_factory):
+        """Apply changes queued on sessions from session_factory when they
+        commit, and drop them when they roll back.
+        """
+        @event.listens_for(session_factory, 'after_commit')
+        def after_commit(session):
+            for change in session.info.pop('serial_index_changes', ()):
+                self._apply(change)
+
+        @event.listens_for(session_factory, 'after_rollback')
+        def after_rollback(session):
+            session.info.pop('serial_index_changes', None)
+
+        @event.listens_for(session_factory, 'after_transaction_end')
+        def after_transaction_end(session, transaction):
+            # Also ends by close() without a rollback event; commits have
+            # already applied their changes by now
+            if transaction.parent is None:
+                session.info.pop('serial_index_changes', None)
@@ -0,0 +1,86 @@
+"""Cold-start timing for the main window.
+
+    python main.py --startup-report
+
+starts the app, prints how long imports, window construction and the
+first paint took, and quits once the window has painted.
+"""
+import builtins
+import sys
+import time
+from PyQt6.QtCore import QEvent, QObject
+
+class ImportTimer:
+    """Times the first import of every module, nested imports included."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = []  # (depth, name, seconds) in completion order
+        self._depth = 0
+        self._import = builtins.__import__
+
+    def install(self):
+        builtins.__import__ = self._timed_import
+        return self
+
+    def uninstall(self):
+        builtins.__import__ = self._import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            # Relative or already loaded: nothing to time
+            return self._import(name, globals, locals, fromlist, level)
+        depth = self._depth
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth = depth
+            self.imports.append((depth, name, time.perf_counter() - start))
+
+class StartupReport(QObject):
+    """Collects startup milestones and prints them after the first paint."""
+
+    def __init__(self, import_timer, quit_after=True):
+        super().__init__()
+        self.import_timer = import_timer
+        self.quit_after = quit_after
+        self.milestones = []  # (label, seconds since start)
+        self.pages = []  # (page, seconds to build)
+
+    def mark(self, label):
+        self.milestones.append((label, time.perf_counter() - self.import_timer.started))
+
+    def page_built(self, name, seconds):
+        self.pages.append((name, seconds))
+
+    def watch(self, window):
+        """Report once window has painted for the first time."""
+        self.window = window
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and obj is self.window:
+            obj.removeEventFilter(self)
+            self.mark('first paint')
+            self.import_timer.uninstall()
+            self.print_report()
+            if self.quit_after:
+                from PyQt6.QtWidgets import QApplication
+                QApplication.instance().quit()
+        return False
+
+    def print_report(self, out=sys.stdout, limit=15):
+        top_level = sorted((i for i in self.import_timer.imports if i[0] == 0),
+                           key=lambda i: i[2], reverse=True)
+        print(f"{'top-level import':<40} {'ms':>10}", file=out)
+        for _, name, seconds in top_level[:limit]:
+            print(f"{name:<40} {seconds * 1000:>10.1f}", file=out)
+        if self.pages:
+            print(f"\n{'page built':<40} {'ms':>10}", file=out)
+            for name, seconds in self.pages:
+                print(f"{name:<40} {seconds * 1000:>10.1f}", file=out)
+        print(f"\n{'milestone':<40} {'ms':>10}", file=out)
+        for label, seconds in self.milestones:
+            print(f"{label:<40} {seconds * 1000:>10.1f}", file=out)
@@ -0,0 +1,87 @@
+from datetime import datetime
+from sqlalchemy import event, inspect, insert
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+class StockLedger:
+    """Turns stock counter changes into append-only movement rows.
+
+    Sessions watched with watch() record a movement for every flushed
+    change to a product's stock counters, using the reason set with
+    set_reason() ('adjustment' by default, 'initial' for new products).
+    Code that changes counters with Core statements must call record()
+    itself. A transaction's movements are inserted in one batch just
+    before it commits.
+    """
+
+    def __init__(self, product_model, movement_model, locations):
+        self.product_model = product_model
+        self.movement_model = movement_model
+        self.locations = dict(locations)  # location -> product counter attribute
+        for attr in self.locations.values():
+            # Load the old value on set, so flush-time history has both sides
+            attribute = getattr(product_model, attr)
+            if not event.contains(attribute, 'set', _keep_old_value):
+                event.listen(attribute, 'set', _keep_old_value, active_history=True)
+
+    def set_reason(self, session, reason, reference=None):
+        """Label this transaction's flushed counter changes."""
+        session.info['stock_movement_reason'] = (reason, reference)
+
+    def record(self, session, product_id, location, change, reason, reference=None):
+        """Add a movement to the transaction's batch."""
+        if change:
+            session.info.setdefault('stock_movements', []).append({
+                'product_id': product_id,
+                'location': location,
+                'change': change,
+                'reason': reason,
+                'reference': reference,
+            })
+
+    def watch(self, session_factory):
+        model = self.product_model
+        locations = self.locations
+
+        def record_changes(session, product, reason, reference, sign=1):
+            state = inspect(product)
+            for location, attr in locations.items():
+                history = state.attrs[attr].history
+                if sign < 0:
+                    change = -(state.dict.get(attr) or 0)
+                elif history.has_changes():
+                    new = history.added[0] if history.added else None
+                    old = history.deleted[0] if history.deleted else None
+                    change = (new or 0) - (old or 0)
+                else:
+                    continue
+                self.record(session, product.id, location, change, reason, reference)
+
+        @event.listens_for(session_factory, 'after_flush')
+        def after_flush(session, flush_context):
+            reason, reference = session.info.get('stock_movement_reason', (None, None))
+            for obj in session.new:
+                if isinstance(obj, model):
+                    record_changes(session, obj, reason or 'initial', reference)
+            for obj in session.dirty:
+                if isinstance(obj, model):
+                    record_changes(session, obj, reason or 'adjustment', reference)
+            for obj in session.deleted:
+                if isinstance(obj, model):
+                    record_changes(session, obj, 'deleted', reference, sign=-1)
+
+        @event.listens_for(session_factory, 'before_commit')
+        def before_commit(session):
+            session.flush()
+            session.info.pop('stock_movement_reason', None)
+            rows = session.info.pop('stock_movements', None)
+            if rows:
+                now = datetime.now()
+                session.execute(insert(self.movement_model),
+                                [dict(row, created_at=now) for row in rows])
+
+        @event.listens_for(session_factory, 'after_rollback')
+        def after_rollback(session):
+            session.info.pop('stock_movement_reason', None)
+            session.info.pop('stock_movements', None)
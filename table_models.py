@@ -0,0 +1,233 @@
+from collections import namedtuple
+from PyQt6.QtCore import (Qt, QAbstractTableModel, QEvent, QModelIndex,
+                          QPersistentModelIndex, QSize, pyqtSignal)
+from PyQt6.QtWidgets import (QApplication, QStyle, QStyleOptionButton,
+                             QStyleOptionViewItem, QStyledItemDelegate)
+
+# One table column. text turns a row into the cell's display string. sort
+# is what the column sorts by: a sort key name handed to the loader for
+# QueryTableModel, a row -> value function for RowTableModel, or None if
+# the column can't be sorted. background optionally maps a row to a QColor.
+TableColumn = namedtuple('TableColumn', ['header', 'text', 'sort', 'background'],
+                         defaults=(None, None))
+
+class RowTableModel(QAbstractTableModel):
+    """Read-only table model over a list of row tuples.
+
+    Cells are formatted when the view asks for them, so only visible rows
+    are ever turned into text. Sorting happens in memory.
+    """
+
+    def __init__(self, columns, rows=(), parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self._rows = list(rows)
+
+    def set_rows(self, rows, columns=None):
+        """Replace the rows, and the columns too if given."""
+        self.beginResetModel()
+        if columns is not None:
+            self.columns = list(columns)
+        self._rows = list(rows)
+        self.endResetModel()
+
+    def row_at(self, row):
+        return self._rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = self.columns[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return column.text(row)
+        if role == Qt.ItemDataRole.BackgroundRole and column.background:
+            return column.background(row)
+        if role == Qt.ItemDataRole.UserRole:
+            return row
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columns[section].header
+        return super().headerData(section, orientation, role)
+
+    def sort_for(self, column):
+        """The sort of a column index, None if out of range or unsortable."""
+        return self.columns[column].sort if 0 <= column < len(self.columns) else None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        key = self.sort_for(column)
+        if key is None:
+            return
+        self.layoutAboutToBeChanged.emit()
+        # None sorts first instead of failing to compare
+        self._rows.sort(key=lambda row: (key(row) is not None, key(row)),
+                        reverse=order == Qt.SortOrder.DescendingOrder)
+        self.layoutChanged.emit()
+
+    def table_data(self):
+        """(headers, rows of display strings) for exporting every row."""
+        headers = [column.header for column in self.columns]
+        return headers, [[column.text(row) for column in self.columns] for row in self._rows]
+
+class QueryTableModel(RowTableModel):
+    """Table model that pages rows in from the database as the view scrolls.
+
+    load(sort, descending, cursor, limit) returns (rows, next_cursor) like
+    ReadModels' *_page methods, with next_cursor None after the last page.
+    The view calls fetchMore() when it scrolls near the end; sorting and
+    filtering re-run the query, so only fetched pages are ever held.
+    """
+
+    def __init__(self, columns, load=None, page_size=200, parent=None):
+        super().__init__(columns, parent=parent)
+        self.load = load
+        self.page_size = page_size
+        self.sort_key = None
+        self.descending = False
+        self._cursor = None
+
+    def set_loader(self, load):
+        """Query with a different loader, e.g. after a filter changes."""
+        self.load = load
+        self.refresh()
+
+    def refresh(self):
+        """Drop the fetched rows and load the first page again."""
+        self.beginResetModel()
+        if self.load is None:
+            self._rows, self._cursor = [], None
+        else:
+            self._rows, self._cursor = self.load(self.sort_key, self.descending,
+                                                 None, self.page_size)
+        self.endResetModel()
+
+    def reload(self):
+        """Query the fetched rows again in place, keeping the view's scroll
+        position and selection.
+        """
+        if self.load is None:
+            return
+        rows, self._cursor = self.load(self.sort_key, self.descending, None,
+                                       max(len(self._rows), self.page_size))
+        if len(rows) < len(self._rows):
+            self.beginRemoveRows(QModelIndex(), len(rows), len(self._rows) - 1)
+            del self._rows[len(rows):]
+            self.endRemoveRows()
+        elif len(rows) > len(self._rows):
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(rows) - 1)
+            self._rows.extend(rows[len(self._rows):])
+            self.endInsertRows()
+        self._rows[:] = rows
+        if rows:
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(len(rows) - 1, len(self.columns) - 1))
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._cursor is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        rows, self._cursor = self.load(self.sort_key, self.descending,
+                                       self._cursor, self.page_size)
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # Column -1 is the view asking for the natural order
+        key = self.sort_for(column)
+        if key is None and column >= 0:
+            return
+        self.sort_key = key
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.refresh()
+
+def selected_row(view):
+    """The model row behind the first selected cell of view, or None."""
+    indexes = view.selectionModel().selectedIndexes()
+    if not indexes:
+        return None
+    return view.model().row_at(indexes[0].row())
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """Paints a push button in every cell of a column and reports clicks.
+
+    The button is labelled with the cell's display text, and cells without
+    text get no button. Nothing is created per row: buttons are painted and
+    hit-tested here, and clicked(index) is emitted when one is released.
+    """
+    clicked = pyqtSignal(QModelIndex)
+
+    # Gap between the cell border and the button, in pixels
+    MARGIN = 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pressed = QPersistentModelIndex()
+
+    def button_option(self, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        button.text = index.data(Qt.ItemDataRole.DisplayRole) or ''
+        button.state = QStyle.StateFlag.State_Enabled
+        if QPersistentModelIndex(index) == self._pressed:
+            button.state |= QStyle.StateFlag.State_Sunken
+        else:
+            button.state |= QStyle.StateFlag.State_Raised
+        return button
+
+    def paint(self, painter, option, index):
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        # Cell background and selection, without the text
+        cell = QStyleOptionViewItem(option)
+        self.initStyleOption(cell, index)
+        cell.text = ''
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, cell, painter, widget)
+        button = self.button_option(option, index)
+        if button.text:
+            style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, widget)
+
+    def sizeHint(self, option, index):
+        button = self.button_option(option, index)
+        style = option.widget.style() if option.widget else QApplication.style()
+        text_size = option.fontMetrics.size(Qt.TextFlag.TextShowMnemonic, button.text)
+        size = style.sizeFromContents(QStyle.ContentsType.CT_PushButton, button,
+                                      text_size, option.widget)
+        return size + QSize(2 * self.MARGIN, 2 * self.MARGIN)
+
+    def createEditor(self, parent, option, index):
+        return None
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease,
+                                QEvent.Type.MouseButtonDblClick):
+            return False
+        if not index.data(Qt.ItemDataRole.DisplayRole):
+            return False
+        inside = self.button_option(option, index).rect.contains(event.position().toPoint())
+        if event.type() == QEvent.Type.MouseButtonRelease:
+            pressed, self._pressed = self._pressed, QPersistentModelIndex()
+            self._repaint(option)
+            if inside and pressed == QPersistentModelIndex(index):
+                self.clicked.emit(index)
+            return inside
+        if inside and event.button() == Qt.MouseButton.LeftButton:
+            self._pressed = QPersistentModelIndex(index)
+            self._repaint(option)
+            return True
+        return False
+
+    def _repaint(self, option):
+        if option.widget:
+            option.widget.viewport().update(option.rect)
@@ -0,0 +1,83 @@
+from sqlalchemy import event, inspect, insert
+
+class TaskRule:
+    """A rule that turns product state into automatic todo tasks.
+
+    new_tasks() returns task row dicts for the given product ids (None
+    means every product), skipping products that already have a pending
+    task of the rule's type.
+    """
+    task_type = None
+
+    def new_tasks(self, session, product_ids=None):
+        raise NotImplementedError
+
+class TaskRuleEngine:
+    """Runs task rules for the products a transaction changed, at commit.
+
+    Sessions watched with watch() note products whose watched attributes
+    change in a flush; code that changes products with Core statements
+    must call touch() itself. Just before the commit, every rule runs on
+    the noted products only and the new tasks are inserted in the same
+    transaction.
+    """
+
+    # Largest IN list sent to a rule in one go
+    BATCH_SIZE = 500
+
+    def __init__(self, product_model, task_model, rules, watched=()):
+        self.product_model = product_model
+        self.task_model = task_model
+        self.rules = list(rules)
+        self.watched = tuple(watched)
+
+    def touch(self, session, product_ids):
+        """Have the rules look at product_ids when session commits."""
+        session.info.setdefault('task_rule_product_ids', set()).update(product_ids)
+
+    def run(self, session, product_ids=None):
+        """Insert the tasks every rule asks for and return them.
+
+        Does not commit. product_ids=None sweeps every product.
+        """
+        rows = []
+        if product_ids is None:
+            for rule in self.rules:
+                rows.extend(rule.new_tasks(session))
+        else:
+            product_ids = sorted(product_ids)
+            for start in range(0, len(product_ids), self.BATCH_SIZE):
+                batch = product_ids[start:start + self.BATCH_SIZE]
+                for rule in self.rules:
+                    rows.extend(rule.new_tasks(session, batch))
+        if not rows:
+            return []
+        return session.scalars(insert(self.task_model).returning(self.task_model), rows).all()
+
+    def watch(self, session_factory):
+        """Run the rules on products that sessions from session_factory change."""
+        model = self.product_model
+        watched = self.watched
+
+        def changed(obj):
+            attrs = inspect(obj).attrs
+            return any(attrs[name].history.has_changes() for name in watched)
+
+        @event.listens_for(session_factory, 'after_flush')
+        def after_flush(session, flush_context):
+            ids = [obj.id for obj in session.new if isinstance(obj, model)]
+            ids += [obj.id for obj in session.dirty if isinstance(obj, model) and changed(obj)]
+            if ids:
+                self.touch(session, ids)
+
+        @event.listens_for(session_factory, 'before_commit')
+        def before_commit(session):
+            # Flush first so the rules see this transaction's changes
+            session.flush()
+            ids = session.info.pop('task_rule_product_ids', None)
+            if ids:
+                self.run(session, ids)
+
+        @event.listens_for(session_factory, 'after_rollback')
+        def after_rollback(session):
+            session.info.pop('task_rule_product_ids', None)
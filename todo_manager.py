@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 from database import DatabaseManager, TodoTask
 
 class TodoManager:
@@ -61,7 +62,9 @@ class TodoManager:
     
     def get_pending_tasks(self, task_type=None, assigned_to=None):
         """Get all pending tasks, optionally filtered by type or assignee."""
-        query = self.db.session.query(TodoTask).filter(TodoTask.status == 'pending')
+        query = self.db.session.query(TodoTask).options(
+            joinedload(TodoTask.product)
+        ).filter(TodoTask.status == 'pending')
         
         if task_type:
             query = query.filter(TodoTask.task_type == task_type)
@@ -73,7 +76,9 @@ class TodoManager:
     
     def get_high_priority_tasks(self):
         """Get all high priority pending tasks."""
-        return self.db.session.query(TodoTask).filter(
+        return self.db.session.query(TodoTask).options(
+            joinedload(TodoTask.product)
+        ).filter(
             TodoTask.status == 'pending',
             TodoTask.priority == 'high'
         ).order_by(TodoTask.created_at.desc()).all()
@@ -98,47 +103,21 @@ class TodoManager:
             return task
         return None
     
+    def get_pending_task(self, product_id, task_type):
+        """Return the product's pending task of a type, or None."""
+        return self.db.session.query(TodoTask).filter(
+            TodoTask.product_id == product_id,
+            TodoTask.task_type == task_type,
+            TodoTask.status == 'pending'
+        ).first()
+    
     def check_low_stock_and_create_tasks(self):
-        """Check for low stock products and create restock and assembly tasks automatically."""
-        tasks_created = []
+        """Check every product against the task rules and create the missing
+        restock and assembly tasks in one commit.
         
-        # Handle products needing restock from warehouse to store
-        restock_products = self.db.get_products_needing_restock()
-        for product in restock_products:
-            # Check if there's already a pending restock task
-            existing_task = self.db.session.query(TodoTask).filter(
-                TodoTask.product_id == product.id,
-                TodoTask.task_type == 'restock',
-                TodoTask.status == 'pending'
-            ).first()
-            
-            if not existing_task:
-                needed_in_store = max(product.reorder_threshold - product.store_quantity, 0)
-                available_in_warehouse = product.warehouse_quantity
-                quantity_to_move = min(needed_in_store, available_in_warehouse)
-                
-                if quantity_to_move > 0:
-                    task = self.create_restock_task(product.id, quantity_to_move)
-                    if task:
-                        tasks_created.append(task)
-        
-        # Handle products needing assembly/ordering
-        assembly_products = self.db.get_products_needing_assembly()
-        for product in assembly_products:
-            # Check if there's already a pending assembly task
-            existing_task = self.db.session.query(TodoTask).filter(
-                TodoTask.product_id == product.id,
-                TodoTask.task_type == 'assembly',
-                TodoTask.status == 'pending'
-            ).first()
-            
-            if not existing_task:
-                total_quantity = product.store_quantity + product.warehouse_quantity
-                if total_quantity <= product.reorder_threshold:
-                    # Order 5 extra units above the threshold
-                    assembly_qty = max(product.reorder_threshold - total_quantity + 5, 0)
-                    task = self.create_assembly_task(product.id, assembly_qty)
-                    if task:
-                        tasks_created.append(task)
-        
-        return tasks_created
\ No newline at end of file
+        Commits already run the rules on the products they change, so this
+        full sweep is only needed for changes made outside the app.
+        """
+        tasks = self.db.task_rules.run(self.db.session)
+        self.db.session.commit()
+        return tasks
@@ -8,6 +8,7 @@ from PyQt6.QtGui import QFont
 from database import DatabaseManager, TodoTask
 from todo_manager import TodoManager
 from enhanced_product_manager import EnhancedProductManager
+from table_models import ActionButtonDelegate
 from datetime import datetime
 
 class TodoWidget(QWidget):
@@ -63,6 +64,11 @@ class TodoWidget(QWidget):
         header.setSectionResizeMode(6, QHeaderView.ResizeMode.ResizeToContents)
         header.setSectionResizeMode(7, QHeaderView.ResizeMode.ResizeToContents)
         
+        # Start/Complete buttons are painted by the delegate, not widgets
+        self.action_delegate = ActionButtonDelegate(self.tasks_table)
+        self.action_delegate.clicked.connect(self.run_task_action)
+        self.tasks_table.setItemDelegateForColumn(7, self.action_delegate)
+        
         layout.addWidget(self.tasks_table)
         
         # Action buttons
@@ -155,14 +161,16 @@ class TodoWidget(QWidget):
             self.tasks_table.setItem(row, 6, status_item)
             
             # Actions
-            if task.status == 'pending':
-                start_btn = QPushButton('Start')
-                start_btn.clicked.connect(lambda checked, t_id=task.id: self.start_task(t_id))
-                self.tasks_table.setCellWidget(row, 7, start_btn)
-            elif task.status == 'in_progress':
-                complete_btn = QPushButton('Complete')
-                complete_btn.clicked.connect(lambda checked, t_id=task.id: self.complete_task_by_id(t_id))
-                self.tasks_table.setCellWidget(row, 7, complete_btn)
+            action = {'pending': 'Start', 'in_progress': 'Complete'}.get(task.status, '')
+            self.tasks_table.setItem(row, 7, QTableWidgetItem(action))
+    
+    def run_task_action(self, index):
+        """Handle a click on a row's Start or Complete button."""
+        task_id = int(self.tasks_table.item(index.row(), 0).text())
+        if index.data() == 'Start':
+            self.start_task(task_id)
+        else:
+            self.complete_task_by_id(task_id)
     
     def start_task(self, task_id):
         """Start a task (change status to in_progress)."""
@@ -299,6 +307,7 @@ class MoveStockDialog(QDialog):
         super().__init__(parent)
         self.db = DatabaseManager()
         self.enhanced_manager = EnhancedProductManager(self.db)
+        self.transfers = {}  # product id -> quantity queued for the transfer
         self.setup_ui()
     
     def setup_ui(self):
@@ -326,8 +335,19 @@ class MoveStockDialog(QDialog):
         self.qty_input.setMaximum(9999)
         qty_layout.addWidget(self.qty_input)
         
+        add_btn = QPushButton('Add to List')
+        add_btn.clicked.connect(self.add_transfer)
+        qty_layout.addWidget(add_btn)
+        
         layout.addLayout(qty_layout)
         
+        # Products queued for a multi-product transfer
+        self.transfer_table = QTableWidget()
+        self.transfer_table.setColumnCount(2)
+        self.transfer_table.setHorizontalHeaderLabels(['Product', 'Quantity'])
+        self.transfer_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.transfer_table)
+        
         # Buttons
         buttons_layout = QHBoxLayout()
         
@@ -352,17 +372,32 @@ class MoveStockDialog(QDialog):
                     product.id
                 )
     
+    def add_transfer(self):
+        """Queue the selected product and quantity for the transfer."""
+        if self.product_combo.count() == 0:
+            return
+        
+        product_id = self.product_combo.currentData()
+        if product_id not in self.transfers:
+            row = self.transfer_table.rowCount()
+            self.transfer_table.insertRow(row)
+            self.transfer_table.setItem(row, 0, QTableWidgetItem(self.product_combo.currentText()))
+            self.transfers[product_id] = 0
+        self.transfers[product_id] += self.qty_input.value()
+        
+        row = list(self.transfers).index(product_id)
+        self.transfer_table.setItem(row, 1, QTableWidgetItem(str(self.transfers[product_id])))
+    
     def move_stock(self):
-        """Move the specified quantity from warehouse to store."""
+        """Move the queued products, or the current selection, in one transaction."""
         if self.product_combo.count() == 0:
             QMessageBox.warning(self, 'No Products', 'No products with warehouse stock available.')
             return
         
-        product_id = self.product_combo.currentData()
-        quantity = self.qty_input.value()
+        transfers = self.transfers or {self.product_combo.currentData(): self.qty_input.value()}
         
         try:
-            moved_items = self.enhanced_manager.move_warehouse_to_store(product_id, quantity)
+            moved_items = self.enhanced_manager.transfer_warehouse_to_store(transfers)
             if moved_items:
                 QMessageBox.information(self, 'Success', 
                     f'Successfully moved {len(moved_items)} items to store.')